@@ -0,0 +1,99 @@
+# SPDX-FileCopyrightText: (c) 2021 Artёm IG <github.com/rtmigo>
+# SPDX-License-Identifier: MIT
+
+# Runs the benchmarks and saves the results to a JSON file, so they can be
+# compared with the results of another version:
+#
+#   python3 -m benchmarks --output new.json --compare old.json
+
+import argparse
+import datetime
+import json
+import platform
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from benchmarks.suites import SUITES, Results
+from lambdarado import __version__
+
+
+def run(suites: List[str], **options) -> Dict[str, Any]:
+    results: Results = {}
+    for name in suites:
+        print(f'Running {name}...', file=sys.stderr)
+        if name == 'cold_start':
+            SUITES[name](results, runs=options.get('runs', 3))
+        else:
+            SUITES[name](results, repeat=options.get('repeat', 5),
+                         min_time=options.get('min_time', 0.2))
+    return {
+        'lambdarado': __version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'results': results,
+    }
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any],
+            threshold: float) -> List[str]:
+    """Prints the median times of both runs, and returns the names of the
+    benchmarks that became slower by more than `threshold` (0.1 is 10%)."""
+    regressions = []
+    print(f"{'benchmark':<42} {'old':>12} {'new':>12} {'change':>8}")
+    for name, result in new['results'].items():
+        previous = old['results'].get(name)
+        if previous is None or previous['unit'] != result['unit']:
+            continue
+        change = (result['median'] - previous['median']) \
+            / previous['median'] if previous['median'] > 0 else 0.0
+        # the overheads are differences and may be close to zero,
+        # so they are not compared by ratio
+        mark = ''
+        if change > threshold and not name.startswith('handler.overhead.'):
+            regressions.append(name)
+            mark = ' SLOWER'
+        unit = result['unit']
+        print(f"{name:<42} {previous['median']:>9.1f} {unit:<2} "
+              f"{result['median']:>9.1f} {unit:<2} {change:>+7.1%}{mark}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python3 -m benchmarks')
+    parser.add_argument('--suite', action='append', choices=list(SUITES),
+                        help='the suite to run (default: all)')
+    parser.add_argument('--output', type=Path,
+                        help='save the results to the JSON file')
+    parser.add_argument('--compare', type=Path,
+                        help='the JSON file with the results to compare to')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='the slowdown reported as a regression '
+                             '(default: 0.1, i.e. 10%%)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help='seconds to spend on each round')
+    parser.add_argument('--runs', type=int, default=3,
+                        help='the number of cold starts of each project')
+    args = parser.parse_args(argv)
+
+    report = run(args.suite or list(SUITES), repeat=args.repeat,
+                 min_time=args.min_time, runs=args.runs)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + '\n')
+
+    if args.compare:
+        old = json.loads(args.compare.read_text())
+        regressions = compare(old, report, args.threshold)
+        if regressions:
+            print(f'{len(regressions)} benchmark(s) are slower than '
+                  f'{old["lambdarado"]}: {", ".join(regressions)}')
+            return 1
+    else:
+        print(json.dumps(report['results'], indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
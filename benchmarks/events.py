@@ -0,0 +1,155 @@
+# SPDX-FileCopyrightText: (c) 2021 Artёm IG <github.com/rtmigo>
+# SPDX-License-Identifier: MIT
+
+# Canned HTTP events of the formats that lambdarado translates.
+#
+# The "small" events are bodiless GET requests, the "medium" ones are POST
+# requests with a 4 KiB text body and a dozen of headers, and the "large"
+# ones are POST requests with a 256 KiB binary (base64) body and multi-value
+# headers.
+
+import base64
+import random
+from typing import Dict, List, Tuple
+
+from lambdarado._http_event import FORMAT_V1, FORMAT_V2, FORMAT_ALB, \
+    FORMAT_ALB_MULTI
+
+SIZES = ('small', 'medium', 'large')
+FORMATS = (FORMAT_V1, FORMAT_V2, FORMAT_ALB, FORMAT_ALB_MULTI)
+
+
+def _body(size: str) -> Tuple[bytes, str]:
+    """Returns the body and its content type."""
+    if size == 'small':
+        return b'', ''
+    if size == 'medium':
+        return (b'{"key":"value"}' * 274)[:4096], 'application/json'
+    # the seed keeps the events the same between the runs
+    rnd = random.Random(size)
+    return bytes(rnd.getrandbits(8) for _ in range(256 * 1024)), \
+        'application/octet-stream'
+
+
+def _headers(size: str, content_type: str) -> List[Tuple[str, str]]:
+    headers = [('Host', 'example.com'),
+               ('User-Agent', 'benchmark/1.0'),
+               ('Accept', '*/*')]
+    if content_type:
+        headers.append(('Content-Type', content_type))
+    if size != 'small':
+        headers.extend((f'X-Custom-{i}', f'value-{i}') for i in range(8))
+    if size == 'large':
+        # repeated headers are only preserved by the multi-value formats
+        headers.extend(('X-Forwarded-For', f'10.0.0.{i}') for i in range(4))
+        headers.extend(('Accept-Language', lang)
+                       for lang in ('en', 'de', 'fr'))
+    return headers
+
+
+def _single(headers: List[Tuple[str, str]], lower: bool) -> Dict[str, str]:
+    result: Dict[str, str] = {}
+    for name, value in headers:
+        result[name.lower() if lower else name] = value
+    return result
+
+
+def _multi(headers: List[Tuple[str, str]],
+           lower: bool) -> Dict[str, List[str]]:
+    result: Dict[str, List[str]] = {}
+    for name, value in headers:
+        result.setdefault(name.lower() if lower else name, []).append(value)
+    return result
+
+
+def _encoded_body(body: bytes, content_type: str) -> Tuple[str, bool]:
+    if not body:
+        return '', False
+    if content_type == 'application/octet-stream':
+        return base64.b64encode(body).decode('ascii'), True
+    return body.decode('utf-8'), False
+
+
+def make_event(fmt: str, size: str) -> Dict:
+    """Returns the event of the `fmt` format (FORMAT_V1 etc.) and the
+    `size` ('small', 'medium' or 'large')."""
+    body, content_type = _body(size)
+    headers = _headers(size, content_type)
+    method = 'GET' if size == 'small' else 'POST'
+    text, is_base64 = _encoded_body(body, content_type)
+    query = {'page': '1', 'sort': 'name'}
+
+    if fmt == FORMAT_V2:
+        joined: Dict[str, str] = {}
+        for name, value in headers:
+            name = name.lower()
+            joined[name] = value if name not in joined \
+                else joined[name] + ',' + value
+        return {
+            'version': '2.0',
+            'routeKey': '$default',
+            'rawPath': '/bench/path',
+            'rawQueryString': 'page=1&sort=name',
+            'cookies': ['session=abc', 'theme=dark'],
+            'headers': joined,
+            'queryStringParameters': query,
+            'requestContext': {
+                'accountId': '123456789012',
+                'apiId': 'api',
+                'domainName': 'api.execute-api.us-east-1.amazonaws.com',
+                'http': {'method': method, 'path': '/bench/path',
+                         'protocol': 'HTTP/1.1', 'sourceIp': '1.2.3.4',
+                         'userAgent': 'benchmark/1.0'},
+                'requestId': 'id',
+                'routeKey': '$default',
+                'stage': '$default',
+            },
+            'body': text,
+            'isBase64Encoded': is_base64,
+        }
+
+    if fmt == FORMAT_V1:
+        return {
+            'resource': '/{proxy+}',
+            'path': '/bench/path',
+            'httpMethod': method,
+            'headers': _single(headers, lower=False),
+            'multiValueHeaders': _multi(headers, lower=False),
+            'queryStringParameters': query,
+            'multiValueQueryStringParameters': {k: [v]
+                                                for k, v in query.items()},
+            'requestContext': {'stage': 'prod', 'requestId': 'id',
+                               'identity': {'sourceIp': '1.2.3.4'}},
+            'body': text or None,
+            'isBase64Encoded': is_base64,
+        }
+
+    if fmt in (FORMAT_ALB, FORMAT_ALB_MULTI):
+        event = {
+            'path': '/bench/path',
+            'httpMethod': method,
+            'requestContext': {'elb': {'targetGroupArn': 'arn'}},
+            'body': text,
+            'isBase64Encoded': is_base64,
+        }
+        if fmt == FORMAT_ALB_MULTI:
+            event['multiValueHeaders'] = _multi(headers, lower=True)
+            event['multiValueQueryStringParameters'] = {
+                k: [v] for k, v in query.items()}
+        else:
+            event['headers'] = _single(headers, lower=True)
+            event['queryStringParameters'] = query
+        return event
+
+    raise ValueError(f'Unknown format: {fmt!r}')
+
+
+def response_for(size: str) -> Tuple[str, List[Tuple[str, str]], bytes]:
+    """Returns the WSGI status, headers and body of a response of the
+    `size`."""
+    body, content_type = _body(size)
+    headers = [('Content-Type', content_type or 'text/plain'),
+               ('Content-Length', str(len(body))),
+               ('Set-Cookie', 'a=1'),
+               ('Set-Cookie', 'b=2')]
+    return '200 OK', headers, body
@@ -0,0 +1,190 @@
+# SPDX-FileCopyrightText: (c) 2021 Artёm IG <github.com/rtmigo>
+# SPDX-License-Identifier: MIT
+
+import contextlib
+import io
+import os
+import statistics
+import subprocess
+import sys
+import timeit
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.events import FORMATS, SIZES, make_event, response_for
+from lambdarado._emulator import RuntimeApiEmulator, http_request_to_event
+from lambdarado._http_event import event_to_environ, format_response
+from lambdarado._lambdarado import make_aws_handler
+from lambdarado._log_writer import BackgroundWriter
+from lambdarado._wrap_handler_default import wrap_aws_handler_default, \
+    wrap_compact_logging
+
+Results = Dict[str, Dict[str, Any]]
+
+REPO_DIR = Path(__file__).parent.parent
+PROJECTS_DIR = REPO_DIR / 'tests' / 'projects'
+
+# the arguments to python that start each of the test projects
+PROJECTS = {
+    'flask1': ['main.py'],
+    'flask2': ['mainmain.py'],
+    'flask3': ['-m', 'subpkg.mainmain'],
+    'flask4': ['main.py'],
+}
+
+
+def measure(fn: Callable[[], Any], repeat: int = 5,
+            min_time: float = 0.2) -> Dict[str, Any]:
+    """Times the calls of `fn` and returns the per-call microseconds of the
+    fastest, median and slowest of the `repeat` rounds."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    rounds = [total / number * 1e6 for total in timer.repeat(repeat, number)]
+    return {'unit': 'us',
+            'min': round(min(rounds), 3),
+            'median': round(statistics.median(rounds), 3),
+            'max': round(max(rounds), 3)}
+
+
+def _subtract(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    return {'unit': a['unit'],
+            **{key: round(a[key] - b[key], 3)
+               for key in ('min', 'median', 'max')}}
+
+
+def sized_app(size: str):
+    """Returns the WSGI app that responds with the canned response of the
+    `size`, without reading the request."""
+    status, headers, body = response_for(size)
+
+    def app(environ, start_response):
+        start_response(status, headers)
+        return [body]
+
+    return app
+
+
+def bench_translate(results: Results, **options) -> None:
+    """Translating the events to WSGI environ, and the responses back."""
+    for fmt in FORMATS:
+        for size in SIZES:
+            event = make_event(fmt, size)
+            status, headers, body = response_for(size)
+            results[f'translate.request.{fmt}.{size}'] = measure(
+                lambda: event_to_environ(event, None, fmt), **options)
+            results[f'translate.response.{fmt}.{size}'] = measure(
+                lambda: format_response(event, fmt, status, headers, body),
+                **options)
+
+
+def bench_handler(results: Results, **options) -> None:
+    """The full handler built by `assign_lambda_handler`, compared to
+    calling the WSGI app directly."""
+    for size in SIZES:
+        app = sized_app(size)
+        direct_environ = event_to_environ(make_event(FORMATS[0], size))
+        direct = measure(lambda: b''.join(
+            app(direct_environ, lambda status, headers: None)), **options)
+        results[f'handler.direct.{size}'] = direct
+        handler = make_aws_handler(app)
+        for fmt in FORMATS:
+            event = make_event(fmt, size)
+            total = measure(lambda: handler(event, None), **options)
+            results[f'handler.lambdarado.{fmt}.{size}'] = total
+            results[f'handler.overhead.{fmt}.{size}'] = _subtract(total,
+                                                                 direct)
+
+
+@contextlib.contextmanager
+def _environment(**variables: str):
+    saved = {name: os.environ.get(name) for name in variables}
+    os.environ.update(variables)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def bench_logging(results: Results, **options) -> None:
+    """`wrap_aws_handler_default` with the logging off and on. The output
+    goes to a buffer, so only the formatting is measured."""
+    size = 'medium'
+    app = sized_app(size)
+    event = make_event(FORMATS[1], size)
+    buffer = io.StringIO()
+
+    def reset_buffer() -> None:
+        buffer.seek(0)
+        buffer.truncate()
+
+    with contextlib.redirect_stdout(buffer):
+        with _environment(LOG_LAMBDA_REQUESTS='0', LOG_LAMBDA_RESPONSES='0'):
+            off = wrap_aws_handler_default(make_aws_handler(app))
+        with _environment(LOG_LAMBDA_REQUESTS='1', LOG_LAMBDA_RESPONSES='1'):
+            on = wrap_aws_handler_default(make_aws_handler(app))
+
+        def call_on() -> None:
+            on(event, None)
+            reset_buffer()
+
+        results['logging.off'] = measure(lambda: off(event, None), **options)
+        results['logging.on'] = measure(call_on, **options)
+
+    writer = BackgroundWriter(stream=io.StringIO())
+    compact = wrap_compact_logging(make_aws_handler(app), True, True, 1.0,
+                                   writer, lambda obj: obj)
+
+    def call_compact() -> None:
+        compact(event, None)
+        # the background thread must keep up, or the queue would grow
+        writer.flush()
+
+    results['logging.compact'] = measure(call_compact, **options)
+
+
+def _cold_start(project: str, args: List[str]) -> Dict[str, float]:
+    env = {'PYTHONPATH': str(REPO_DIR) + os.pathsep
+                         + os.environ.get('PYTHONPATH', '')}
+    with RuntimeApiEmulator() as emulator:
+        emulator.launch([sys.executable] + args,
+                        cwd=str(PROJECTS_DIR / project), env=env,
+                        stdout=subprocess.DEVNULL)
+        if not emulator.wait_ready(60):
+            raise RuntimeError(f'{project} did not start')
+        invocation = emulator.invoke(
+            http_request_to_event('GET', '/a', {}, b''))
+        invocation.result()
+        assert emulator.init_duration_ms is not None
+        assert invocation.duration_ms is not None
+        return {'init': emulator.init_duration_ms,
+                'first': invocation.duration_ms}
+
+
+def bench_cold_start(results: Results, runs: int = 3,
+                     projects: Optional[List[str]] = None,
+                     **options) -> None:
+    """Starting the `tests/projects` apps under the Runtime API emulator:
+    the init duration, and the duration of the first invocation."""
+    for project in projects or list(PROJECTS):
+        samples = [_cold_start(project, PROJECTS[project])
+                   for _ in range(runs)]
+        for key in ('init', 'first'):
+            values = [sample[key] for sample in samples]
+            results[f'cold_start.{project}.{key}'] = {
+                'unit': 'ms',
+                'min': round(min(values), 3),
+                'median': round(statistics.median(values), 3),
+                'max': round(max(values), 3)}
+
+
+SUITES = {
+    'translate': bench_translate,
+    'handler': bench_handler,
+    'logging': bench_logging,
+    'cold_start': bench_cold_start,
+}
@@ -2,4 +2,18 @@
 # SPDX-License-Identifier: MIT
 
 from ._constants import __version__
-from ._lambdarado import start
+from ._lambdarado import start, handler
+from ._common import chain_wrappers
+from ._wrap_handler_default import wrap_aws_handler_default
+from ._wrap_handler_compress import compression_wrapper
+from ._wrap_handler_etag import etag_wrapper
+from ._batch import batch_wrapper
+from ._cache import ResponseCache
+from ._wrap_handler_offload import offload_wrapper, OffloadStorage, \
+    S3Storage, MemoryStorage
+from ._metrics import EmfMetrics
+from ._deadline import deadline_wrapper, remaining_time, DeadlineExceeded
+from ._resources import ResourceRegistry, Resource, registry as resources
+from ._extension import after_response
+from ._memory import memory_wrapper
+from ._static import StaticFiles
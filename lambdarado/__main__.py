@@ -0,0 +1,117 @@
+# SPDX-FileCopyrightText: (c) 2021 Artёm IG <github.com/rtmigo>
+# SPDX-License-Identifier: MIT
+
+import argparse
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+
+def _emulate(args: argparse.Namespace) -> None:
+    from lambdarado._emulator import run_emulator
+    command = args.command
+    if command and command[0] == '--':
+        command = command[1:]
+    if not command:
+        raise SystemExit('Specify the entry script, e.g. main.py')
+    if command[0].endswith('.py'):
+        command = [sys.executable] + command
+    run_emulator(command, port=args.port, host=args.host,
+                 timeout=args.timeout, function_url=args.function_url)
+
+
+def _precompile(args: argparse.Namespace) -> None:
+    from lambdarado._precompile import run_precompile
+    if not run_precompile(args.script, args.path, report=not args.no_report,
+                          top=args.top):
+        raise SystemExit(1)
+
+
+def _replay(args: argparse.Namespace) -> None:
+    from lambdarado._replay import run_replay
+    if bool(args.app) == bool(args.url):
+        raise SystemExit('Specify either --app or --url')
+    try:
+        succeeded, report = run_replay(
+            args.events, app=args.app, url=args.url,
+            concurrency=args.concurrency, rate=args.rate, count=args.count,
+            top=args.top, as_json=args.json)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    print(report)
+    if not succeeded:
+        raise SystemExit(1)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog='python3 -m lambdarado')
+    commands = parser.add_subparsers(dest='subcommand', required=True)
+
+    emulate = commands.add_parser(
+        'emulate',
+        help='run the entry script under a local Lambda Runtime API '
+             'emulator and serve it over HTTP')
+    emulate.add_argument('--host', default='127.0.0.1')
+    emulate.add_argument('--port', type=int, default=5000)
+    emulate.add_argument('--timeout', type=float, default=30,
+                         help='the function timeout in seconds')
+    emulate.add_argument('--function-url', action='store_true',
+                         help='send the Function URL events instead of the '
+                              'HTTP API ones (required for response '
+                              'streaming)')
+    emulate.add_argument('command', nargs=argparse.REMAINDER,
+                         help='the entry script (main.py) or the command '
+                              'that runs it')
+    emulate.set_defaults(func=_emulate)
+
+    precompile = commands.add_parser(
+        'precompile',
+        help='compile the bytecode of the app and the site-packages, '
+             'and report the import time of the entry script imports')
+    precompile.add_argument('script', type=Path,
+                            help='the entry script, e.g. main.py')
+    precompile.add_argument('path', type=Path, nargs='*',
+                            help='the files and directories to compile '
+                                 '(default: the script directory and the '
+                                 'site-packages)')
+    precompile.add_argument('--top', type=int, default=20,
+                            help='the number of the heaviest imports '
+                                 'to report')
+    precompile.add_argument('--no-report', action='store_true',
+                            help='do not measure the import time')
+    precompile.set_defaults(func=_precompile)
+
+    replay = commands.add_parser(
+        'replay',
+        help='send the captured events again and report the latency '
+             'percentiles, the throughput and the slowest routes')
+    replay.add_argument('events',
+                        help='the file with the events: the log of '
+                             'LOG_LAMBDA_REQUESTS (pretty or compact) or '
+                             'JSON lines')
+    replay.add_argument('--app', metavar='MODULE:GET_APP',
+                        help='the function creating the app, to replay in '
+                             'this process')
+    replay.add_argument('--url',
+                        help='the local server to send the requests to, '
+                             'e.g. http://127.0.0.1:5000')
+    replay.add_argument('--concurrency', type=int, default=1,
+                        help='the number of requests in flight')
+    replay.add_argument('--rate', type=float,
+                        help='the requests per second (default: as fast '
+                             'as possible)')
+    replay.add_argument('--count', type=int,
+                        help='the number of requests, repeating the events '
+                             '(default: each event once)')
+    replay.add_argument('--top', type=int, default=10,
+                        help='the number of the slowest routes to report')
+    replay.add_argument('--json', action='store_true',
+                        help='print the report as JSON')
+    replay.set_defaults(func=_replay)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
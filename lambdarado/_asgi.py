@@ -0,0 +1,216 @@
+# SPDX-FileCopyrightText: (c) 2021 Artёm IG <github.com/rtmigo>
+# SPDX-License-Identifier: MIT
+
+# Serves ASGI apps (FastAPI, Starlette) on AWS Lambda.
+#
+# The event loop is created once, when the handler is created, and then
+# reused by all the invocations. The async clients created by the app
+# (database pools, HTTP sessions) are bound to this loop, so they keep their
+# connections while the Lambda instance is warm.
+#
+# The handler may be called from several threads at once (the sub-requests
+# of a batch). Only one thread at a time runs the loop; the requests of the
+# other threads are scheduled on the loop, and are served concurrently while
+# it runs.
+
+import asyncio
+import atexit
+import threading
+from http import HTTPStatus
+from typing import Any, Dict, List, Optional, Tuple
+
+from lambdarado._common import AwsHandlerFunc, is_asgi_app
+from lambdarado._http_event import FORMATS, event_format, Headers, \
+    mount_environ
+
+
+def _status_line(code: int) -> str:
+    try:
+        return f'{code} {HTTPStatus(code).phrase}'
+    except ValueError:
+        return str(code)
+
+
+def environ_to_scope(environ: Dict[str, Any]) -> Dict[str, Any]:
+    headers: List[Tuple[bytes, bytes]] = []
+    for key, value in environ.items():
+        if key.startswith('HTTP_'):
+            name = key[5:].lower().replace('_', '-')
+            headers.append((name.encode('latin-1'), value.encode('latin-1')))
+    if 'CONTENT_TYPE' in environ and 'HTTP_CONTENT_TYPE' not in environ:
+        headers.append((b'content-type',
+                        environ['CONTENT_TYPE'].encode('latin-1')))
+    if 'HTTP_CONTENT_LENGTH' not in environ:
+        headers.append((b'content-length',
+                        environ['CONTENT_LENGTH'].encode('latin-1')))
+    port = environ['SERVER_PORT']
+    return {
+        'type': 'http',
+        'asgi': {'version': '3.0', 'spec_version': '2.3'},
+        'http_version': environ['SERVER_PROTOCOL'].partition('/')[2] or '1.1',
+        'method': environ['REQUEST_METHOD'],
+        'scheme': environ['wsgi.url_scheme'],
+        # unlike PATH_INFO, the ASGI path includes the root_path
+        'path': environ['SCRIPT_NAME'] + environ['PATH_INFO'],
+        'raw_path': None,
+        'query_string': environ['QUERY_STRING'].encode('latin-1'),
+        'root_path': environ['SCRIPT_NAME'],
+        'headers': headers,
+        'client': (environ['REMOTE_ADDR'], 0),
+        'server': (environ['SERVER_NAME'], int(port) if port else None),
+        'aws.event': environ['lambdarado.event'],
+        'aws.context': environ['lambdarado.context'],
+    }
+
+
+async def call_asgi_http(app, scope: Dict[str, Any],
+                         body: bytes) -> Tuple[str, Headers, bytes]:
+    """Runs the request through the ASGI `app` and returns the status line,
+    headers and body of the response."""
+    status = 500
+    headers: Headers = []
+    chunks: List[bytes] = []
+    request_sent = False
+    response_complete = asyncio.Event()
+
+    async def receive() -> Dict[str, Any]:
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {'type': 'http.request', 'body': body,
+                    'more_body': False}
+        await response_complete.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message: Dict[str, Any]) -> None:
+        nonlocal status, headers
+        if message['type'] == 'http.response.start':
+            status = message['status']
+            headers = [(name.decode('latin-1'), value.decode('latin-1'))
+                       for name, value in message.get('headers', ())]
+        elif message['type'] == 'http.response.body':
+            chunk = message.get('body', b'')
+            if chunk:
+                chunks.append(chunk)
+            if not message.get('more_body', False):
+                response_complete.set()
+
+    try:
+        await app(scope, receive, send)
+    finally:
+        response_complete.set()
+
+    return (_status_line(status), headers,
+            chunks[0] if len(chunks) == 1 else b''.join(chunks))
+
+
+class Lifespan:
+    """Runs the ASGI lifespan protocol, if the app supports it."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self.task: Optional[asyncio.Future] = None
+        self._queue: Optional[asyncio.Queue] = None
+
+    async def startup(self) -> None:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._queue = queue
+        started = asyncio.get_event_loop().create_future()
+
+        async def send(message: Dict[str, Any]) -> None:
+            if message['type'].startswith('lifespan.startup.') \
+                    and not started.done():
+                started.set_result(message)
+
+        async def run() -> None:
+            try:
+                await self.app({'type': 'lifespan',
+                                'asgi': {'version': '3.0',
+                                         'spec_version': '2.0'}},
+                               queue.get, send)
+            except Exception:  # the app does not support lifespan
+                pass
+            finally:
+                if not started.done():
+                    started.set_result(None)
+
+        await queue.put({'type': 'lifespan.startup'})
+        self.task = asyncio.ensure_future(run())
+        message = await started
+        if message is not None \
+                and message['type'] == 'lifespan.startup.failed':
+            raise RuntimeError(message.get('message')
+                               or 'ASGI lifespan startup failed')
+
+    async def shutdown(self) -> None:
+        if self.task is None or self.task.done() or self._queue is None:
+            return
+        await self._queue.put({'type': 'lifespan.shutdown'})
+        await self.task
+
+
+def make_asgi_handler(asgi_app, script_name: str = '') -> AwsHandlerFunc:
+    """Creates a Lambda handler that serves the HTTP events with the
+    `asgi_app` on a persistent event loop. If the `script_name` is given,
+    the app is mounted at this prefix (the `root_path`)."""
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    lifespan = Lifespan(asgi_app)
+    loop.run_until_complete(lifespan.startup())
+
+    def shutdown() -> None:
+        if not loop.is_closed():
+            loop.run_until_complete(lifespan.shutdown())
+
+    atexit.register(shutdown)
+
+    formats = FORMATS
+    # held by the thread running the loop
+    running = threading.Lock()
+
+    def run(coroutine) -> Tuple[str, Headers, bytes]:
+        if running.acquire(blocking=False):
+            try:
+                return loop.run_until_complete(coroutine)
+            finally:
+                running.release()
+        # the loop is run by another thread: the coroutine starts there,
+        # and this thread runs the loop when that one is done, if the
+        # coroutine is not finished by then
+        future = asyncio.run_coroutine_threadsafe(coroutine, loop)
+        with running:
+            if not future.done():
+                loop.run_until_complete(asyncio.wrap_future(future,
+                                                            loop=loop))
+        return future.result()
+
+    def asgi_handler(event: Dict, context: Any) -> Dict[str, Any]:
+        fmt = event_format(event)
+        if fmt is None:
+            raise ValueError('The event is not an HTTP request')
+        build_environ, build_response = formats[fmt]
+        environ = build_environ(event, context)
+        if script_name:
+            mount_environ(environ, script_name)
+        status, headers, body = run(
+            call_asgi_http(asgi_app, environ_to_scope(environ),
+                           environ['wsgi.input'].getvalue()))
+        return build_response(status, headers, body,
+                              'multiValueHeaders' in event)
+
+    # keeping the references, so the lifespan task is not garbage collected
+    asgi_handler.loop = loop  # type: ignore
+    asgi_handler.lifespan = lifespan  # type: ignore
+    return asgi_handler
+
+
+def run_asgi_locally(asgi_app, host: str, port: int = 5000) -> None:
+    """Serves the app with uvicorn, the same way Flask apps are served with
+    the Werkzeug debug server."""
+    try:
+        import uvicorn  # type: ignore
+    except ImportError as e:
+        raise ImportError("Running ASGI apps locally requires uvicorn: "
+                          "pip3 install uvicorn") from e
+    uvicorn.run(asgi_app, host=host, port=port)
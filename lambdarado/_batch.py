@@ -0,0 +1,247 @@
+# SPDX-FileCopyrightText: (c) 2021 Artёm IG <github.com/rtmigo>
+# SPDX-License-Identifier: MIT
+
+# Several requests in one invocation.
+#
+# The client posts a list of sub-requests to the batch route. Each of them
+# becomes an HTTP API event passed to the handler, so the sub-requests are
+# served by the same app (and the same cache and static files) as the
+# separate requests would be. They run on a bounded thread pool, and the
+# responses are returned together in one JSON body, that must fit in the
+# payload of the Lambda response.
+
+import contextvars
+import json
+import threading
+import traceback
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
+
+from lambdarado._common import AwsHandlerFunc, WrapAwsHandlerFunc
+from lambdarado._http_event import event_format, format_response, \
+    request_body
+from lambdarado._response import request_method, request_path
+from lambdarado._wrap_handler_offload import DEFAULT_MAX_BODY_SIZE
+
+if TYPE_CHECKING:
+    from concurrent.futures import ThreadPoolExecutor
+
+# the headers of the batch request that are not passed to the sub-requests
+_NOT_INHERITED = frozenset(('content-length', 'content-type',
+                            'content-encoding', 'transfer-encoding',
+                            'accept-encoding'))
+
+
+class BatchError(ValueError):
+    pass
+
+
+def _outer_headers(event: Dict) -> Dict[str, str]:
+    multi = event.get('multiValueHeaders')
+    if multi:
+        headers = {name.lower(): ','.join(values)
+                   for name, values in multi.items()}
+    else:
+        headers = {name.lower(): value
+                   for name, value in (event.get('headers') or {}).items()}
+    for name in _NOT_INHERITED:
+        headers.pop(name, None)
+    return headers
+
+
+def _source_ip(event: Dict) -> str:
+    context = event.get('requestContext') or {}
+    return context.get('http', {}).get('sourceIp') \
+        or context.get('identity', {}).get('sourceIp') or '127.0.0.1'
+
+
+def sub_event(event: Dict, item: Any) -> Dict[str, Any]:
+    """Creates the HTTP API event for the sub-request `item` of the batch
+    `event`. The sub-request inherits the headers of the batch request,
+    except the ones describing its body."""
+    if not isinstance(item, dict):
+        raise BatchError('The sub-request must be an object')
+    path = item.get('path')
+    if not isinstance(path, str) or not path.startswith('/'):
+        raise BatchError('The sub-request must have the path')
+    method = str(item.get('method', 'GET')).upper()
+    path, _, query = path.partition('?')
+
+    headers = _outer_headers(event)
+    item_headers = item.get('headers') or {}
+    if not isinstance(item_headers, dict):
+        raise BatchError('The headers must be an object')
+    for name, value in item_headers.items():
+        headers[name.lower()] = str(value)
+
+    body = item.get('body')
+    base64 = bool(item.get('isBase64Encoded'))
+    if body is not None and not isinstance(body, str):
+        # the JSON body as is
+        body = json.dumps(body)
+        base64 = False
+        headers.setdefault('content-type', 'application/json')
+
+    context = dict(event.get('requestContext') or {})
+    context['http'] = {'method': method, 'path': path,
+                       'protocol': 'HTTP/1.1',
+                       'sourceIp': _source_ip(event)}
+    result: Dict[str, Any] = {
+        'version': '2.0',
+        'rawPath': path,
+        'rawQueryString': query,
+        'headers': headers,
+        'requestContext': context,
+        'isBase64Encoded': base64,
+    }
+    if body is not None:
+        result['body'] = body
+    cookies = event.get('cookies')
+    if cookies:
+        result['cookies'] = list(cookies)
+    return result
+
+
+def _item_response(response: Dict) -> Dict[str, Any]:
+    result: Dict[str, Any] = {
+        'status': response.get('statusCode', 200),
+        'headers': response.get('headers') or {},
+    }
+    if response.get('cookies'):
+        result['cookies'] = response['cookies']
+    # the body as it is encoded in the response, without decoding
+    result['body'] = response.get('body') or ''
+    result['isBase64Encoded'] = bool(response.get('isBase64Encoded'))
+    return result
+
+
+def _error_item(status: int, message: str) -> Dict[str, Any]:
+    return {'status': status,
+            'headers': {'content-type': 'application/json'},
+            'body': json.dumps({'message': message}),
+            'isBase64Encoded': False}
+
+
+def _escaped_size(item_json: str) -> int:
+    """The size of the JSON `item_json` as a string in the Lambda response,
+    where the quotes and the backslashes are escaped. The JSON of
+    `json.dumps` is ASCII, and has no control characters."""
+    return len(item_json) + item_json.count('"') + item_json.count('\\')
+
+
+def _responses_body(responses: List[Dict[str, Any]], max_size: int) -> bytes:
+    """Returns the JSON body with the `responses`. The ones that do not fit
+    in `max_size` (as escaped in the Lambda response) are replaced with
+    413 errors, so the client still gets the statuses of all the items."""
+    too_large = json.dumps(_error_item(
+        413, 'The response does not fit in the batch'))
+    parts: List[str] = []
+    # the envelope and the separators
+    size = 64
+    for item in responses:
+        item_json = json.dumps(item)
+        item_size = _escaped_size(item_json) + 2
+        if size + item_size > max_size:
+            item_json = too_large
+            item_size = _escaped_size(item_json) + 2
+        parts.append(item_json)
+        size += item_size
+    return ('{"responses": [' + ', '.join(parts) + ']}').encode('utf-8')
+
+
+def batch_wrapper(path: str = '/batch',
+                  max_items: int = 20,
+                  workers: int = 8,
+                  max_size: int = DEFAULT_MAX_BODY_SIZE
+                  ) -> WrapAwsHandlerFunc:
+    """Creates a wrapper for `start(wrap_handler=...)`, that serves the
+    POST requests to `path` as batches of sub-requests.
+
+    The body of the batch request is a JSON list (or an object with the
+    "requests" list) of the sub-requests:
+
+        [{"method": "GET", "path": "/users/1?fields=name"},
+         {"method": "POST", "path": "/events", "body": {"type": "open"}}]
+
+    The "headers" of a sub-request are added to the headers of the batch
+    request. The "body" is a string (base64 with "isBase64Encoded") or any
+    JSON value. Up to `workers` sub-requests are served concurrently, and
+    the response lists their results in the same order:
+
+        {"responses": [{"status": 200, "headers": {...}, "body": "...",
+                        "isBase64Encoded": false}, ...]}
+
+    A sub-request that fails gets the status 500 in the list; the batch
+    itself fails with 400 only when it cannot be parsed or has more than
+    `max_items` sub-requests. The responses are added to the body in their
+    order while it fits in `max_size` bytes (as sent in the Lambda
+    response); the ones that do not fit get the status 413 in the list.
+    """
+    executor: Optional['ThreadPoolExecutor'] = None
+    executor_lock = threading.Lock()
+
+    def get_executor() -> 'ThreadPoolExecutor':
+        nonlocal executor
+        if executor is None:
+            with executor_lock:
+                if executor is None:
+                    # imported by the first batch, not with the package
+                    from concurrent.futures import ThreadPoolExecutor
+                    executor = ThreadPoolExecutor(
+                        max_workers=workers,
+                        thread_name_prefix='lambdarado-batch')
+        return executor
+
+    def parse(event: Dict) -> List[Any]:
+        try:
+            data = json.loads(request_body(event) or b'null')
+        except ValueError:
+            raise BatchError('The body is not JSON')
+        if isinstance(data, dict):
+            data = data.get('requests')
+        if not isinstance(data, list):
+            raise BatchError('Expected the list of the requests')
+        if len(data) > max_items:
+            raise BatchError(f'More than {max_items} requests')
+        return data
+
+    def wrap(handler: AwsHandlerFunc) -> AwsHandlerFunc:
+        def serve(event: Dict, item: Any, context) -> Dict[str, Any]:
+            try:
+                sub = sub_event(event, item)
+            except BatchError as e:
+                return _error_item(400, str(e))
+            try:
+                return _item_response(handler(sub, context))
+            except Exception:
+                traceback.print_exc()
+                return _error_item(500, 'Internal Server Error')
+
+        def batch_handler(event: Dict, context) -> Dict:
+            fmt = event_format(event) if isinstance(event, dict) else None
+            if fmt is None or request_path(event) != path \
+                    or request_method(event) != 'POST':
+                return handler(event, context)
+            try:
+                items = parse(event)
+            except BatchError as e:
+                return format_response(
+                    event, fmt, '400 Bad Request',
+                    [('Content-Type', 'application/json')],
+                    json.dumps({'message': str(e)}).encode('utf-8'))
+
+            if len(items) <= 1:
+                responses = [serve(event, item, context) for item in items]
+            else:
+                # the sub-requests see the context variables of the
+                # invocation, like the deadline
+                futures = [get_executor().submit(
+                    contextvars.copy_context().run, serve, event, item,
+                    context) for item in items]
+                responses = [future.result() for future in futures]
+            return format_response(
+                event, fmt, '200 OK', [('Content-Type', 'application/json')],
+                _responses_body(responses, max_size))
+
+        return batch_handler
+
+    return wrap
@@ -0,0 +1,264 @@
+# SPDX-FileCopyrightText: (c) 2021 Artёm IG <github.com/rtmigo>
+# SPDX-License-Identifier: MIT
+
+# An in-process cache of the Lambda responses. The module globals survive
+# between the invocations of a warm Lambda instance, so the cached responses
+# are served without calling the app at all.
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple, Any
+
+from lambdarado._common import AwsHandlerFunc
+from lambdarado._response import request_header, request_method, \
+    request_path, request_query, response_header
+
+# the statuses that are cacheable by default (RFC 7231, section 6.1)
+CACHEABLE_STATUSES = frozenset((200, 203, 204, 300, 301, 404, 405, 410, 414,
+                                501))
+
+_Key = Tuple[Any, ...]
+
+
+def _copy_response(response: Dict) -> Dict:
+    # the outer wrappers may modify the headers of the returned response,
+    # so the cached one should not be shared with them
+    result = dict(response)
+    headers = response.get('headers')
+    if headers is not None:
+        result['headers'] = dict(headers)
+    multi = response.get('multiValueHeaders')
+    if multi is not None:
+        result['multiValueHeaders'] = {k: list(v) for k, v in multi.items()}
+    cookies = response.get('cookies')
+    if cookies is not None:
+        result['cookies'] = list(cookies)
+    return result
+
+
+def _response_cost(response: Dict) -> int:
+    cost = len(response.get('body') or '') + 200
+    for field in ('headers', 'multiValueHeaders'):
+        headers = response.get(field)
+        if headers:
+            cost += sum(len(k) + len(str(v)) for k, v in headers.items())
+    return cost
+
+
+def response_ttl(response: Dict, default_ttl: float) -> Optional[float]:
+    """Returns the number of seconds the response may be cached, according
+    to its Cache-Control and Expires headers. Returns None if the response
+    must not be cached."""
+    cache_control = response_header(response, 'cache-control')
+    if cache_control:
+        max_age = None
+        s_max_age = None
+        for directive in cache_control.lower().split(','):
+            name, _, value = directive.strip().partition('=')
+            if name in ('no-store', 'no-cache', 'private'):
+                return None
+            try:
+                if name == 'max-age':
+                    max_age = int(value.strip('"'))
+                elif name == 's-maxage':
+                    s_max_age = int(value.strip('"'))
+            except ValueError:
+                return None
+        # we are a shared cache, so s-maxage overrides max-age
+        if s_max_age is not None:
+            return s_max_age if s_max_age > 0 else None
+        if max_age is not None:
+            return max_age if max_age > 0 else None
+
+    expires = response_header(response, 'expires')
+    if expires:
+        try:
+            # imported here, since email.utils is slow to import
+            from email.utils import parsedate_to_datetime
+            ttl = parsedate_to_datetime(expires).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None  # invalid date means "already expired"
+        return ttl if ttl > 0 else None
+
+    return default_ttl if default_ttl > 0 else None
+
+
+class _Entry:
+    __slots__ = ('response', 'expires', 'cost')
+
+    def __init__(self, response: Dict, expires: float, cost: int) -> None:
+        self.response = response
+        self.expires = expires
+        self.cost = cost
+
+
+class ResponseCache:
+    """LRU cache of the responses with time-to-live and memory limit.
+
+    Pass it to `start(get_app, response_cache=ResponseCache(...))`.
+
+    The GET and HEAD responses are cached for the time specified by their
+    Cache-Control (s-maxage or max-age) or Expires headers. The responses
+    without these headers are cached for `default_ttl` seconds, which is
+    zero (no caching) by default. Responses with `no-store`, `no-cache`,
+    `private` or cookies are not cached, neither are the requests with the
+    Authorization header.
+
+    The cache key is the method, path, query parameters (sorted) and the
+    values of the request headers listed in the Vary header of the response.
+    """
+
+    def __init__(self,
+                 max_entries: int = 1000,
+                 max_bytes: int = 32 * 1024 * 1024,
+                 default_ttl: float = 0) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries: 'OrderedDict[_Key, _Entry]' = OrderedDict()
+        self._vary: Dict[_Key, Tuple[str, ...]] = {}
+        # the number of the entries of each base key
+        self._variants: Dict[_Key, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'entries': len(self._entries),
+                'bytes': self._bytes}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._vary.clear()
+            self._variants.clear()
+            self._bytes = 0
+
+    @staticmethod
+    def _base_key(event: Dict) -> Optional[_Key]:
+        try:
+            method = request_method(event)
+        except (KeyError, TypeError):  # not an HTTP event
+            return None
+        if method not in ('GET', 'HEAD'):
+            return None
+        if request_header(event, 'authorization') is not None:
+            return None
+        return (method, request_path(event),
+                tuple(sorted(request_query(event))))
+
+    @staticmethod
+    def _full_key(base: _Key, event: Dict, vary: Tuple[str, ...]) -> _Key:
+        if not vary:
+            return base
+        return base + tuple(request_header(event, name) for name in vary)
+
+    def _remove(self, key: _Key) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.cost
+        # the first three items of the key are the base key. Its Vary is
+        # forgotten with the last variant, so `_vary` does not grow without
+        # limit
+        base = key[:3]
+        remaining = self._variants.get(base, 1) - 1
+        if remaining > 0:
+            self._variants[base] = remaining
+        else:
+            self._variants.pop(base, None)
+            self._vary.pop(base, None)
+
+    def get(self, event: Dict) -> Optional[Dict]:
+        base = self._base_key(event)
+        if base is None:
+            return None
+        return self._get(base, event)
+
+    def put(self, event: Dict, response: Dict) -> bool:
+        """Stores the response, if it is cacheable. Returns True if stored.
+        """
+        base = self._base_key(event)
+        if base is None:
+            return False
+        return self._put(base, event, response)
+
+    def _get(self, base: _Key, event: Dict) -> Optional[Dict]:
+        with self._lock:
+            vary = self._vary.get(base)
+            if vary is None:
+                return None
+            key = self._full_key(base, event, vary)
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return _copy_response(entry.response)
+
+    def _put(self, base: _Key, event: Dict, response: Dict) -> bool:
+        if response.get('statusCode') not in CACHEABLE_STATUSES:
+            return False
+        if response.get('cookies') \
+                or response_header(response, 'set-cookie') is not None:
+            return False
+        ttl = response_ttl(response, self.default_ttl)
+        if ttl is None:
+            return False
+        vary_header = response_header(response, 'vary') or ''
+        vary = tuple(sorted(name.strip().lower()
+                            for name in vary_header.split(',')
+                            if name.strip()))
+        if '*' in vary:
+            return False
+        cost = _response_cost(response)
+        if cost > self.max_bytes:
+            return False
+
+        entry = _Entry(_copy_response(response), time.monotonic() + ttl, cost)
+        with self._lock:
+            key = self._full_key(base, event, vary)
+            if key in self._entries:
+                self._remove(key)
+            self._vary[base] = vary
+            self._variants[base] = self._variants.get(base, 0) + 1
+            self._entries[key] = entry
+            self._bytes += cost
+            while len(self._entries) > self.max_entries \
+                    or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        return True
+
+    def wrap(self, handler: AwsHandlerFunc) -> AwsHandlerFunc:
+        """Returns the handler that serves the responses from the cache,
+        and calls the `handler` only on misses."""
+
+        def caching_handler(event: Dict, context) -> Dict:
+            base = self._base_key(event)
+            if base is None:
+                return handler(event, context)
+            cached = self._get(base, event)
+            if cached is not None:
+                self.hits += 1
+                return cached
+            self.misses += 1
+            response = handler(event, context)
+            self._put(base, event, response)
+            return response
+
+        return caching_handler
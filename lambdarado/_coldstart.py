@@ -0,0 +1,140 @@
+# SPDX-FileCopyrightText: (c) 2021 Artёm IG <github.com/rtmigo>
+# SPDX-License-Identifier: MIT
+
+import builtins
+import json
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Any, Optional
+
+from lambdarado._environ import _is_true_environ
+
+# The moment when lambdarado was imported. The entry module (main.py) usually
+# imports lambdarado in its first lines, so everything between this moment
+# and the call to `start` is the import of the entry module itself
+_t_origin = time.perf_counter()
+
+_log_cold_start = _is_true_environ("LOG_COLD_START", default=False)
+
+# how many of the slowest imports to include into the report
+IMPORTS_IN_REPORT = 15
+
+
+class ImportTimer:
+    """Measures how long it takes to import each module, by temporarily
+    replacing `builtins.__import__`.
+
+    The times are inclusive: the time of importing `flask` includes the time
+    of importing `werkzeug` and `jinja2` as well.
+    """
+
+    def __init__(self) -> None:
+        self.times: Dict[str, float] = {}
+        self._original: Optional[Any] = None
+
+    def install(self) -> None:
+        if self._original is not None:
+            return
+        original = builtins.__import__
+        times = self.times
+        modules = sys.modules
+        perf_counter = time.perf_counter
+
+        def timed_import(name, globals=None, locals=None, fromlist=(),
+                         level=0):
+            if level != 0 or name in modules:
+                return original(name, globals, locals, fromlist, level)
+            started = perf_counter()
+            try:
+                return original(name, globals, locals, fromlist, level)
+            finally:
+                if name not in times:
+                    times[name] = perf_counter() - started
+
+        self._original = original
+        builtins.__import__ = timed_import
+
+    def uninstall(self) -> None:
+        if self._original is None:
+            return
+        builtins.__import__ = self._original
+        self._original = None
+
+    def heaviest(self, count: int) -> Dict[str, float]:
+        items = sorted(self.times.items(), key=lambda kv: kv[1], reverse=True)
+        return {name: _ms(seconds) for name, seconds in items[:count]}
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+class ColdStartReport:
+    """Durations of the cold start phases.
+
+    The `data` dict is updated in place: the same object is placed to
+    `app.config['cold-start']`, and it gets the time of the first invocation
+    when the invocation happens.
+    """
+
+    def __init__(self, import_timer: Optional[ImportTimer] = None):
+        self.import_timer = import_timer
+        self.data: Dict[str, Any] = {"phases_ms": {}, "imports_ms": {}}
+        self.emitted = False
+        self._phases: Dict[str, float] = {}
+        self._marks: Dict[str, float] = {}
+
+    def add(self, phase: str, seconds: float) -> None:
+        # the same phase may happen twice, when awslambdaric re-imports
+        # the entry module. We sum the durations
+        self._phases[phase] = self._phases.get(phase, 0.0) + seconds
+        self.data["phases_ms"][phase] = _ms(self._phases[phase])
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def mark(self, name: str) -> None:
+        """Remembers the moment, if it was not remembered before."""
+        self._marks.setdefault(name, time.perf_counter())
+
+    def entered_start(self) -> None:
+        if "entry_module_import" not in self._phases:
+            self.add("entry_module_import", time.perf_counter() - _t_origin)
+
+    def first_invocation(self) -> None:
+        now = time.perf_counter()
+        ric_started = self._marks.get("ric_main")
+        if ric_started is not None:
+            self.add("ric_bootstrap", now - ric_started)
+        self.add("until_first_invocation", now - _t_origin)
+        self.finish()
+
+    def finish(self) -> None:
+        """Stops measuring imports, and prints the report as a single JSON
+        line when LOG_COLD_START is set."""
+        if self.emitted:
+            return
+        self.emitted = True
+        if self.import_timer is not None:
+            self.import_timer.uninstall()
+            self.data["imports_ms"] = self.import_timer.heaviest(
+                IMPORTS_IN_REPORT)
+        if _log_cold_start:
+            print(json.dumps({"lambdarado": "cold-start", **self.data},
+                             separators=(',', ':')))
+
+
+_import_timer: Optional[ImportTimer] = None
+if _log_cold_start:
+    _import_timer = ImportTimer()
+    _import_timer.install()
+
+# shared by all the calls to `start`, since the entry module may be imported
+# twice in the same process
+cold_start_report = ColdStartReport(_import_timer)
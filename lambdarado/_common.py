@@ -1,8 +1,57 @@
 # SPDX-FileCopyrightText: (c) 2021 Artёm IG <github.com/rtmigo>
 # SPDX-License-Identifier: MIT
 
-from aws_lambda_context import LambdaContext
-from typing import Callable, Dict
+import atexit
+import inspect
+import signal
+import sys
+import threading
+from typing import Any, Callable, Dict, TYPE_CHECKING
 
-AwsHandlerFunc = Callable[[Dict, LambdaContext], Dict]
+if TYPE_CHECKING:
+    # only for the annotations: the module is not needed at runtime
+    from aws_lambda_context import LambdaContext
+
+AwsHandlerFunc = Callable[[Dict, 'LambdaContext'], Dict]
 WrapAwsHandlerFunc = Callable[[AwsHandlerFunc], AwsHandlerFunc]
+
+
+def chain_wrappers(*wrappers: WrapAwsHandlerFunc) -> WrapAwsHandlerFunc:
+    """Combines several wrappers into one, that can be passed to
+    `start(wrap_handler=...)`. The first wrapper will be the outermost:
+    it receives the event first and the response last.
+    """
+
+    def wrap(handler: AwsHandlerFunc) -> AwsHandlerFunc:
+        for wrapper in reversed(wrappers):
+            handler = wrapper(handler)
+        return handler
+
+    return wrap
+
+
+def is_asgi_app(app) -> bool:
+    """Returns True if `app` looks like an ASGI app, i.e. is an async
+    callable."""
+    if inspect.iscoroutinefunction(app):
+        return True
+    return inspect.iscoroutinefunction(getattr(app, '__call__', None))
+
+
+def call_on_shutdown(func: Callable[[], Any]) -> None:
+    """Calls `func` at exit and on SIGTERM, which the Lambda service sends
+    to the runtime before shutting the instance down (when the function has
+    extensions). The previous SIGTERM handler is called after `func`."""
+    atexit.register(func)
+    if threading.current_thread() is not threading.main_thread():
+        return
+    previous = signal.getsignal(signal.SIGTERM)
+
+    def on_sigterm(signum, frame):
+        func()
+        if callable(previous):
+            previous(signum, frame)
+        else:
+            sys.exit(0)
+
+    signal.signal(signal.SIGTERM, on_sigterm)
@@ -0,0 +1,190 @@
+# SPDX-FileCopyrightText: (c) 2021 Artёm IG <github.com/rtmigo>
+# SPDX-License-Identifier: MIT
+
+# The time budget of the invocation.
+#
+# The deadline is taken from the `context.get_remaining_time_in_millis()`
+# minus the safety margin. The app can read it to set the timeouts of the
+# downstream calls. When the deadline passes, the client receives a 504
+# instead of the opaque error of the killed invocation: the app runs in
+# a thread that is left behind, or it is interrupted with a signal.
+
+import contextvars
+import signal
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from lambdarado._common import AwsHandlerFunc, WrapAwsHandlerFunc
+
+# the time.monotonic() of the deadline of the current invocation
+_deadline: contextvars.ContextVar[Optional[float]] = \
+    contextvars.ContextVar('lambdarado_deadline', default=None)
+
+
+class DeadlineExceeded(BaseException):
+    """Raised in the app when the deadline passes. It is not an `Exception`,
+    so the error handlers of the app (e.g. Flask) do not turn it into
+    a regular 500 response."""
+
+
+def current_deadline() -> Optional[float]:
+    """Returns the `time.monotonic()` value of the deadline of the current
+    invocation, or None if there is no deadline. The same value is in
+    `environ['lambdarado.deadline']`."""
+    return _deadline.get()
+
+
+def remaining_time() -> Optional[float]:
+    """Returns the seconds left until the deadline of the current invocation
+    (not negative), or None if there is no deadline.
+
+        requests.get(url, timeout=lambdarado.remaining_time())
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def _can_interrupt() -> bool:
+    return hasattr(signal, 'setitimer') \
+        and threading.current_thread() is threading.main_thread()
+
+
+def _in_event_loop() -> bool:
+    asyncio = sys.modules.get('asyncio')
+    if asyncio is None:
+        return False
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _raise_deadline_exceeded(signum, frame) -> None:
+    if _in_event_loop():
+        # the exception would break the persistent event loop of the ASGI
+        # app, that serves the next invocations as well
+        print('The deadline passed, but the event loop is not interrupted')
+        return
+    raise DeadlineExceeded()
+
+
+def _error_response(event: Dict, status: int, body: str) -> Dict[str, Any]:
+    from http import HTTPStatus
+    from lambdarado._http_event import event_format, format_response
+    fmt = event_format(event)
+    status_line = f'{status} {HTTPStatus(status).phrase}'
+    assert fmt is not None
+    return format_response(event, fmt, status_line,
+                           [('Content-Type', 'application/json')],
+                           body.encode('utf-8'))
+
+
+def deadline_wrapper(margin_ms: int = 500,
+                     timeout_status: int = 504,
+                     early_status: int = 503,
+                     interrupt: bool = False) -> WrapAwsHandlerFunc:
+    """Creates a wrapper for `start(wrap_handler=...)`, that sets the
+    deadline of each invocation `margin_ms` before the Lambda timeout.
+
+    If the time is already over when the HTTP request arrives, the app is
+    not called and the `early_status` is returned. Otherwise the app runs
+    in a separate thread, and if it does not finish before the deadline,
+    the `timeout_status` is returned. The app is not stopped: it finishes
+    in the background (when the instance is thawed by the next invocation,
+    concurrently with it), and its response is dropped.
+
+    If `interrupt` is True, the app runs in the calling thread instead, and
+    it is interrupted with `DeadlineExceeded` when the deadline passes. The
+    interruption uses SIGALRM, so it only works when the handler runs in the
+    main thread, and it is skipped while an asyncio event loop runs (the
+    ASGI apps, that get no `timeout_status` in this mode).
+
+    The interruption may happen anywhere in the app: inside a database
+    driver, a connection pool, or while a lock is held. The warm instance
+    keeps all of them for the next invocations, so it is unsafe for the
+    apps with pooled connections or other shared state.
+
+    The non-HTTP events get the deadline, but are never interrupted.
+    """
+
+    def wrap(handler: AwsHandlerFunc) -> AwsHandlerFunc:
+        from lambdarado._http_event import event_format
+
+        def deadline_handler(event: Dict, context) -> Dict:
+            get_remaining = getattr(context, 'get_remaining_time_in_millis',
+                                    None)
+            if get_remaining is None:
+                return handler(event, context)
+            budget = (get_remaining() - margin_ms) / 1000
+            token = _deadline.set(time.monotonic() + budget)
+            try:
+                is_http = isinstance(event, dict) \
+                    and event_format(event) is not None
+                if not is_http:
+                    return handler(event, context)
+                if budget <= 0:
+                    return _error_response(
+                        event, early_status,
+                        '{"message":"Not enough time to process '
+                        'the request"}')
+                if interrupt and _can_interrupt():
+                    return _call_with_alarm(handler, event, context, budget,
+                                            timeout_status)
+                return _call_in_thread(handler, event, context, budget,
+                                       timeout_status)
+            finally:
+                _deadline.reset(token)
+
+        return deadline_handler
+
+    return wrap
+
+
+def _timeout_response(event: Dict, timeout_status: int) -> Dict[str, Any]:
+    print(f'The deadline passed, responding with {timeout_status}')
+    return _error_response(event, timeout_status,
+                           '{"message":"The request took too long"}')
+
+
+def _call_in_thread(handler: AwsHandlerFunc, event: Dict, context,
+                    budget: float, timeout_status: int) -> Dict:
+    done = threading.Event()
+    outcome: Dict[str, Any] = {}
+    # the app sees the deadline and the other context variables
+    run_context = contextvars.copy_context()
+
+    def run() -> None:
+        try:
+            outcome['response'] = run_context.run(handler, event, context)
+        except BaseException as e:
+            outcome['error'] = e
+        finally:
+            done.set()
+
+    threading.Thread(target=run, name='lambdarado-handler',
+                     daemon=True).start()
+    if not done.wait(budget):
+        return _timeout_response(event, timeout_status)
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['response']
+
+
+def _call_with_alarm(handler: AwsHandlerFunc, event: Dict, context,
+                     budget: float, timeout_status: int) -> Dict:
+    previous = signal.signal(signal.SIGALRM, _raise_deadline_exceeded)
+    try:
+        try:
+            signal.setitimer(signal.ITIMER_REAL, budget)
+            return handler(event, context)
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    except DeadlineExceeded:
+        return _timeout_response(event, timeout_status)
+    finally:
+        signal.signal(signal.SIGALRM, previous)
@@ -0,0 +1,713 @@
+# SPDX-FileCopyrightText: (c) 2021 Artёm IG <github.com/rtmigo>
+# SPDX-License-Identifier: MIT
+
+# A local stand-in for the AWS Lambda Runtime API.
+#
+# The entry module is started as a subprocess with AWS_LAMBDA_RUNTIME_API
+# pointing to the emulator, so `start` takes the same path as in the AWS:
+# it creates the handler and runs `awslambdaric`. The emulator queues
+# the invocations, gives them to the runtime, and records how long the init
+# and each invocation took.
+#
+# The HTTP requests to the front server are converted to API Gateway
+# (HTTP API) or Function URL events, so the image can be tested with
+# a browser or curl. The streamed responses are recorded chunk by chunk,
+# with the time each chunk arrived.
+#
+# The Extensions API is served as well. The next invocation is given to the
+# runtime only when the extensions have asked for the next event, like the
+# Lambda service does before freezing the instance.
+
+import base64
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from lambdarado._streaming import PRELUDE_SEPARATOR
+
+RUNTIME_PREFIX = '/2018-06-01/runtime'
+EXTENSION_PREFIX = '/2020-01-01/extension'
+
+
+class Invocation:
+    """A single invocation and what happened to it."""
+
+    def __init__(self, event: Any, timeout: float) -> None:
+        self.request_id = str(uuid.uuid4())
+        self.payload = json.dumps(event).encode('utf-8')
+        self.timeout = timeout
+        self.deadline_ms = 0
+        self.cold = False
+        self.queued = time.monotonic()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.response: Optional[bytes] = None
+        self.error: Optional[Dict] = None
+        self.done = threading.Event()
+        # set when the prelude of the streamed response arrives,
+        # or when the invocation is done
+        self.responding = threading.Event()
+        # the prelude (status, headers, cookies) of the streamed response
+        self.prelude: Optional[Dict] = None
+        # the body chunks of the streamed response with their arrival times
+        self.chunks: List[Tuple[float, bytes]] = []
+        self._stream: 'queue.Queue[Optional[bytes]]' = queue.Queue()
+        # set when the response is posted and the extensions are done with
+        # the invocation
+        self.released = threading.Event()
+        self.released_at: Optional[float] = None
+        self._extensions_left = 0
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if self.started is None or self.finished is None:
+            return None
+        return round((self.finished - self.started) * 1000, 3)
+
+    @property
+    def first_byte_ms(self) -> Optional[float]:
+        """The time from the start to the first chunk of the streamed
+        response."""
+        if self.started is None or not self.chunks:
+            return None
+        return round((self.chunks[0][0] - self.started) * 1000, 3)
+
+    @property
+    def post_response_ms(self) -> Optional[float]:
+        """The time the extensions worked after the response."""
+        if self.finished is None or self.released_at is None:
+            return None
+        return round(max(0.0, self.released_at - self.finished) * 1000, 3)
+
+    def _release_if_done(self) -> None:
+        if self._extensions_left <= 0 and self.done.is_set() \
+                and not self.released.is_set():
+            self.released_at = time.monotonic()
+            self.released.set()
+
+    def _add_chunk(self, data: bytes) -> None:
+        self.chunks.append((time.monotonic(), data))
+        self._stream.put(data)
+
+    def result(self) -> Any:
+        """Returns the decoded response, or raises RuntimeError if the
+        invocation failed or timed out. For the streamed responses returns
+        the prelude with the `body` bytes."""
+        if self.error is not None:
+            raise RuntimeError(f'Invocation failed: {self.error}')
+        if self.response is None:
+            raise RuntimeError('Invocation timed out')
+        if self.prelude is not None:
+            return dict(self.prelude, body=self.response)
+        return json.loads(self.response) if self.response else None
+
+    def record(self) -> Dict[str, Any]:
+        record = {'requestId': self.request_id,
+                  'cold': self.cold,
+                  'durationMs': self.duration_ms,
+                  'error': self.error is not None,
+                  'timedOut': self.response is None and self.error is None}
+        if self.post_response_ms is not None:
+            record['postResponseMs'] = self.post_response_ms
+        if self.prelude is not None:
+            record['streamed'] = True
+            record['firstByteMs'] = self.first_byte_ms
+            record['chunks'] = len(self.chunks)
+        return record
+
+
+_TRACE_ID = 'Root=1-00000000-000000000000000000000000;Sampled=0'
+
+
+def _read_body(handler: BaseHTTPRequestHandler) -> bytes:
+    if 'chunked' in handler.headers.get('Transfer-Encoding', '').lower():
+        chunks = []
+        while True:
+            size = int(handler.rfile.readline().split(b';')[0].strip(), 16)
+            if size == 0:
+                handler.rfile.readline()
+                break
+            chunks.append(handler.rfile.read(size))
+            handler.rfile.readline()
+        return b''.join(chunks)
+    length = int(handler.headers.get('Content-Length') or 0)
+    return handler.rfile.read(length) if length else b''
+
+
+class _Extension:
+    def __init__(self, name: str, events: Sequence[str]) -> None:
+        self.identifier = str(uuid.uuid4())
+        self.name = name
+        self.events = list(events)
+        # the events with the invocations they are about
+        self.queue: 'queue.Queue[Tuple[Dict[str, Any], Optional[Invocation]]]'\
+            = queue.Queue()
+        # the invocation the extension has not finished yet
+        self.invocation: Optional[Invocation] = None
+
+
+class RuntimeApiEmulator:
+    """Serves the Runtime API on `host:port` (the port is chosen
+    automatically when 0)."""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 function_name: str = 'lambdarado-local',
+                 memory_size: int = 128) -> None:
+        self.function_name = function_name
+        self.memory_size = memory_size
+        self.invocations: List[Invocation] = []
+        self.init_error: Optional[Dict] = None
+        self.init_duration_ms: Optional[float] = None
+        self.process: Optional[subprocess.Popen] = None
+
+        self._pending: 'queue.Queue[Invocation]' = queue.Queue()
+        self.extensions: Dict[str, _Extension] = {}
+        self._last: Optional[Invocation] = None
+        self._by_id: Dict[str, Invocation] = {}
+        self._launched: Optional[float] = None
+        self._first_invocation_pending = True
+        self._ready = threading.Event()
+        self._closing = False
+        self._lock = threading.Lock()
+
+        self._server = ThreadingHTTPServer((host, port),
+                                           self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'{host!s}:{port}'
+
+    def start(self) -> 'RuntimeApiEmulator':
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name='lambdarado-runtime-api',
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        for extension in list(self.extensions.values()):
+            if 'SHUTDOWN' in extension.events:
+                extension.queue.put(({'eventType': 'SHUTDOWN',
+                                      'shutdownReason': 'spindown',
+                                      'deadlineMs': int(time.time() * 1000)
+                                      + 2000}, None))
+        self._closing = True
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'RuntimeApiEmulator':
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def environ(self) -> Dict[str, str]:
+        """The environment variables for the function process."""
+        version = f'{sys.version_info[0]}.{sys.version_info[1]}'
+        return {
+            'AWS_LAMBDA_RUNTIME_API': self.address,
+            'AWS_EXECUTION_ENV': f'AWS_Lambda_python{version}',
+            'AWS_LAMBDA_FUNCTION_NAME': self.function_name,
+            'AWS_LAMBDA_FUNCTION_VERSION': '$LATEST',
+            'AWS_LAMBDA_FUNCTION_MEMORY_SIZE': str(self.memory_size),
+            'AWS_LAMBDA_LOG_GROUP_NAME': f'/aws/lambda/{self.function_name}',
+            'AWS_LAMBDA_LOG_STREAM_NAME': 'local',
+            'AWS_REGION': 'us-east-1',
+            'AWS_DEFAULT_REGION': 'us-east-1',
+        }
+
+    def launch(self, args: Sequence[str], cwd: Optional[str] = None,
+               env: Optional[Dict[str, str]] = None,
+               stdout=None, stderr=None) -> subprocess.Popen:
+        """Starts the function process, e.g. `['python3', 'main.py']`.
+        The `stdout` and `stderr` are passed to `subprocess.Popen`."""
+        full_env = dict(os.environ)
+        full_env.update(self.environ())
+        if env:
+            full_env.update(env)
+        self._launched = time.monotonic()
+        self._first_invocation_pending = True
+        self._ready.clear()
+        self.init_duration_ms = None
+        self.extensions.clear()
+        self._last = None
+        self.process = subprocess.Popen(list(args), cwd=cwd, env=full_env,
+                                        stdout=stdout, stderr=stderr)
+        return self.process
+
+    def wait_ready(self, timeout: float = 30) -> bool:
+        """Waits until the runtime asks for the first invocation."""
+        return self._ready.wait(timeout)
+
+    def submit(self, event: Any, timeout: float = 30) -> Invocation:
+        """Queues the invocation without waiting for it."""
+        invocation = Invocation(event, timeout)
+        with self._lock:
+            self._by_id[invocation.request_id] = invocation
+            self.invocations.append(invocation)
+        self._pending.put(invocation)
+        return invocation
+
+    def wait(self, invocation: Invocation) -> Invocation:
+        """Waits until the invocation is done or timed out."""
+        if not invocation.done.wait(invocation.timeout):
+            invocation.finished = time.monotonic()
+            # not waiting for the extensions of the timed out invocation
+            invocation.released.set()
+        return invocation
+
+    def invoke(self, event: Any, timeout: float = 30) -> Invocation:
+        """Queues the invocation and waits for the runtime to process it."""
+        return self.wait(self.submit(event, timeout))
+
+    def stats(self) -> Dict[str, Any]:
+        return {'initDurationMs': self.init_duration_ms,
+                'invocations': [i.record() for i in self.invocations]}
+
+    # runtime side
+
+    def _next(self) -> Optional[Invocation]:
+        if not self._ready.is_set():
+            if self._launched is not None:
+                self.init_duration_ms = round(
+                    (time.monotonic() - self._launched) * 1000, 3)
+            self._ready.set()
+        while not self._closing:
+            last = self._last
+            if last is not None and not last.released.wait(0.5):
+                # the extensions are still working on the last invocation
+                continue
+            try:
+                invocation = self._pending.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            invocation.started = time.monotonic()
+            invocation.deadline_ms = int(
+                (time.time() + invocation.timeout) * 1000)
+            invocation.cold = self._first_invocation_pending
+            self._first_invocation_pending = False
+            self._last = invocation
+            self._notify_extensions(invocation)
+            return invocation
+        return None
+
+    def _notify_extensions(self, invocation: Invocation) -> None:
+        with self._lock:
+            extensions = [e for e in self.extensions.values()
+                          if 'INVOKE' in e.events]
+            invocation._extensions_left = len(extensions)
+        for extension in extensions:
+            extension.queue.put(({
+                'eventType': 'INVOKE',
+                'requestId': invocation.request_id,
+                'deadlineMs': invocation.deadline_ms,
+                'invokedFunctionArn': self._function_arn(),
+                'tracing': {'type': 'X-Amzn-Trace-Id',
+                            'value': _TRACE_ID},
+            }, invocation))
+
+    def _function_arn(self) -> str:
+        return ('arn:aws:lambda:us-east-1:000000000000:function:'
+                + self.function_name)
+
+    # extensions side
+
+    def _register_extension(self, name: str, events: Sequence[str]
+                            ) -> _Extension:
+        extension = _Extension(name, events)
+        with self._lock:
+            self.extensions[extension.identifier] = extension
+        return extension
+
+    def _next_extension_event(self, identifier: str
+                              ) -> Optional[Dict[str, Any]]:
+        extension = self.extensions.get(identifier)
+        if extension is None:
+            return None
+        invocation = extension.invocation
+        if invocation is not None:
+            # the extension is done with the invocation
+            extension.invocation = None
+            with self._lock:
+                invocation._extensions_left -= 1
+                invocation._release_if_done()
+        while not self._closing or not extension.queue.empty():
+            try:
+                event, extension.invocation = extension.queue.get(
+                    timeout=0.5)
+            except queue.Empty:
+                continue
+            return event
+        return None
+
+    def _finish(self, request_id: str, response: Optional[bytes] = None,
+                error: Optional[Dict] = None) -> bool:
+        invocation = self._by_id.get(request_id)
+        if invocation is None:
+            return False
+        invocation.finished = time.monotonic()
+        invocation.response = response
+        invocation.error = error
+        invocation._stream.put(None)
+        invocation.done.set()
+        invocation.responding.set()
+        with self._lock:
+            invocation._release_if_done()
+        return True
+
+    def _receive_stream(self, request_id: str, rfile) -> bool:
+        """Reads the streamed response chunk by chunk."""
+        invocation = self._by_id.get(request_id)
+        buffer = b''
+        body: List[bytes] = []
+        while True:
+            size = int(rfile.readline().split(b';')[0].strip(), 16)
+            if size == 0:
+                break
+            data = rfile.read(size)
+            rfile.readline()
+            if invocation is None:
+                continue
+            if invocation.prelude is None:
+                buffer += data
+                index = buffer.find(PRELUDE_SEPARATOR)
+                if index < 0:
+                    continue
+                invocation.prelude = json.loads(buffer[:index])
+                invocation.responding.set()
+                data = buffer[index + len(PRELUDE_SEPARATOR):]
+            if data:
+                body.append(data)
+                invocation._add_chunk(data)
+
+        trailers: Dict[str, str] = {}
+        while True:
+            line = rfile.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            trailers[name.strip().lower()] = value.strip()
+
+        error = None
+        error_type = trailers.get('lambda-runtime-function-error-type')
+        if error_type:
+            encoded = trailers.get('lambda-runtime-function-error-body')
+            error = json.loads(base64.b64decode(encoded)) if encoded \
+                else {'errorType': error_type}
+        if invocation is not None and invocation.prelude is None:
+            body = [buffer]
+        return self._finish(request_id, response=b''.join(body),
+                            error=error)
+
+    def _make_handler(self):
+        emulator = self
+
+        class RuntimeHandler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args) -> None:
+                pass
+
+            def _reply(self, status: int, body: bytes = b'',
+                       headers: Optional[Dict[str, str]] = None) -> None:
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self) -> None:
+                if self.path == EXTENSION_PREFIX + '/event/next':
+                    event = emulator._next_extension_event(
+                        self.headers.get('Lambda-Extension-Identifier', ''))
+                    if event is None:
+                        self._reply(403)
+                        return
+                    self._reply(200, json.dumps(event).encode('utf-8'),
+                                {'Content-Type': 'application/json'})
+                    return
+                if self.path != RUNTIME_PREFIX + '/invocation/next':
+                    self._reply(404)
+                    return
+                invocation = emulator._next()
+                if invocation is None:
+                    self._reply(503)
+                    return
+                self._reply(200, invocation.payload, {
+                    'Content-Type': 'application/json',
+                    'Lambda-Runtime-Aws-Request-Id': invocation.request_id,
+                    'Lambda-Runtime-Deadline-Ms': str(invocation.deadline_ms),
+                    'Lambda-Runtime-Invoked-Function-Arn':
+                        emulator._function_arn(),
+                    'Lambda-Runtime-Trace-Id': _TRACE_ID,
+                })
+
+            def do_POST(self) -> None:
+                path = self.path
+                mode = self.headers.get(
+                    'Lambda-Runtime-Function-Response-Mode', '')
+                if mode.lower() == 'streaming' \
+                        and path.endswith('/response'):
+                    request_id = path[len(RUNTIME_PREFIX + '/invocation/'):
+                                      -len('/response')]
+                    found = emulator._receive_stream(request_id, self.rfile)
+                    self._reply(202 if found else 404)
+                    return
+                body = _read_body(self)
+                if path == EXTENSION_PREFIX + '/register':
+                    request = json.loads(body or b'{}')
+                    extension = emulator._register_extension(
+                        self.headers.get('Lambda-Extension-Name', ''),
+                        request.get('events', []))
+                    self._reply(200, json.dumps({
+                        'functionName': emulator.function_name,
+                        'functionVersion': '$LATEST',
+                        'handler': '',
+                    }).encode('utf-8'), {
+                        'Content-Type': 'application/json',
+                        'Lambda-Extension-Identifier': extension.identifier})
+                    return
+                if path == RUNTIME_PREFIX + '/init/error':
+                    emulator.init_error = json.loads(body or b'{}')
+                    self._reply(202)
+                    return
+                prefix = RUNTIME_PREFIX + '/invocation/'
+                if not path.startswith(prefix):
+                    self._reply(404)
+                    return
+                request_id, _, action = path[len(prefix):].partition('/')
+                if action == 'response':
+                    found = emulator._finish(request_id, response=body)
+                elif action == 'error':
+                    found = emulator._finish(
+                        request_id, error=json.loads(body or b'{}'))
+                else:
+                    found = False
+                self._reply(202 if found else 404)
+
+        return RuntimeHandler
+
+
+def http_request_to_event(method: str, path: str, headers: Dict[str, str],
+                          body: bytes, source_ip: str = '127.0.0.1',
+                          domain_name: str = 'localhost') -> Dict[str, Any]:
+    """Creates the API Gateway HTTP API (payload 2.0) event."""
+    raw_path, _, query = path.partition('?')
+    lower_headers: Dict[str, str] = {}
+    cookies: List[str] = []
+    for name, value in headers.items():
+        name = name.lower()
+        if name == 'cookie':
+            cookies.extend(c.strip() for c in value.split(';') if c.strip())
+            continue
+        previous = lower_headers.get(name)
+        lower_headers[name] = value if previous is None \
+            else previous + ',' + value
+    now = time.time()
+    event: Dict[str, Any] = {
+        'version': '2.0',
+        'routeKey': '$default',
+        'rawPath': raw_path,
+        'rawQueryString': query,
+        'headers': lower_headers,
+        'requestContext': {
+            'accountId': 'anonymous',
+            'apiId': 'local',
+            'domainName': domain_name,
+            'domainPrefix': domain_name.split('.')[0],
+            'http': {
+                'method': method,
+                'path': raw_path,
+                'protocol': 'HTTP/1.1',
+                'sourceIp': source_ip,
+                'userAgent': lower_headers.get('user-agent', ''),
+            },
+            'requestId': str(uuid.uuid4()),
+            'routeKey': '$default',
+            'stage': '$default',
+            'timeEpoch': int(now * 1000),
+        },
+        'isBase64Encoded': bool(body),
+    }
+    if cookies:
+        event['cookies'] = cookies
+    if body:
+        event['body'] = base64.b64encode(body).decode('ascii')
+    return event
+
+
+class FrontServer:
+    """Accepts HTTP requests, invokes the function through the emulator,
+    and returns the function responses as HTTP responses."""
+
+    def __init__(self, emulator: RuntimeApiEmulator,
+                 host: str = '127.0.0.1', port: int = 5000,
+                 timeout: float = 30,
+                 on_invocation=None,
+                 domain_name: str = 'localhost') -> None:
+        """Set the `domain_name` like 'abc.lambda-url.us-east-1.on.aws'
+        to send the Function URL events instead of the HTTP API ones."""
+        self.emulator = emulator
+        self.timeout = timeout
+        self.on_invocation = on_invocation
+        self.domain_name = domain_name
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def shutdown(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _make_handler(self):
+        front = self
+
+        class FrontHandler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args) -> None:
+                pass
+
+            def _handle(self) -> None:
+                body = _read_body(self)
+                headers: Dict[str, str] = {}
+                for name, value in self.headers.items():
+                    previous = headers.get(name)
+                    headers[name] = value if previous is None \
+                        else previous + ',' + value
+                event = http_request_to_event(self.command, self.path,
+                                              headers, body,
+                                              self.client_address[0],
+                                              front.domain_name)
+                invocation = front.emulator.submit(event, front.timeout)
+                invocation.responding.wait(front.timeout)
+                if invocation.prelude is not None:
+                    self._stream(invocation)
+                front.emulator.wait(invocation)
+                if front.on_invocation is not None:
+                    front.on_invocation(invocation)
+                if invocation.prelude is None:
+                    self._respond(invocation)
+
+            def _stream(self, invocation: Invocation) -> None:
+                prelude = invocation.prelude or {}
+                self.send_response(prelude.get('statusCode', 200))
+                for name, value in (prelude.get('headers') or {}).items():
+                    if name.lower() not in ('content-length', 'connection',
+                                            'transfer-encoding'):
+                        self.send_header(name, value)
+                for cookie in prelude.get('cookies') or []:
+                    self.send_header('Set-Cookie', cookie)
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                deadline = time.monotonic() + invocation.timeout
+                while True:
+                    try:
+                        data = invocation._stream.get(
+                            timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if data is None:
+                        break
+                    self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+                    self.wfile.flush()
+                self.wfile.write(b'0\r\n\r\n')
+
+            def _respond(self, invocation: Invocation) -> None:
+                if invocation.error is not None:
+                    self._send(502, {}, [],
+                               b'{"message":"Internal Server Error"}')
+                    return
+                if invocation.response is None:
+                    self._send(504, {}, [],
+                               b'{"message":"Endpoint request timed out"}')
+                    return
+                response = json.loads(invocation.response)
+                if not isinstance(response, dict) \
+                        or 'statusCode' not in response:
+                    self._send(200, {'content-type': 'application/json'}, [],
+                               invocation.response)
+                    return
+                body = response.get('body') or ''
+                if response.get('isBase64Encoded'):
+                    data = base64.b64decode(body)
+                else:
+                    data = body.encode('utf-8')
+                headers = dict(response.get('headers') or {})
+                for name, values in (response.get('multiValueHeaders')
+                                     or {}).items():
+                    headers[name] = ','.join(values)
+                self._send(response['statusCode'], headers,
+                           response.get('cookies') or [], data)
+
+            def _send(self, status: int, headers: Dict[str, str],
+                      cookies: List[str], body: bytes) -> None:
+                self.send_response(status)
+                for name, value in headers.items():
+                    if name.lower() not in ('content-length', 'connection',
+                                            'transfer-encoding'):
+                        self.send_header(name, value)
+                for cookie in cookies:
+                    self.send_header('Set-Cookie', cookie)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self.wfile.write(body)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _handle
+            do_HEAD = do_OPTIONS = _handle
+
+        return FrontHandler
+
+
+def run_emulator(args: Sequence[str], port: int = 5000,
+                 host: str = '127.0.0.1', timeout: float = 30,
+                 cwd: Optional[str] = None,
+                 function_url: bool = False) -> None:
+    """Runs the function process under the emulator, and serves HTTP
+    requests on `host:port` until interrupted. Prints a JSON line for each
+    invocation."""
+    with RuntimeApiEmulator() as emulator:
+        def print_invocation(invocation: Invocation) -> None:
+            record = invocation.record()
+            if invocation.cold:
+                record['initDurationMs'] = emulator.init_duration_ms
+            print(json.dumps({'lambdarado': 'invocation', **record},
+                             separators=(',', ':')), flush=True)
+
+        domain_name = f'{emulator.function_name}.lambda-url.us-east-1.on.aws' \
+            if function_url else 'localhost'
+        front = FrontServer(emulator, host, port, timeout, print_invocation,
+                            domain_name)
+        emulator.launch(args, cwd=cwd)
+        print(f'Runtime API emulator on {emulator.address}, '
+              f'serving http://{host}:{front.port}', flush=True)
+        try:
+            front.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            front.shutdown()
@@ -0,0 +1,48 @@
+# SPDX-FileCopyrightText: (c) 2021 Artёm IG <github.com/rtmigo>
+# SPDX-License-Identifier: MIT
+
+import os
+from typing import List
+
+
+def _is_true_environ(key: str, default: bool = False) -> bool:
+    value = os.environ.get(key)
+    if value is None:
+        return default
+    value = value.strip()
+    if value.isdigit():
+        return int(value) != 0
+    value = value.lower()
+    if value == 'true':
+        return True
+    if value == 'false':
+        return False
+    return default
+
+
+def _float_environ(key: str, default: float) -> float:
+    value = os.environ.get(key)
+    if value is None:
+        return default
+    try:
+        return float(value.strip())
+    except ValueError:
+        return default
+
+
+def _int_environ(key: str, default: int) -> int:
+    value = os.environ.get(key)
+    if value is None:
+        return default
+    try:
+        return int(value.strip())
+    except ValueError:
+        return default
+
+
+def _list_environ(key: str) -> List[str]:
+    """Parses comma-separated list."""
+    value = os.environ.get(key)
+    if value is None:
+        return []
+    return [item.strip() for item in value.split(',') if item.strip()]
@@ -0,0 +1,173 @@
+# SPDX-FileCopyrightText: (c) 2021 Artёm IG <github.com/rtmigo>
+# SPDX-License-Identifier: MIT
+
+# Dispatches non-HTTP events (SQS, Kinesis, DynamoDB streams, SNS,
+# EventBridge) to the routes of the same WSGI app that serves HTTP.
+#
+# Each record of a batch becomes a POST request with the record as JSON body.
+# The records run concurrently on a thread pool, and the failed ones are
+# reported in `batchItemFailures`, so Lambda retries only them.
+
+import json
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Mapping, Optional
+
+from lambdarado._common import AwsHandlerFunc
+from lambdarado._http_event import request_environ, call_wsgi
+
+SOURCE_SQS = 'aws:sqs'
+SOURCE_KINESIS = 'aws:kinesis'
+SOURCE_DYNAMODB = 'aws:dynamodb'
+SOURCE_SNS = 'aws:sns'
+# the key of `event_routes` that matches any EventBridge event
+SOURCE_EVENTBRIDGE = 'aws:eventbridge'
+
+# the sources that support the partial batch responses
+_PARTIAL_BATCH_SOURCES = (SOURCE_SQS, SOURCE_KINESIS, SOURCE_DYNAMODB)
+
+
+def event_source(event: Dict) -> Optional[str]:
+    """Returns the `eventSource` of the records, or the `source` of the
+    EventBridge event. Returns None for other events (e.g. HTTP)."""
+    records = event.get('Records')
+    if records:
+        first = records[0]
+        return first.get('eventSource') or first.get('EventSource')
+    if 'detail-type' in event:
+        return event.get('source')
+    return None
+
+
+def _item_identifier(source: str, record: Dict) -> Optional[str]:
+    if source == SOURCE_SQS:
+        return record.get('messageId')
+    if source == SOURCE_KINESIS:
+        return record.get('kinesis', {}).get('sequenceNumber')
+    if source == SOURCE_DYNAMODB:
+        return record.get('dynamodb', {}).get('SequenceNumber')
+    return None
+
+
+def _ordering_key(source: str, record: Dict) -> Optional[str]:
+    """Records with the same key must be processed in order. Returns None
+    for the records that can be processed in any order."""
+    if source == SOURCE_SQS:
+        return record.get('attributes', {}).get('MessageGroupId')
+    if source == SOURCE_KINESIS:
+        return record.get('kinesis', {}).get('partitionKey')
+    if source == SOURCE_DYNAMODB:
+        keys = record.get('dynamodb', {}).get('Keys')
+        return json.dumps(keys, sort_keys=True) if keys else None
+    return None
+
+
+class EventDispatcher:
+    """Posts the records of non-HTTP events to the routes of the app.
+
+    `routes` maps the event sources (like 'aws:sqs', or the `source` of an
+    EventBridge event, or 'aws:eventbridge' for any EventBridge event)
+    to the paths.
+    """
+
+    def __init__(self, wsgi_app, routes: Mapping[str, str],
+                 max_workers: int = 8) -> None:
+        self.wsgi_app = wsgi_app
+        self.routes = dict(routes)
+        self.max_workers = max_workers
+        # created once and reused by the warm invocations
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def route(self, source: Optional[str], event: Dict) -> Optional[str]:
+        if source is None:
+            return None
+        path = self.routes.get(source)
+        if path is None and 'detail-type' in event:
+            path = self.routes.get(SOURCE_EVENTBRIDGE)
+        return path
+
+    def _post(self, path: str, source: str, payload: Any, event: Dict,
+              context: Any) -> bool:
+        """Returns True if the app processed the payload successfully."""
+        environ = request_environ(
+            'POST', path, json.dumps(payload).encode('utf-8'),
+            headers={'Content-Type': 'application/json',
+                     'X-Lambdarado-Event-Source': source},
+            event=event, context=context)
+        environ['wsgi.multithread'] = self.max_workers > 1
+        try:
+            response = call_wsgi(self.wsgi_app, environ)
+        except Exception:
+            traceback.print_exc()
+            return False
+        if response.status_code >= 300:
+            print(f'{source} record was rejected by {path}: '
+                  f'{response.status}')
+            return False
+        return True
+
+    def _process_group(self, path: str, source: str, records: List[Dict],
+                       event: Dict, context: Any) -> List[Dict]:
+        """Processes the records in order. After the first failure, the
+        rest of the group is reported as failed too, without processing."""
+        for index, record in enumerate(records):
+            if not self._post(path, source, record, event, context):
+                return records[index:]
+        return []
+
+    def _executor_map(self, fn, *iterables) -> List:
+        if self.max_workers <= 1:
+            return list(map(fn, *iterables))
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix='lambdarado-records')
+        return list(self._executor.map(fn, *iterables))
+
+    def dispatch(self, source: str, path: str, event: Dict,
+                 context: Any) -> Dict:
+        records = event.get('Records')
+        if records is None:
+            # EventBridge: a single event. Raising the exception makes
+            # Lambda retry the asynchronous invocation
+            if not self._post(path, source, event, event, context):
+                raise RuntimeError(f'{source} event was not processed')
+            return {}
+
+        groups: Dict[Any, List[Dict]] = {}
+        for index, record in enumerate(records):
+            key = _ordering_key(source, record)
+            # the records without ordering key go to separate groups
+            groups.setdefault(key if key is not None else ('', index),
+                              []).append(record)
+
+        failed_groups = self._executor_map(
+            lambda group: self._process_group(path, source, group, event,
+                                              context),
+            groups.values())
+        failed = [record for group in failed_groups for record in group]
+
+        if source not in _PARTIAL_BATCH_SOURCES:
+            if failed:
+                raise RuntimeError(
+                    f'{len(failed)} of {len(records)} {source} records '
+                    f'were not processed')
+            return {}
+
+        return {'batchItemFailures': [
+            {'itemIdentifier': _item_identifier(source, record)}
+            for record in failed]}
+
+    def wrap(self, http_handler: AwsHandlerFunc) -> AwsHandlerFunc:
+        """Returns the handler that dispatches the routed events, and passes
+        all the other events to `http_handler`."""
+
+        def dispatching_handler(event: Dict, context: Any) -> Dict:
+            source = event_source(event)
+            path = self.route(source, event)
+            if path is None:
+                return http_handler(event, context)
+            assert source is not None
+            return self.dispatch(source, path, event, context)
+
+        return dispatching_handler
@@ -0,0 +1,206 @@
+# SPDX-FileCopyrightText: (c) 2021 Artёm IG <github.com/rtmigo>
+# SPDX-License-Identifier: MIT
+
+# Running work after the response is returned.
+#
+# The Lambda service freezes the instance as soon as the runtime has posted
+# the response and all the extensions have asked for the next event. An
+# internal extension is a thread of the function process registered in the
+# Extensions API: while it finishes the work of the previous invocation, the
+# client already has the response, but the instance is not frozen.
+#
+# The work is queued with `after_response`. Without the extension (locally,
+# or when it is not enabled) the queued work runs right after the handler,
+# before the response is returned.
+
+import json
+import os
+import queue
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from lambdarado._common import AwsHandlerFunc, call_on_shutdown
+
+EXTENSION_PREFIX = '/2020-01-01/extension'
+EXTENSION_NAME = 'lambdarado'
+
+_Task = Tuple[Callable, tuple, dict]
+
+
+class ExtensionsApiClient:
+    """A minimal client of the Lambda Extensions API."""
+
+    def __init__(self, address: str) -> None:
+        # imports the `email` package, so it is not imported with lambdarado
+        from http.client import HTTPConnection
+        host, _, port = address.partition(':')
+        self._connection = HTTPConnection(host, int(port or 80))
+        self.identifier: Optional[str] = None
+
+    def register(self, name: str, events: List[str]) -> Dict[str, Any]:
+        self._connection.request(
+            'POST', EXTENSION_PREFIX + '/register',
+            json.dumps({'events': events}).encode('utf-8'),
+            {'Lambda-Extension-Name': name,
+             'Content-Type': 'application/json'})
+        response = self._connection.getresponse()
+        body = response.read()
+        if response.status != 200:
+            raise RuntimeError(f'Extensions API returned {response.status} '
+                               f'on register: {body!r}')
+        self.identifier = response.getheader('Lambda-Extension-Identifier')
+        return json.loads(body) if body else {}
+
+    def next_event(self) -> Dict[str, Any]:
+        """Blocks until the next event (INVOKE or SHUTDOWN)."""
+        assert self.identifier is not None
+        self._connection.request(
+            'GET', EXTENSION_PREFIX + '/event/next',
+            headers={'Lambda-Extension-Identifier': self.identifier})
+        response = self._connection.getresponse()
+        body = response.read()
+        if response.status != 200:
+            raise RuntimeError(f'Extensions API returned {response.status} '
+                               f'for the next event')
+        return json.loads(body)
+
+
+def _run_tasks(tasks: List[_Task]) -> None:
+    for func, args, kwargs in tasks:
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            traceback.print_exc()
+
+
+class PostResponseExtension:
+    """The internal extension that runs the work queued by the invocation
+    after the response is returned."""
+
+    def __init__(self, name: str = EXTENSION_NAME) -> None:
+        self.name = name
+        self.running = False
+        # the tasks of the current invocation
+        self._tasks: Optional[List[_Task]] = None
+        # the tasks of the finished invocations
+        self._done: 'queue.Queue[List[_Task]]' = queue.Queue()
+        self._flushes: List[Callable[[], Any]] = []
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, address: Optional[str] = None) -> bool:
+        """Registers the extension and starts its thread. It must be called
+        during the init phase, before the runtime asks for the first
+        invocation. Returns False if the registration failed."""
+        if self._thread is not None:
+            return self.running
+        address = address or os.environ.get('AWS_LAMBDA_RUNTIME_API')
+        if not address:
+            return False
+        client = ExtensionsApiClient(address)
+        try:
+            # the internal extensions cannot register for SHUTDOWN, the
+            # runtime receives SIGTERM instead
+            client.register(self.name, ['INVOKE'])
+        except Exception:
+            print('Failed to register the post-response extension')
+            traceback.print_exc()
+            return False
+        self.running = True
+        self._thread = threading.Thread(target=self._run, args=(client,),
+                                        name='lambdarado-extension',
+                                        daemon=True)
+        self._thread.start()
+        call_on_shutdown(self.shutdown)
+        return True
+
+    def add_flush(self, flush: Callable[[], Any]) -> None:
+        """Adds the function called after the tasks of each invocation, and
+        at shutdown. The writers of the logs flush their buffers there."""
+        if flush not in self._flushes:
+            self._flushes.append(flush)
+
+    def submit(self, func: Callable, *args, **kwargs) -> None:
+        tasks = self._tasks
+        if tasks is None:
+            # not in an invocation
+            func(*args, **kwargs)
+            return
+        tasks.append((func, args, kwargs))
+
+    def wrap(self, handler: AwsHandlerFunc) -> AwsHandlerFunc:
+        """Returns the handler that collects the tasks queued by the
+        invocation, and passes them to the extension thread (or runs them
+        when the extension is not running)."""
+
+        def post_response_handler(event: Dict, context) -> Dict:
+            if self._tasks is not None:
+                # already wrapped
+                return handler(event, context)
+            tasks: List[_Task] = []
+            self._tasks = tasks
+            try:
+                return handler(event, context)
+            finally:
+                self._tasks = None
+                if self.running:
+                    self._done.put(tasks)
+                else:
+                    _run_tasks(tasks)
+
+        return post_response_handler
+
+    def _flush(self) -> None:
+        for flush in self._flushes:
+            try:
+                flush()
+            except Exception:
+                traceback.print_exc()
+
+    def shutdown(self) -> None:
+        """Runs the tasks that are still queued, and flushes."""
+        while True:
+            try:
+                _run_tasks(self._done.get_nowait())
+            except queue.Empty:
+                break
+        self._flush()
+
+    def _run(self, client: ExtensionsApiClient) -> None:
+        while True:
+            try:
+                event = client.next_event()
+            except Exception:
+                traceback.print_exc()
+                self.running = False
+                self.shutdown()
+                return
+            if event.get('eventType') == 'SHUTDOWN':
+                self.shutdown()
+                return
+            deadline_ms = event.get('deadlineMs')
+            timeout = max(0.0, deadline_ms / 1000 - time.time()) + 1.0 \
+                if deadline_ms else None
+            try:
+                # waiting for the handler to finish the invocation
+                tasks = self._done.get(timeout=timeout)
+            except queue.Empty:
+                continue
+            _run_tasks(tasks)
+            self._flush()
+
+
+# the extension started by `start(post_response_extension=True)`
+extension = PostResponseExtension()
+
+
+def after_response(func: Callable, *args, **kwargs) -> None:
+    """Calls `func(*args, **kwargs)` after the response of the current
+    invocation is returned to the client, if the post-response extension is
+    running, or right after the handler otherwise. Outside the invocations,
+    `func` is called immediately.
+
+        after_response(send_analytics, event_data)
+    """
+    extension.submit(func, *args, **kwargs)
@@ -0,0 +1,415 @@
+# SPDX-FileCopyrightText: (c) 2021 Artёm IG <github.com/rtmigo>
+# SPDX-License-Identifier: MIT
+
+# Translates the HTTP events of API Gateway (REST API and HTTP API), ALB
+# and Lambda Function URLs to WSGI requests, and WSGI responses back to
+# the Lambda responses.
+#
+# The format of the event is detected once. Then the functions specific for
+# this format build the environ and the response, without checking the
+# format again.
+
+import sys
+from base64 import b64encode
+from binascii import a2b_base64
+from io import BytesIO
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import unquote, urlencode
+
+from lambdarado._common import AwsHandlerFunc
+from lambdarado._deadline import current_deadline
+
+FORMAT_V1 = 'v1'  # API Gateway REST API
+FORMAT_V2 = 'v2'  # API Gateway HTTP API
+FORMAT_ALB = 'alb'  # Application Load Balancer
+FORMAT_ALB_MULTI = 'alb-multi'  # ALB with multi-value headers enabled
+FORMAT_URL = 'url'  # Lambda Function URL
+
+NON_BINARY_CONTENT_TYPE_PREFIXES: Tuple[str, ...] = (
+    'text/',
+    'application/json',
+    'application/problem+json',
+    'application/vnd.api+json',
+)
+
+# ALB passes the query values as they were in the URL, so they are
+# already percent-encoded
+_RESERVED_URI_CHARACTERS = r"!#$&'()*+,/:;=?@[]%"
+
+Headers = List[Tuple[str, str]]
+
+
+def event_format(event: Dict) -> Optional[str]:
+    """Returns one of the FORMAT_* constants, or None if the event is not
+    an HTTP request."""
+    context = event.get('requestContext')
+    if event.get('version') == '2.0':
+        if context is not None \
+                and '.lambda-url.' in context.get('domainName', ''):
+            return FORMAT_URL
+        return FORMAT_V2
+    if context is not None and 'elb' in context:
+        if 'multiValueHeaders' in event:
+            return FORMAT_ALB_MULTI
+        return FORMAT_ALB
+    if 'httpMethod' in event:
+        return FORMAT_V1
+    return None
+
+
+def request_body(event: Dict) -> bytes:
+    body = event.get('body')
+    if not body:
+        return b''
+    if event.get('isBase64Encoded'):
+        return a2b_base64(body)
+    return body.encode('utf-8')
+
+
+def _base_environ(event: Dict, context: Any, body: bytes) -> Dict[str, Any]:
+    # BytesIO initialized with a `bytes` object shares its buffer instead
+    # of copying it, until something is written to the stream
+    return {
+        'CONTENT_LENGTH': str(len(body)),
+        'REMOTE_ADDR': '127.0.0.1',
+        'SCRIPT_NAME': '',
+        'SERVER_NAME': '',
+        'SERVER_PORT': '',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'wsgi.errors': sys.stderr,
+        'wsgi.input': BytesIO(body),
+        'wsgi.multiprocess': False,
+        'wsgi.multithread': False,
+        'wsgi.run_once': False,
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'lambdarado.event': event,
+        'lambdarado.context': context,
+        # the time.monotonic() of the deadline, set by the deadline_wrapper
+        'lambdarado.deadline': current_deadline(),
+        # the same keys as apig_wsgi used, for the apps that read them
+        'apig_wsgi.full_event': event,
+        'apig_wsgi.context': context,
+        'apig_wsgi.request_context': event.get('requestContext'),
+    }
+
+
+def _path_info(path: str) -> str:
+    if '%' in path:
+        return unquote(path, encoding='iso-8859-1')
+    return path
+
+
+def _set_header(environ: Dict[str, Any], name: str, value: str) -> None:
+    key = name.upper().replace('-', '_')
+    if key == 'CONTENT_TYPE':
+        environ['CONTENT_TYPE'] = value
+    elif key == 'HOST':
+        environ['SERVER_NAME'] = value
+    elif key == 'X_FORWARDED_FOR':
+        environ['REMOTE_ADDR'] = value.split(',', 1)[0].strip()
+    elif key == 'X_FORWARDED_PROTO':
+        environ['wsgi.url_scheme'] = value
+    elif key == 'X_FORWARDED_PORT':
+        environ['SERVER_PORT'] = value
+    environ['HTTP_' + key] = value
+
+
+def _environ_v1(event: Dict, context: Any,
+                query_safe: str = '') -> Dict[str, Any]:
+    body = request_body(event)
+    environ = _base_environ(event, context, body)
+    environ['REQUEST_METHOD'] = event['httpMethod']
+    environ['PATH_INFO'] = _path_info(event['path'])
+
+    # the values may be None when testing on console
+    multi_query = event.get('multiValueQueryStringParameters')
+    if multi_query:
+        environ['QUERY_STRING'] = urlencode(multi_query, doseq=True,
+                                            safe=query_safe)
+    else:
+        query = event.get('queryStringParameters')
+        environ['QUERY_STRING'] = \
+            urlencode(query, safe=query_safe) if query else ''
+
+    multi_headers = event.get('multiValueHeaders')
+    if multi_headers is not None:
+        for name, values in multi_headers.items():
+            # multi-value headers accumulate with ","
+            _set_header(environ, name,
+                        values[-1] if len(values) == 1 else ','.join(values))
+    else:
+        headers = event.get('headers')
+        if headers:
+            for name, value in headers.items():
+                _set_header(environ, name, value)
+    return environ
+
+
+def _environ_alb(event: Dict, context: Any) -> Dict[str, Any]:
+    return _environ_v1(event, context, query_safe=_RESERVED_URI_CHARACTERS)
+
+
+def _environ_v2(event: Dict, context: Any) -> Dict[str, Any]:
+    body = request_body(event)
+    environ = _base_environ(event, context, body)
+    http = event['requestContext']['http']
+    environ['REQUEST_METHOD'] = http['method']
+    environ['PATH_INFO'] = _path_info(event['rawPath'])
+    environ['QUERY_STRING'] = event.get('rawQueryString', '')
+    environ['SERVER_PROTOCOL'] = http.get('protocol', 'HTTP/1.1')
+    environ['REMOTE_ADDR'] = http.get('sourceIp', '127.0.0.1')
+
+    headers = event.get('headers')
+    if headers:
+        for name, value in headers.items():
+            _set_header(environ, name, value)
+
+    # HTTP API and Function URLs move the cookies out of the headers
+    cookies = event.get('cookies')
+    if cookies:
+        environ['HTTP_COOKIE'] = '; '.join(cookies)
+    return environ
+
+
+class WsgiResponse:
+    """Collects the status, headers and body returned by a WSGI app."""
+
+    __slots__ = ('status', 'headers', 'chunks')
+
+    def __init__(self) -> None:
+        self.status = '500 Internal Server Error'
+        self.headers: Headers = []
+        self.chunks: List[bytes] = []
+
+    def start_response(self, status: str, headers: Headers,
+                       exc_info=None) -> Callable[[bytes], Any]:
+        if exc_info is not None and exc_info[0] is not None:
+            raise exc_info[1].with_traceback(exc_info[2])
+        self.status = status
+        self.headers = headers
+        return self.chunks.append
+
+    def consume(self, result: Iterable[bytes]) -> None:
+        try:
+            chunks = self.chunks
+            for chunk in result:
+                if chunk:
+                    chunks.append(chunk)
+        finally:
+            close = getattr(result, 'close', None)
+            if close is not None:
+                close()
+
+    @property
+    def status_code(self) -> int:
+        return int(self.status[:3])
+
+    def body(self) -> bytes:
+        chunks = self.chunks
+        if len(chunks) == 1:
+            return chunks[0]
+        return b''.join(chunks)
+
+    def header(self, name: str) -> Optional[str]:
+        """Returns the last value of the header `name` (lowercase)."""
+        result = None
+        for key, value in self.headers:
+            if key.lower() == name:
+                result = value
+        return result
+
+
+def is_binary(content_type: Optional[str],
+              content_encoding: Optional[str]) -> bool:
+    if content_encoding:
+        return True
+    return not (content_type or '').startswith(
+        NON_BINARY_CONTENT_TYPE_PREFIXES)
+
+
+def _set_body(result: Dict[str, Any], body: bytes,
+              content_type: Optional[str],
+              content_encoding: Optional[str]) -> Dict[str, Any]:
+    if is_binary(content_type, content_encoding):
+        result['isBase64Encoded'] = True
+        result['body'] = b64encode(body).decode('ascii')
+    else:
+        result['isBase64Encoded'] = False
+        result['body'] = body.decode('utf-8')
+    return result
+
+
+def _single_value_headers(headers: Headers) -> Tuple[Dict[str, str],
+                                                     Optional[str],
+                                                     Optional[str]]:
+    result: Dict[str, str] = {}
+    content_type = None
+    content_encoding = None
+    for name, value in headers:
+        result[name] = value
+        lower = name.lower()
+        if lower == 'content-type':
+            content_type = value
+        elif lower == 'content-encoding':
+            content_encoding = value
+    return result, content_type, content_encoding
+
+
+def _multi_value_headers(headers: Headers) -> Tuple[Dict[str, List[str]],
+                                                    Optional[str],
+                                                    Optional[str]]:
+    result: Dict[str, List[str]] = {}
+    content_type = None
+    content_encoding = None
+    for name, value in headers:
+        values = result.get(name)
+        if values is None:
+            result[name] = [value]
+        else:
+            values.append(value)
+        lower = name.lower()
+        if lower == 'content-type':
+            content_type = value
+        elif lower == 'content-encoding':
+            content_encoding = value
+    return result, content_type, content_encoding
+
+
+def format_response_v1(status: str, headers: Headers, body: bytes,
+                       multi_value: bool) -> Dict[str, Any]:
+    result: Dict[str, Any] = {'statusCode': int(status[:3])}
+    if multi_value:
+        result['multiValueHeaders'], content_type, content_encoding = \
+            _multi_value_headers(headers)
+    else:
+        result['headers'], content_type, content_encoding = \
+            _single_value_headers(headers)
+    return _set_body(result, body, content_type, content_encoding)
+
+
+def format_response_alb(status: str, headers: Headers, body: bytes,
+                        multi_value: bool) -> Dict[str, Any]:
+    result = format_response_v1(status, headers, body, multi_value)
+    result['statusDescription'] = status
+    return result
+
+
+def format_response_v2(status: str, headers: Headers, body: bytes,
+                       multi_value: bool = False) -> Dict[str, Any]:
+    result_headers: Dict[str, str] = {}
+    cookies: List[str] = []
+    content_type = None
+    content_encoding = None
+    for name, value in headers:
+        lower = name.lower()
+        if lower == 'set-cookie':
+            cookies.append(value)
+            continue
+        if lower == 'content-type':
+            content_type = value
+        elif lower == 'content-encoding':
+            content_encoding = value
+        previous = result_headers.get(lower)
+        result_headers[lower] = \
+            value if previous is None else previous + ',' + value
+    result: Dict[str, Any] = {
+        'statusCode': int(status[:3]),
+        'headers': result_headers,
+        'cookies': cookies,
+    }
+    return _set_body(result, body, content_type, content_encoding)
+
+
+EnvironBuilder = Callable[[Dict, Any], Dict[str, Any]]
+ResponseFormatter = Callable[[str, Headers, bytes, bool], Dict[str, Any]]
+
+# for each format: the function that creates the WSGI environ from the event,
+# and the function that creates the Lambda response
+FORMATS: Dict[str, Tuple[EnvironBuilder, ResponseFormatter]] = {
+    FORMAT_V1: (_environ_v1, format_response_v1),
+    FORMAT_V2: (_environ_v2, format_response_v2),
+    FORMAT_URL: (_environ_v2, format_response_v2),
+    FORMAT_ALB: (_environ_alb, format_response_alb),
+    FORMAT_ALB_MULTI: (_environ_alb, format_response_alb),
+}
+
+
+def event_to_environ(event: Dict, context: Any = None,
+                     fmt: Optional[str] = None) -> Dict[str, Any]:
+    if fmt is None:
+        fmt = event_format(event)
+        if fmt is None:
+            raise ValueError('The event is not an HTTP request')
+    return FORMATS[fmt][0](event, context)
+
+
+def format_response(event: Dict, fmt: str, status: str, headers: Headers,
+                    body: bytes) -> Dict[str, Any]:
+    """Creates the Lambda response in the format matching the `event`."""
+    return FORMATS[fmt][1](status, headers, body,
+                           'multiValueHeaders' in event)
+
+
+def request_environ(method: str, path: str, body: bytes = b'',
+                    headers: Optional[Dict[str, str]] = None,
+                    query: str = '',
+                    event: Optional[Dict] = None,
+                    context: Any = None) -> Dict[str, Any]:
+    """Creates the WSGI environ for a request that did not come as an HTTP
+    event (e.g. a queue message dispatched to a route)."""
+    environ = _base_environ(event or {}, context, body)
+    environ['REQUEST_METHOD'] = method
+    environ['PATH_INFO'] = path
+    environ['QUERY_STRING'] = query
+    environ['SERVER_NAME'] = 'localhost'
+    environ['SERVER_PORT'] = '80'
+    if headers:
+        for name, value in headers.items():
+            _set_header(environ, name, value)
+    return environ
+
+
+def path_has_prefix(path: str, prefix: str) -> bool:
+    """Returns True if the `prefix` (like '/admin') matches whole segments
+    of the `path`. The empty prefix matches any path."""
+    return not prefix or path == prefix or path.startswith(prefix + '/')
+
+
+def mount_environ(environ: Dict[str, Any], script_name: str) -> None:
+    """Moves the `script_name` prefix from the PATH_INFO to the
+    SCRIPT_NAME, for the app mounted at the prefix."""
+    path = environ['PATH_INFO']
+    if script_name and path_has_prefix(path, script_name):
+        environ['SCRIPT_NAME'] = environ.get('SCRIPT_NAME', '') + script_name
+        environ['PATH_INFO'] = path[len(script_name):]
+
+
+def call_wsgi(wsgi_app, environ: Dict[str, Any]) -> WsgiResponse:
+    response = WsgiResponse()
+    response.consume(wsgi_app(environ, response.start_response))
+    return response
+
+
+def make_wsgi_handler(wsgi_app, script_name: str = '') -> AwsHandlerFunc:
+    """Creates a Lambda handler that serves the HTTP events with the
+    `wsgi_app`. If the `script_name` is given, the app is mounted at this
+    prefix."""
+
+    formats = FORMATS
+
+    def wsgi_handler(event: Dict, context: Any) -> Dict[str, Any]:
+        fmt = event_format(event)
+        if fmt is None:
+            raise ValueError('The event is not an HTTP request')
+        build_environ, build_response = formats[fmt]
+        environ = build_environ(event, context)
+        if script_name:
+            mount_environ(environ, script_name)
+        response = WsgiResponse()
+        response.consume(wsgi_app(environ, response.start_response))
+        return build_response(response.status, response.headers,
+                              response.body(),
+                              'multiValueHeaders' in event)
+
+    return wsgi_handler
@@ -6,11 +6,29 @@ import os
 import sys
 from types import ModuleType
 
-from apig_wsgi import make_lambda_handler
-from awslambdaric.__main__ import main as ric_main
-from typing import Callable
-
-from lambdarado._common import WrapAwsHandlerFunc, AwsHandlerFunc
+# imported before the third-party modules, so the import timer
+# (when enabled) can measure them
+from lambdarado._coldstart import cold_start_report, ColdStartReport
+
+from typing import Callable, Mapping, Optional, Sequence, Union, \
+    TYPE_CHECKING
+
+# The modules needed only by one of the paths (the AWS runtime, the ASGI
+# support, the local servers) are imported where they are used, so neither
+# path pays for importing the other one.
+from lambdarado._cache import ResponseCache
+from lambdarado._common import WrapAwsHandlerFunc, AwsHandlerFunc, \
+    is_asgi_app
+from lambdarado._extension import extension as background_extension
+from lambdarado._http_event import make_wsgi_handler
+from lambdarado._multi_app import MultiApp
+from lambdarado._resources import ResourceRegistry, \
+    registry as default_registry
+from lambdarado._warmup import WarmUpItem, warm_up, wrap_warmer_pings
+
+if TYPE_CHECKING:
+    from lambdarado._metrics import EmfMetrics
+    from lambdarado._static import StaticFiles
 from lambdarado._wrap_handler_default import wrap_aws_handler_default
 
 
@@ -65,9 +83,117 @@ def file_to_module_name(module: ModuleType) -> str:
 _in_aws = os.environ.get("AWS_EXECUTION_ENV") is not None
 
 
+def _report_first_invocation(handler: AwsHandlerFunc,
+                             report: ColdStartReport) -> AwsHandlerFunc:
+    def first_invocation_handler(event, context):
+        if not report.emitted:
+            report.first_invocation()
+        return handler(event, context)
+
+    return first_invocation_handler
+
+
+def _make_app_handler(app, script_name: str,
+                      metrics: Optional['EmfMetrics'],
+                      event_routes: Optional[Mapping[str, str]],
+                      event_workers: int) -> AwsHandlerFunc:
+    """Creates the handler of a single app: the HTTP events are served by
+    the app, and the non-HTTP events are dispatched to its `event_routes`."""
+    asgi = is_asgi_app(app)
+    served_app = metrics.wrap_app(app) if metrics is not None else app
+    if asgi:
+        from lambdarado._asgi import make_asgi_handler
+        aws_handler = make_asgi_handler(served_app, script_name)
+    else:
+        aws_handler = make_wsgi_handler(served_app, script_name)
+
+    if event_routes:
+        if asgi:
+            raise TypeError("event_routes are only supported for WSGI apps")
+        from lambdarado._event_sources import EventDispatcher
+        aws_handler = EventDispatcher(app, event_routes,
+                                      max_workers=event_workers
+                                      ).wrap(aws_handler)
+    return aws_handler
+
+
+def make_aws_handler(app,
+                     wrap_handler: Optional[WrapAwsHandlerFunc] = None,
+                     response_cache: Optional[ResponseCache] = None,
+                     event_routes: Optional[Mapping[str, str]] = None,
+                     event_workers: int = 8,
+                     warm_up_items: Sequence[WarmUpItem] = (),
+                     warmer_pings: bool = True,
+                     metrics: Optional['EmfMetrics'] = None,
+                     resources: Optional[ResourceRegistry] = None,
+                     gc_freeze: bool = False,
+                     static: Optional['StaticFiles'] = None
+                     ) -> AwsHandlerFunc:
+    """Creates a function ready to process AWS Lambda requests with the
+    `app`, which may be either WSGI or ASGI app, or a `MultiApp`."""
+
+    if isinstance(app, MultiApp):
+        def make_app_handler(single_app, script_name: str) -> AwsHandlerFunc:
+            # the events are dispatched only to the routes of WSGI apps
+            routes = None if is_asgi_app(single_app) else event_routes
+            return _make_app_handler(single_app, script_name, metrics,
+                                     routes, event_workers)
+
+        # the handlers of the apps are created by their first requests
+        aws_handler = app.make_handler(make_app_handler)
+    else:
+        aws_handler = _make_app_handler(app, '', metrics, event_routes,
+                                        event_workers)
+
+    if resources:
+        with cold_start_report.phase("resources"):
+            resources.open()
+
+    if warm_up_items:
+        # also counted in the phase that creates the handler
+        with cold_start_report.phase("warm_up"):
+            warm_up(app, aws_handler, warm_up_items)
+
+    if response_cache is not None:
+        aws_handler = response_cache.wrap(aws_handler)
+
+    if static:
+        aws_handler = static.wrap(aws_handler)
+
+    # todo unit test
+    if wrap_handler is not None:
+        aws_handler = wrap_handler(aws_handler)
+
+    if metrics is not None:
+        aws_handler = metrics.wrap(aws_handler)
+
+    if resources:
+        aws_handler = resources.wrap(aws_handler)
+
+    if warmer_pings:
+        # outside the wrap_handler, so the pings are not logged
+        aws_handler = wrap_warmer_pings(aws_handler)
+
+    # the work queued with `after_response` runs when the handler returns
+    aws_handler = background_extension.wrap(aws_handler)
+
+    if not cold_start_report.emitted:
+        aws_handler = _report_first_invocation(aws_handler,
+                                               cold_start_report)
+
+    if gc_freeze:
+        # the init is over: everything created so far lives as long as
+        # the instance
+        from lambdarado._memory import freeze_after_init
+        with cold_start_report.phase("gc_freeze"):
+            freeze_after_init()
+    return aws_handler
+
+
 def assign_lambda_handler(module_name: str,
                           wsgi_app,
-                          wrap_handler: WrapAwsHandlerFunc = None):
+                          wrap_handler: Optional[WrapAwsHandlerFunc] = None,
+                          **handler_options):
     """Defines the global `handler` function in the loaded module
     named `module_name`.
 
@@ -76,6 +202,8 @@ def assign_lambda_handler(module_name: str,
 
     Otherwise the `handler` is initialized with a function ready to process
     AWS Lambda requests. The requests will be processed with `app`.
+
+    The `handler_options` are passed to `make_aws_handler`.
     """
 
     #
@@ -130,23 +258,124 @@ def assign_lambda_handler(module_name: str,
         print(f'{module} already has the `handler` defined')
         return
 
-    # noinspection PyTypeChecker
-    aws_handler: AwsHandlerFunc = make_lambda_handler(wsgi_app,
-                                                      binary_support=True)
+    module.__dict__['handler'] = make_aws_handler(wsgi_app, wrap_handler,
+                                                  **handler_options)
 
-    # todo unit test
-    if wrap_handler is not None:
-        aws_handler = wrap_handler(aws_handler)
 
-    module.__dict__['handler'] = aws_handler
+# The handler installed by `start(..., single_import=True)`
+_installed_handler: Optional[AwsHandlerFunc] = None
+
 
+def handler(event, context):
+    """The stable handler for the single-import bootstrap.
 
-def start(get_app: Callable,
-          wrap_handler: WrapAwsHandlerFunc = wrap_aws_handler_default) -> None:
+    When `start` is called with `single_import=True`, the `awslambdaric`
+    receives `lambdarado.handler` instead of `basename.handler`. Since the
+    `lambdarado` module is already imported, the entry module is not
+    re-imported, and the app created once is used for all the requests.
+    """
+    if _installed_handler is None:
+        raise RuntimeError(
+            "The handler is not installed. "
+            "Call lambdarado.start(get_app, single_import=True) first.")
+    return _installed_handler(event, context)
+
+
+def _run_ric_single_import(wsgi_app,
+                           wrap_handler: Optional[WrapAwsHandlerFunc],
+                           report: ColdStartReport,
+                           **handler_options) -> None:
+    global _installed_handler
+    if _installed_handler is not None:
+        # the ric is already running in this process
+        return
+    with report.phase("assign_lambda_handler"):
+        _installed_handler = make_aws_handler(wsgi_app, wrap_handler,
+                                              **handler_options)
+    arg = f'{__package__}.handler'
+    print(f'Starting AWS Lambda RIC with arg "{arg}"')
+    report.mark("ric_main")
+    _ric_main(arg)
+
+
+def _run_streaming_runtime(app,
+                           wrap_handler: Optional[WrapAwsHandlerFunc],
+                           report: ColdStartReport,
+                           **handler_options) -> None:
+    from lambdarado._streaming import run_streaming_runtime
+    with report.phase("assign_lambda_handler"):
+        aws_handler = make_aws_handler(app, wrap_handler, **handler_options)
+
+    resources = handler_options.get('resources')
+
+    def on_invocation() -> None:
+        # the streamed responses do not pass through the `aws_handler`
+        if not report.emitted:
+            report.first_invocation()
+        if resources:
+            resources.invocation += 1
+
+    print('Starting the runtime with response streaming')
+    report.mark("ric_main")
+    run_streaming_runtime(app, aws_handler, on_invocation)
+
+
+def _run_multi_app_locally(app: MultiApp, host: str, production: bool,
+                           static: Optional['StaticFiles']) -> None:
+    # locally, the apps mounted at the prefixes are served by a dispatching
+    # WSGI app; the ASGI apps are not supported here
+    wsgi_app = app.wsgi_app()
+    if static:
+        wsgi_app = static.wrap_wsgi(wsgi_app)
+    if production:
+        from lambdarado._local_server import run_production_server
+        run_production_server(wsgi_app, host=host)
+    else:
+        from werkzeug.serving import run_simple
+        run_simple(host, 5000, wsgi_app, use_reloader=True,
+                   use_debugger=True)
+
+
+def _ric_main(arg: str) -> None:
+    from awslambdaric.__main__ import main as ric_main
+    ric_main((None, arg))
+
+
+def _set_config(app, key: str, value) -> None:
+    """Sets `app.config[key]` for Flask-like apps, or `app.state.key` for
+    Starlette-like apps (with dashes replaced by underscores)."""
+    config = getattr(app, 'config', None)
+    if config is not None:
+        config[key] = value
+        return
+    state = getattr(app, 'state', None)
+    if state is not None:
+        setattr(state, key.replace('-', '_'), value)
+
+
+def start(get_app: Union[Callable, Mapping[str, Callable]],
+          wrap_handler: WrapAwsHandlerFunc = wrap_aws_handler_default,
+          single_import: bool = False,
+          response_cache: Optional[ResponseCache] = None,
+          event_routes: Optional[Mapping[str, str]] = None,
+          event_workers: int = 8,
+          local_server: Optional[str] = None,
+          warm_up: Sequence[WarmUpItem] = (),
+          warmer_pings: bool = True,
+          response_streaming: bool = False,
+          metrics: Optional['EmfMetrics'] = None,
+          resources: Optional[ResourceRegistry] = None,
+          post_response_extension: bool = False,
+          gc_freeze: bool = False,
+          static: Union[Mapping[str, str], 'StaticFiles', None] = None
+          ) -> None:
     """
     Starts serving requests.
 
     :param get_app: Function that initializes and returns the Flask app.
+    It may also return an ASGI app (FastAPI, Starlette): such apps are run
+    on an event loop that persists between the Lambda invocations, and with
+    uvicorn when running locally.
 
         def get_app():
             app = Flask(__name__)
@@ -159,6 +388,18 @@ def start(get_app: Callable,
 
         start(get_app)
 
+    It may also be a mapping of the path prefixes and the event sources to
+    such functions. Each app is created by its first request, and serves the
+    paths under its prefix (the prefix is its SCRIPT_NAME). The non-HTTP
+    events go to the app mapped to their source, or to the app mapped to
+    '/'. When running locally, only the WSGI apps mapped to the prefixes
+    are served.
+
+        start({'/': get_main_app,
+               '/admin': get_admin_app,
+               'aws:sqs': get_worker_app},
+              event_routes={'aws:sqs': '/jobs'})
+
     :param wrap_handler: An optional function, that will wrap the lambda
     handler, probably adding some additional functionality to each call of the
     lambda function.
@@ -171,30 +412,200 @@ def start(get_app: Callable,
 
         start(get_app, wrap_handler = wrap_my_handler)
 
+    :param single_import: If True, the `awslambdaric` will use the
+    `lambdarado.handler` instead of re-importing the entry module. The
+    module from which `start` is called is not detected, and the stack is not
+    inspected. The app is created only once. When running locally, the debug
+    server is started regardless of the module name.
+
+    :param response_cache: An optional `ResponseCache`. The cached
+    responses are returned without calling the app. Since the cache is
+    inside the `wrap_handler`, the wrappers are called for the cached
+    responses as well.
+
+    :param event_routes: Maps the sources of non-HTTP events to the paths of
+    the app. The keys are the `eventSource` of the records ('aws:sqs',
+    'aws:kinesis', 'aws:dynamodb', 'aws:sns'), the `source` of EventBridge
+    events, or 'aws:eventbridge' for any EventBridge event. Each record is
+    POSTed to the path as JSON. The failed records (exceptions or statuses
+    other than 2xx) are returned as `batchItemFailures`.
+
+        start(get_app, event_routes={'aws:sqs': '/jobs'})
+
+    :param event_workers: The number of threads processing the records of a
+    batch concurrently. Records with the same SQS MessageGroupId, Kinesis
+    partition key or DynamoDB keys are processed in order.
+
+    :param local_server: When running locally, 'debug' starts the debug
+    server with reloader (the default), and 'production' serves the app
+    with several processes and threads, for load testing (with gunicorn, or
+    uvicorn for the ASGI apps). If not specified,
+    the LAMBDARADO_SERVER environment variable is used. The production
+    server is configured with LAMBDARADO_WORKERS, LAMBDARADO_THREADS,
+    LAMBDARADO_KEEP_ALIVE, LAMBDARADO_BACKLOG and LAMBDARADO_PORT.
+
+    :param warm_up: Requests and functions that run in AWS Lambda during the
+    init phase, before the first invocation. The items are paths ('/') and
+    (method, path) tuples requested from the app, or functions called with
+    the app. The failures are printed and ignored.
+
+        start(get_app, warm_up=['/', ('HEAD', '/items'), connect_db])
+
+    :param warmer_pings: If True, the keep-warm pings (`{"warmer": true}`
+    or the events of serverless-plugin-warmup) are answered with
+    `{"warmed": true}`, without calling the app and the `wrap_handler`.
+
+    :param response_streaming: If True, the requests to the Function URL
+    (configured with the RESPONSE_STREAM invoke mode) are answered by
+    streaming the chunks of the WSGI response as they are produced. The
+    streamed responses do not pass through the `wrap_handler` and the
+    `response_cache`. Other events, ASGI apps, and the functions started
+    with the `main.handler` command are answered with complete responses.
+
+    :param metrics: An optional `EmfMetrics`, that writes a line of the
+    CloudWatch Embedded Metric Format for each HTTP invocation: the latency,
+    the time spent in the app, the cold start flag, the request and response
+    sizes, the status code and the route.
+
+    :param resources: The `ResourceRegistry` with the connection pools,
+    sessions and clients reused by the warm invocations. By default, it is
+    `lambdarado.resources`. In AWS Lambda, the resources are created during
+    the init phase, checked before reuse by each invocation, and closed when
+    the runtime shuts down.
+
+        db = resources.register('db', lambda: connect(DSN),
+                                check=ping, close=lambda c: c.close())
+        start(get_app)
+
+    :param post_response_extension: If True, an internal extension is
+    registered in the Extensions API of AWS Lambda. The work queued with
+    `after_response`, the metrics and the logs are then processed after the
+    response is returned, while the instance is not frozen yet. Otherwise,
+    they are processed before the response is returned.
+
+    :param gc_freeze: If True, the objects created during the init are
+    moved to the permanent generation of the garbage collector when the
+    handler is created, so the collections during the requests do not scan
+    them. The thresholds of the collector are raised for the requests.
+
+    :param static: Maps the URL prefixes to the directories of the static
+    files (relative to the current directory), or a `StaticFiles` object
+    with more options. The files are read once, during the init, and the
+    GET and HEAD requests of them are answered without calling the app,
+    with the ETag, the compressed variants, and `304 Not Modified` for the
+    conditional requests.
+
+        start(get_app, static={'/assets': 'dist/assets'})
+
+    When the function is called, it measures the phases of the cold start.
+    The durations are placed to `app.config['cold-start']`. If the
+    LOG_COLD_START environment variable is set, they are also printed as a
+    single JSON line, along with the import times of the heaviest modules.
+
     :return: None
     """
-    module = caller_module()
-    module_name = file_to_module_name(module)
+    report = cold_start_report
+    report.entered_start()
 
-    caller_is_main = module.__name__ == "__main__"
+    if single_import:
+        module_name = None
+        caller_is_main = True
+    else:
+        module = caller_module()
+        module_name = file_to_module_name(module)
+        caller_is_main = module.__name__ == "__main__"
 
     # IN_DOCKER=True when running Docker images locally.
     # For some reason it is False when running in AWS Lambda
     # (deployed as Docker Container)
     in_docker = os.path.exists("/.dockerenv")
 
-    app = get_app()
-
-    app.config['running-in-docker'] = in_docker
-    app.config['running-in-aws'] = _in_aws
-
-    if _in_aws:
-        assign_lambda_handler(module_name, app, wrap_handler)
+    def configure(created_app) -> None:
+        _set_config(created_app, 'running-in-docker', in_docker)
+        _set_config(created_app, 'running-in-aws', _in_aws)
+        _set_config(created_app, 'cold-start', report.data)
+
+    if isinstance(get_app, Mapping):
+        # the apps are created by their first requests
+        app = MultiApp(get_app, on_create=configure)
+    else:
+        with report.phase("get_app"):
+            app = get_app()
+        configure(app)
+
+    static_files = None
+    if static is not None:
+        from lambdarado._static import StaticFiles
+        with report.phase("static"):
+            static_files = static if isinstance(static, StaticFiles) \
+                else StaticFiles(static)
+
+    if resources is None:
+        resources = default_registry
+    if _in_aws and resources:
+        resources.close_on_shutdown()
+
+    if _in_aws and post_response_extension:
+        with report.phase("extension"):
+            background_extension.start()
+
+    handler_options = dict(response_cache=response_cache,
+                           event_routes=event_routes,
+                           event_workers=event_workers,
+                           warm_up_items=warm_up,
+                           warmer_pings=warmer_pings,
+                           metrics=metrics,
+                           resources=resources,
+                           gc_freeze=gc_freeze,
+                           static=static_files)
+
+    streaming = False
+    if _in_aws and response_streaming:
+        from lambdarado._streaming import streaming_available
+        streaming = not isinstance(app, MultiApp) \
+            and streaming_available(app) and \
+            (single_import or not is_called_by_awslambdaric())
+        if not streaming:
+            print('Response streaming is not available, '
+                  'the responses will be buffered')
+
+    if streaming:
+        _run_streaming_runtime(app, wrap_handler, report, **handler_options)
+
+    elif _in_aws and single_import:
+        _run_ric_single_import(app, wrap_handler, report, **handler_options)
+
+    elif _in_aws:
+        assert module_name is not None
+        with report.phase("assign_lambda_handler"):
+            assign_lambda_handler(module_name, app, wrap_handler,
+                                  **handler_options)
         if not is_called_by_awslambdaric():
             arg = f'{module_name}.handler'
             print(f'Starting AWS Lambda RIC with arg "{arg}"')
-            ric_main((None, arg))
+            report.mark("ric_main")
+            _ric_main(arg)
 
     elif caller_is_main:
+        report.finish()
         print("RUNNING!")
-        app.run(debug=True, host='0.0.0.0' if in_docker else '127.0.0.1')
+        host = '0.0.0.0' if in_docker else '127.0.0.1'
+        from lambdarado._local_server import local_server_mode, \
+            SERVER_PRODUCTION, run_production_server, run_production_asgi
+        production = local_server_mode(local_server) == SERVER_PRODUCTION
+        if static_files and hasattr(app, 'wsgi_app') \
+                and not isinstance(app, MultiApp):
+            # the Flask way to add a middleware, that works with `app.run`
+            app.wsgi_app = static_files.wrap_wsgi(app.wsgi_app)
+        if isinstance(app, MultiApp):
+            _run_multi_app_locally(app, host, production, static_files)
+        elif is_asgi_app(app):
+            if production:
+                run_production_asgi(app, host=host)
+            else:
+                from lambdarado._asgi import run_asgi_locally
+                run_asgi_locally(app, host=host)
+        elif production:
+            run_production_server(app, host=host)
+        else:
+            app.run(debug=True, host=host)
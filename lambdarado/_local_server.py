@@ -0,0 +1,126 @@
+# SPDX-FileCopyrightText: (c) 2021 Artёm IG <github.com/rtmigo>
+# SPDX-License-Identifier: MIT
+
+# The local server for load testing the same image that is deployed to
+# AWS Lambda. Unlike the debug server, it has no reloader and no debugger.
+# The WSGI apps are served with gunicorn, and the ASGI apps with uvicorn;
+# both are optional dependencies, imported only in this mode.
+
+import math
+import os
+from typing import Any, Dict, Optional
+
+from lambdarado._environ import _int_environ, _float_environ
+
+SERVER_DEBUG = 'debug'
+SERVER_PRODUCTION = 'production'
+
+
+class LocalServerConfig:
+    """The settings of the production local server. The defaults are read
+    from the environment variables:
+
+    - LAMBDARADO_WORKERS: number of processes (default: number of CPUs)
+    - LAMBDARADO_THREADS: number of threads in each process (default: 8)
+    - LAMBDARADO_KEEP_ALIVE: seconds to keep an idle connection (default: 5)
+    - LAMBDARADO_BACKLOG: the size of the listen queue (default: 1024)
+    - LAMBDARADO_PORT: the port (default: 5000)
+    """
+
+    def __init__(self,
+                 workers: Optional[int] = None,
+                 threads: Optional[int] = None,
+                 keep_alive: Optional[float] = None,
+                 backlog: Optional[int] = None,
+                 port: Optional[int] = None) -> None:
+        self.workers = workers if workers is not None \
+            else _int_environ('LAMBDARADO_WORKERS', os.cpu_count() or 1)
+        self.threads = threads if threads is not None \
+            else _int_environ('LAMBDARADO_THREADS', 8)
+        self.keep_alive = keep_alive if keep_alive is not None \
+            else _float_environ('LAMBDARADO_KEEP_ALIVE', 5.0)
+        self.backlog = backlog if backlog is not None \
+            else _int_environ('LAMBDARADO_BACKLOG', 1024)
+        self.port = port if port is not None \
+            else _int_environ('LAMBDARADO_PORT', 5000)
+
+
+def local_server_mode(argument: Optional[str]) -> str:
+    """Returns SERVER_DEBUG or SERVER_PRODUCTION, taking the `argument` of
+    `start` or the LAMBDARADO_SERVER environment variable."""
+    mode = argument or os.environ.get('LAMBDARADO_SERVER') or SERVER_DEBUG
+    mode = mode.strip().lower()
+    if mode not in (SERVER_DEBUG, SERVER_PRODUCTION):
+        raise ValueError(f'Unknown local server mode: {mode!r}')
+    return mode
+
+
+def _keep_alive_seconds(config: LocalServerConfig) -> int:
+    # the servers take whole seconds; rounding up keeps 0.5 from turning
+    # the keep-alive off
+    return max(1, math.ceil(config.keep_alive))
+
+
+def gunicorn_options(host: str, config: LocalServerConfig) -> Dict[str, Any]:
+    """The gunicorn settings for the `config`: the pre-forked workers, each
+    with a pool of threads."""
+    return {
+        'bind': f'{host}:{config.port}',
+        'workers': max(1, config.workers),
+        'worker_class': 'gthread',
+        'threads': max(1, config.threads),
+        'keepalive': _keep_alive_seconds(config),
+        'backlog': config.backlog,
+        # the access log would slow down the load tests
+        'accesslog': None,
+        # no `gunicornc` socket in the home directory (gunicorn 25.1+)
+        'control_socket_disable': True,
+    }
+
+
+def run_production_server(wsgi_app, host: str,
+                          config: Optional[LocalServerConfig] = None) -> None:
+    """Serves the `wsgi_app` with gunicorn: `config.workers` processes, each
+    with a pool of `config.threads` threads."""
+    if config is None:
+        config = LocalServerConfig()
+    try:
+        from gunicorn.app.base import BaseApplication  # type: ignore
+    except ImportError as e:
+        raise ImportError("Running the production local server requires "
+                          "gunicorn: pip3 install gunicorn") from e
+
+    options = gunicorn_options(host, config)
+
+    class Application(BaseApplication):
+        def load_config(self) -> None:
+            for name, value in options.items():
+                # the settings unknown to the installed version are skipped
+                if name in self.cfg.settings:
+                    self.cfg.set(name, value)
+
+        def load(self):
+            return wsgi_app
+
+    print(f"Serving on http://{host}:{config.port} with "
+          f"{options['workers']} worker(s) x {options['threads']} thread(s)")
+    Application().run()
+
+
+def run_production_asgi(asgi_app, host: str,
+                        config: Optional[LocalServerConfig] = None) -> None:
+    if config is None:
+        config = LocalServerConfig()
+    try:
+        import uvicorn  # type: ignore
+    except ImportError as e:
+        raise ImportError("Running ASGI apps locally requires uvicorn: "
+                          "pip3 install uvicorn") from e
+    if config.workers > 1:
+        # uvicorn can only fork the workers when the app is given
+        # by the import string
+        print("The ASGI app is served by a single worker")
+    uvicorn.run(asgi_app, host=host, port=config.port,
+                backlog=config.backlog,
+                timeout_keep_alive=_keep_alive_seconds(config),
+                access_log=False)
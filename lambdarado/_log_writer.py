@@ -0,0 +1,99 @@
+# SPDX-FileCopyrightText: (c) 2021 Artёm IG <github.com/rtmigo>
+# SPDX-License-Identifier: MIT
+
+import atexit
+import json
+import queue
+import sys
+import threading
+import traceback
+from typing import Any, Callable, List, Optional, TextIO
+
+from lambdarado._extension import extension
+
+
+class BackgroundWriter:
+    """Serializes objects to single-line JSON and writes them to the stream
+    in a background thread.
+
+    `write` only puts the object into a queue, so the serialization and
+    the output happen off the response path. Pass `prepare` to transform the
+    object (e.g. to redact it) in the background thread as well.
+
+    In AWS Lambda the instance is frozen after the response is returned, so
+    the lines queued by the last invocation may be written during the next
+    one, unless the post-response extension is running. The queue is flushed
+    at exit.
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None,
+                 prepare: Optional[Callable[[Any], Any]] = None) -> None:
+        self.stream = stream
+        self.prepare = prepare
+        self._queue: 'queue.SimpleQueue[Any]' = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._idle = threading.Condition(self._lock)
+
+    def write(self, obj: Any) -> None:
+        with self._lock:
+            self._pending += 1
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='lambdarado-log-writer',
+                    daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+                # flushed before the instance is frozen, if the
+                # post-response extension is running
+                extension.add_flush(self.flush)
+        self._queue.put(obj)
+
+    def _format(self, obj: Any) -> str:
+        if self.prepare is not None:
+            obj = self.prepare(obj)
+        return json.dumps(obj, separators=(',', ':'), default=str)
+
+    def _run(self) -> None:
+        get = self._queue.get
+        get_nowait = self._queue.get_nowait
+        while True:
+            objects = [get()]
+            # writing everything that is already queued with a single call
+            while True:
+                try:
+                    objects.append(get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(objects)
+            finally:
+                with self._lock:
+                    self._pending -= len(objects)
+                    if self._pending == 0:
+                        self._idle.notify_all()
+
+    def _write(self, objects: List[Any]) -> None:
+        # an object that cannot be written is skipped, and the thread
+        # keeps writing the others
+        lines = []
+        for obj in objects:
+            try:
+                lines.append(self._format(obj))
+            except Exception:
+                traceback.print_exc()
+        if not lines:
+            return
+        try:
+            stream = self.stream or sys.stdout
+            stream.write('\n'.join(lines) + '\n')
+            stream.flush()
+        except Exception:
+            traceback.print_exc()
+
+    def flush(self, timeout: Optional[float] = 5.0) -> bool:
+        """Waits until all the queued objects are written. Returns False
+        on timeout."""
+        with self._lock:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
@@ -0,0 +1,180 @@
+# SPDX-FileCopyrightText: (c) 2021 Artёm IG <github.com/rtmigo>
+# SPDX-License-Identifier: MIT
+
+# The garbage collector and the memory of the warm instance.
+#
+# The objects created during the init (the app, the URL map, the imported
+# modules) live as long as the instance. Freezing them moves them to the
+# permanent generation, so the collections during the requests do not scan
+# them again and again.
+#
+# The memory wrapper watches the RSS and the memory traced by `tracemalloc`
+# between the invocations, and reports the top allocations when the growth
+# exceeds the threshold.
+
+import gc
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+from lambdarado._common import AwsHandlerFunc, WrapAwsHandlerFunc
+from lambdarado._extension import after_response
+
+if TYPE_CHECKING:
+    import tracemalloc
+
+# the thresholds of the collections during the requests: the objects of the
+# init are frozen, so the young generation can be larger
+REQUEST_GC_THRESHOLDS = (10000, 20, 50)
+
+
+def freeze_after_init(
+        thresholds: Optional[Tuple[int, int, int]] = REQUEST_GC_THRESHOLDS
+) -> None:
+    """Collects the garbage of the init, moves the remaining objects to the
+    permanent generation, and sets the `thresholds` for the requests."""
+    gc.collect()
+    gc.freeze()
+    if thresholds is not None:
+        gc.set_threshold(*thresholds)
+
+
+def rss_kb() -> int:
+    """Returns the resident set size of the process in KiB."""
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError, IndexError):
+        # not Linux: the peak RSS is the best we have
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class GcTimer:
+    """Measures the pauses of the garbage collector."""
+
+    def __init__(self) -> None:
+        self.collections = 0
+        self.pause_seconds = 0.0
+        self._started: Optional[float] = None
+
+    def __call__(self, phase: str, info: Dict[str, Any]) -> None:
+        if phase == 'start':
+            self._started = time.perf_counter()
+        elif self._started is not None:
+            self.pause_seconds += time.perf_counter() - self._started
+            self.collections += 1
+            self._started = None
+
+    def install(self) -> None:
+        if self not in gc.callbacks:
+            gc.callbacks.append(self)
+
+    def reset(self) -> Tuple[int, float]:
+        """Returns the collections and the pause seconds, and starts
+        counting from zero."""
+        result = self.collections, self.pause_seconds
+        self.collections = 0
+        self.pause_seconds = 0.0
+        return result
+
+
+def _top_allocations(snapshot: 'tracemalloc.Snapshot',
+                     baseline: 'tracemalloc.Snapshot',
+                     top: int) -> List[Dict[str, Any]]:
+    result = []
+    for stat in snapshot.compare_to(baseline, 'lineno')[:top]:
+        if stat.size_diff <= 0:
+            break
+        frame = stat.traceback[0]
+        result.append({'line': f'{frame.filename}:{frame.lineno}',
+                       'sizeDiffKb': round(stat.size_diff / 1024, 1),
+                       'countDiff': stat.count_diff})
+    return result
+
+
+def memory_wrapper(threshold_mb: float = 16.0,
+                   top: int = 10,
+                   trace: bool = True,
+                   frames: int = 1) -> WrapAwsHandlerFunc:
+    """Creates a wrapper for `start(wrap_handler=...)`, that tracks the
+    memory growth across the warm invocations.
+
+    The baseline is taken after the first invocation. When the RSS or the
+    memory traced by `tracemalloc` grows by `threshold_mb` from the baseline,
+    a JSON line is printed with the growth, the GC pauses since the previous
+    line, and (if `trace` is True) the `top` lines of the code that
+    allocated the most since the baseline. Then the baseline is taken again.
+
+        {"lambdarado": "memory", "invocations": 1200, "rssKb": 183000,
+         "rssGrowthKb": 17100, "tracedGrowthKb": 16400, "gcCollections": 95,
+         "gcPauseMs": 41.2, "top": [{"line": "app.py:42",
+         "sizeDiffKb": 15800.2, "countDiff": 120000}]}
+
+    Tracing slows the allocations down, so `trace=False` only watches the
+    RSS. The report is made after the response, if the post-response
+    extension is running.
+    """
+    threshold_kb = threshold_mb * 1024
+
+    def wrap(handler: AwsHandlerFunc) -> AwsHandlerFunc:
+        import tracemalloc
+        if trace and not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        gc_timer = GcTimer()
+        gc_timer.install()
+
+        state: Dict[str, Any] = {'invocations': 0, 'rss': None,
+                                 'traced': 0, 'snapshot': None}
+
+        def snapshot() -> 'tracemalloc.Snapshot':
+            # without the memory of the snapshots themselves
+            return tracemalloc.take_snapshot().filter_traces(
+                (tracemalloc.Filter(False, tracemalloc.__file__),))
+
+        def take_baseline() -> None:
+            state['rss'] = rss_kb()
+            if trace:
+                state['traced'] = tracemalloc.get_traced_memory()[0]
+                state['snapshot'] = snapshot()
+
+        def report(rss: int, traced: int) -> None:
+            collections, pause = gc_timer.reset()
+            line: Dict[str, Any] = {
+                'lambdarado': 'memory',
+                'invocations': state['invocations'],
+                'rssKb': rss,
+                'rssGrowthKb': rss - state['rss'],
+                'gcCollections': collections,
+                'gcPauseMs': round(pause * 1000, 3),
+            }
+            if trace:
+                line['tracedGrowthKb'] = round(
+                    (traced - state['traced']) / 1024, 1)
+                line['top'] = _top_allocations(snapshot(), state['snapshot'],
+                                               top)
+            print(json.dumps(line, separators=(',', ':')))
+            take_baseline()
+
+        def check() -> None:
+            if state['rss'] is None:
+                take_baseline()
+                return
+            rss = rss_kb()
+            traced = tracemalloc.get_traced_memory()[0] if trace else 0
+            if rss - state['rss'] >= threshold_kb \
+                    or (traced - state['traced']) / 1024 >= threshold_kb:
+                report(rss, traced)
+
+        def memory_handler(event: Dict, context) -> Dict:
+            try:
+                return handler(event, context)
+            finally:
+                state['invocations'] += 1
+                after_response(check)
+
+        return memory_handler
+
+    return wrap
@@ -0,0 +1,208 @@
+# SPDX-FileCopyrightText: (c) 2021 Artёm IG <github.com/rtmigo>
+# SPDX-License-Identifier: MIT
+
+# Per-invocation metrics in the CloudWatch Embedded Metric Format (EMF).
+#
+# Each HTTP invocation produces a single JSON line in the stdout, which
+# CloudWatch Logs turns into metrics. The lines are serialized and written in
+# a background thread, like the compact logs.
+
+import contextvars
+import os
+import time
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+from lambdarado._common import AwsHandlerFunc, is_asgi_app
+from lambdarado._extension import after_response
+from lambdarado._http_event import event_format
+from lambdarado._log_writer import BackgroundWriter
+from lambdarado._response import request_method, response_size
+
+# the metrics and their units
+METRICS = (
+    ('Latency', 'Milliseconds'),
+    ('AppTime', 'Milliseconds'),
+    ('ColdStart', 'Count'),
+    ('RequestBytes', 'Bytes'),
+    ('ResponseBytes', 'Bytes'),
+)
+
+# the properties that can be used as the dimensions
+DIMENSION_ROUTE = 'Route'
+DIMENSION_METHOD = 'Method'
+DIMENSION_STATUS_CODE = 'StatusCode'
+DIMENSION_FUNCTION_NAME = 'FunctionName'
+
+# the route of the requests that did not match any route
+UNMATCHED_ROUTE = 'unmatched'
+
+# the record of the current invocation, filled by the app wrapper
+_current: contextvars.ContextVar[Optional[Dict[str, Any]]] = \
+    contextvars.ContextVar('lambdarado_metrics', default=None)
+
+
+def _wsgi_route(app, environ: Dict[str, Any]) -> Optional[str]:
+    """Returns the route template like '/items/<int:id>', if the app is
+    Flask-like (has a Werkzeug `url_map`), or sets `environ['lambdarado.route']`
+    itself."""
+    route = environ.get('lambdarado.route')
+    if route is not None:
+        return route
+    url_map = getattr(app, 'url_map', None)
+    if url_map is None:
+        return None
+    try:
+        rule, _ = url_map.bind_to_environ(environ).match(return_rule=True)
+    except Exception:
+        # NotFound, MethodNotAllowed, RequestRedirect
+        return None
+    return rule.rule
+
+
+class _TimedResult:
+    """Passes the WSGI result through, and records the time when it is
+    closed, i.e. when the body is completely produced."""
+
+    def __init__(self, result: Iterable[bytes], record: Dict[str, Any],
+                 started: float) -> None:
+        self._result = result
+        self._record = record
+        self._started = started
+
+    def __iter__(self):
+        return iter(self._result)
+
+    def close(self) -> None:
+        try:
+            close = getattr(self._result, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            self._record['app_seconds'] = time.perf_counter() - self._started
+
+
+class EmfMetrics:
+    """Writes a line of CloudWatch Embedded Metric Format per HTTP
+    invocation. Pass it to `start(metrics=...)`.
+
+    The line contains the metrics `Latency` (the whole handler), `AppTime`
+    (the app itself), `ColdStart` (1 for the first invocation of the
+    instance), `RequestBytes` and `ResponseBytes`, and the properties
+    `Route`, `Method`, `StatusCode` and `FunctionName`. The `dimensions` are
+    the sets of the property names the metrics are aggregated by; the
+    `default_dimensions` are added to each of them with fixed values.
+
+        start(get_app, metrics=EmfMetrics(
+            namespace='MyApp',
+            dimensions=[['Route'], ['Route', 'Method']],
+            default_dimensions={'Service': 'api'}))
+    """
+
+    def __init__(self, namespace: str = 'lambdarado',
+                 dimensions: Sequence[Sequence[str]] = ((DIMENSION_ROUTE,),),
+                 default_dimensions: Optional[Mapping[str, str]] = None,
+                 writer: Optional[BackgroundWriter] = None) -> None:
+        self.namespace = namespace
+        self.default_dimensions = dict(default_dimensions or {})
+        self.dimensions: List[List[str]] = [
+            list(self.default_dimensions) + list(names)
+            for names in dimensions] or [list(self.default_dimensions)]
+        self.writer = writer if writer is not None else BackgroundWriter()
+        self.function_name = os.environ.get('AWS_LAMBDA_FUNCTION_NAME',
+                                            'local')
+        self._cold = True
+
+    def wrap_app(self, app):
+        """Returns the app (WSGI or ASGI) that records its own duration and
+        the route into the record of the current invocation."""
+        if is_asgi_app(app):
+            return self._wrap_asgi_app(app)
+
+        def timed_wsgi_app(environ, start_response):
+            record = _current.get()
+            if record is None:
+                return app(environ, start_response)
+            started = time.perf_counter()
+            result = app(environ, start_response)
+            record['route'] = _wsgi_route(app, environ)
+            return _TimedResult(result, record, started)
+
+        return timed_wsgi_app
+
+    @staticmethod
+    def _wrap_asgi_app(app):
+        async def timed_asgi_app(scope, receive, send):
+            record = _current.get()
+            if record is None or scope.get('type') != 'http':
+                await app(scope, receive, send)
+                return
+            started = time.perf_counter()
+            try:
+                await app(scope, receive, send)
+            finally:
+                record['app_seconds'] = time.perf_counter() - started
+                # set by the Starlette and FastAPI routers
+                route = scope.get('route')
+                record['route'] = getattr(route, 'path', None)
+
+        return timed_asgi_app
+
+    def wrap(self, handler: AwsHandlerFunc) -> AwsHandlerFunc:
+        """Returns the handler that measures the invocations and writes the
+        metrics. Events other than HTTP requests are not measured."""
+
+        def metrics_handler(event: Dict, context) -> Dict:
+            if not isinstance(event, dict) or event_format(event) is None:
+                return handler(event, context)
+            record: Dict[str, Any] = {}
+            token = _current.set(record)
+            started = time.perf_counter()
+            response = None
+            try:
+                response = handler(event, context)
+                return response
+            finally:
+                latency = time.perf_counter() - started
+                _current.reset(token)
+                cold = self._cold
+                self._cold = False
+                after_response(self._write, event, response, record,
+                               latency, cold, context)
+
+        return metrics_handler
+
+    def _write(self, *args) -> None:
+        self.writer.write(self._line(*args))
+
+    def _line(self, event: Dict, response: Optional[Dict],
+              record: Dict[str, Any], latency: float, cold: bool,
+              context) -> Dict[str, Any]:
+        status = response.get('statusCode', 200) \
+            if isinstance(response, dict) else 500
+        line: Dict[str, Any] = {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': self.namespace,
+                    'Dimensions': self.dimensions,
+                    'Metrics': [{'Name': name, 'Unit': unit}
+                                for name, unit in METRICS],
+                }],
+            },
+            DIMENSION_ROUTE: record.get('route') or UNMATCHED_ROUTE,
+            DIMENSION_METHOD: request_method(event),
+            DIMENSION_STATUS_CODE: str(status),
+            DIMENSION_FUNCTION_NAME: self.function_name,
+            'Latency': round(latency * 1000, 3),
+            'AppTime': round(record.get('app_seconds', 0.0) * 1000, 3),
+            'ColdStart': 1 if cold else 0,
+            # the events have the same `body` and `isBase64Encoded` keys
+            'RequestBytes': response_size(event),
+            'ResponseBytes': response_size(response)
+            if isinstance(response, dict) else 0,
+        }
+        line.update(self.default_dimensions)
+        request_id = getattr(context, 'aws_request_id', None)
+        if request_id is not None:
+            line['requestId'] = request_id
+        return line
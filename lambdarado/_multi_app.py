@@ -0,0 +1,161 @@
+# SPDX-FileCopyrightText: (c) 2021 Artёm IG <github.com/rtmigo>
+# SPDX-License-Identifier: MIT
+
+# Several apps served by one function.
+#
+# The apps are mapped to the path prefixes ('/admin') and to the sources of
+# non-HTTP events ('aws:sqs'). Each app is created by its first request, so
+# the invocation pays only for the init of the app it hits. The requests are
+# dispatched on the level of the Lambda events: each app gets its own
+# handler, and the prefix is moved from PATH_INFO to SCRIPT_NAME when the
+# environ is created, without an additional WSGI layer.
+
+import json
+import threading
+from typing import Any, Callable, Dict, List, Mapping, Optional, Set
+
+from lambdarado._common import AwsHandlerFunc
+from lambdarado._http_event import event_format, format_response, \
+    mount_environ, path_has_prefix
+from lambdarado._response import request_path
+
+# creates the handler for the app mounted at the prefix (script name)
+MakeAppHandler = Callable[[Any, str], AwsHandlerFunc]
+
+
+def is_prefix(key: str) -> bool:
+    return key.startswith('/')
+
+
+def _normalize_prefix(prefix: str) -> str:
+    """'/' becomes '', '/admin/' becomes '/admin'."""
+    return prefix.rstrip('/')
+
+
+class MultiApp:
+    """The apps created lazily by the factories in `get_apps`. The keys are
+    path prefixes (starting with '/') or event sources.
+
+    The prefixes are matched by whole segments, the longest first: '/admin'
+    matches '/admin' and '/admin/users', but not '/administrator'. The
+    non-HTTP events are dispatched by their source; the events of other
+    sources go to the app mounted at '/', if any.
+    """
+
+    def __init__(self, get_apps: Mapping[str, Callable[[], Any]],
+                 on_create: Optional[Callable[[Any], Any]] = None) -> None:
+        if not get_apps:
+            raise ValueError('No apps')
+        self.factories: Dict[str, Callable[[], Any]] = {}
+        self.prefixes: List[str] = []
+        self.sources: Set[str] = set()
+        for key, factory in get_apps.items():
+            if is_prefix(key):
+                prefix = _normalize_prefix(key)
+                if prefix in self.factories:
+                    raise ValueError(f'Duplicate prefix: {key!r}')
+                self.prefixes.append(prefix)
+                self.factories[prefix] = factory
+            else:
+                self.sources.add(key)
+                self.factories[key] = factory
+        # the longest prefixes are matched first
+        self.prefixes.sort(key=len, reverse=True)
+        self.on_create = on_create
+        self._apps: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def created(self) -> Dict[str, Any]:
+        """The apps that are already created, by their keys."""
+        return dict(self._apps)
+
+    def app(self, key: str) -> Any:
+        """Returns the app for the key, creating it on the first call."""
+        app = self._apps.get(key)
+        if app is not None:
+            return app
+        with self._lock:
+            app = self._apps.get(key)
+            if app is None:
+                app = self.factories[key]()
+                if self.on_create is not None:
+                    self.on_create(app)
+                self._apps[key] = app
+        return app
+
+    def route_path(self, path: str) -> Optional[str]:
+        """Returns the prefix of the app serving the path."""
+        for prefix in self.prefixes:
+            if path_has_prefix(path, prefix):
+                return prefix
+        return None
+
+    def route_event(self, event: Dict) -> Optional[str]:
+        """Returns the key of the app for the non-HTTP event."""
+        from lambdarado._event_sources import SOURCE_EVENTBRIDGE, \
+            event_source
+        source = event_source(event)
+        if source is not None:
+            if source in self.sources:
+                return source
+            if 'detail-type' in event and SOURCE_EVENTBRIDGE in self.sources:
+                return SOURCE_EVENTBRIDGE
+        if '' in self.factories:
+            return ''
+        return None
+
+    def make_handler(self, make_app_handler: MakeAppHandler
+                     ) -> AwsHandlerFunc:
+        """Returns the handler that dispatches the events to the handlers
+        created by `make_app_handler(app, script_name)` on the first use of
+        each app."""
+        handlers: Dict[str, AwsHandlerFunc] = {}
+        lock = threading.Lock()
+
+        def get_handler(key: str) -> AwsHandlerFunc:
+            handler = handlers.get(key)
+            if handler is None:
+                with lock:
+                    handler = handlers.get(key)
+                    if handler is None:
+                        script_name = key if is_prefix(key) else ''
+                        handler = make_app_handler(self.app(key),
+                                                   script_name)
+                        handlers[key] = handler
+            return handler
+
+        def multi_app_handler(event: Dict, context: Any) -> Dict:
+            fmt = event_format(event) if isinstance(event, dict) else None
+            if fmt is not None:
+                key = self.route_path(request_path(event))
+                if key is None:
+                    return format_response(
+                        event, fmt, '404 Not Found',
+                        [('Content-Type', 'application/json')],
+                        json.dumps({'message': 'Not Found'}).encode())
+            else:
+                key = self.route_event(event) \
+                    if isinstance(event, dict) else None
+                if key is None:
+                    raise ValueError('No app for the event')
+            return get_handler(key)(event, context)
+
+        return multi_app_handler
+
+    def wsgi_app(self):
+        """Returns the WSGI app dispatching the requests by the prefixes.
+        It is used only for the local runs."""
+
+        def dispatch(environ, start_response):
+            path = environ.get('PATH_INFO', '')
+            prefix = self.route_path(path)
+            if prefix is None:
+                start_response('404 Not Found',
+                               [('Content-Type', 'text/plain')])
+                return [b'Not Found']
+            mount_environ(environ, prefix)
+            return self.app(prefix)(environ, start_response)
+
+        return dispatch
+
@@ -0,0 +1,140 @@
+# SPDX-FileCopyrightText: (c) 2021 Artёm IG <github.com/rtmigo>
+# SPDX-License-Identifier: MIT
+
+# Build-time helpers for the images.
+#
+# The file system of a Lambda function is read-only, so the modules that were
+# not compiled when the image was built are compiled again on every cold
+# start. The import times are measured in a fresh interpreter, as they would
+# be at a cold start.
+
+import ast
+import compileall
+import site
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+
+class ImportTime(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int  # 0 for the modules imported by the script directly
+
+
+def default_paths(script: Path) -> List[Path]:
+    """The directory of the script and the site-packages."""
+    paths = [script.resolve().parent]
+    for directory in site.getsitepackages():
+        path = Path(directory)
+        if path.is_dir() and path not in paths:
+            paths.append(path)
+    return paths
+
+
+def precompile(paths: Sequence[Path], workers: int = 0) -> bool:
+    """Compiles the .py files in `paths` to the `__pycache__` directories.
+    Returns False if some of the files could not be compiled."""
+    success = True
+    for path in paths:
+        if path.is_dir():
+            result = compileall.compile_dir(str(path), quiet=1,
+                                            workers=workers)
+        else:
+            result = compileall.compile_file(str(path), quiet=1)
+        success = success and bool(result)
+    return success
+
+
+def imported_modules(script: Path) -> List[str]:
+    """Returns the absolute imports of the script (including the ones inside
+    the functions), without running it."""
+    tree = ast.parse(script.read_text(), str(script))
+    modules: List[str] = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 \
+                and node.module:
+            names = [node.module]
+        else:
+            continue
+        modules.extend(name for name in names if name not in modules)
+    return modules
+
+
+def _parse_import_times(stderr: str) -> List[ImportTime]:
+    result = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        # the nesting is shown by two spaces per level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        result.append(ImportTime(name.strip(), int(parts[0]), int(parts[1]),
+                                 depth))
+    return result
+
+
+def measure_imports(modules: Sequence[str], cwd: Path,
+                    python: str = sys.executable) -> List[ImportTime]:
+    """Imports the `modules` in a fresh interpreter started in `cwd`, and
+    returns the import times reported by `python -X importtime`."""
+    code = '\n'.join(f'try:\n    import {module}\nexcept Exception:\n'
+                     f'    pass' for module in modules)
+    process = subprocess.run([python, '-X', 'importtime', '-c', code],
+                             cwd=str(cwd), stdout=subprocess.DEVNULL,
+                             stderr=subprocess.PIPE, text=True)
+    times = _parse_import_times(process.stderr)
+    # the modules imported by the interpreter before the code
+    requested = set(modules)
+    first = next((index for index, item in enumerate(times)
+                  if item.depth == 0 and item.module in requested), 0)
+    # the entries of a package precede it, so the start is found by depth
+    while first > 0 and times[first - 1].depth > 0:
+        first -= 1
+    return times[first:]
+
+
+def report_import_cost(script: Path, top: int = 20,
+                       python: str = sys.executable) -> int:
+    """Prints the total import time of the script imports, and the `top`
+    heaviest modules. Returns the total in microseconds."""
+    modules = imported_modules(script)
+    times = measure_imports(modules, script.resolve().parent, python)
+    total = sum(item.cumulative_us for item in times if item.depth == 0)
+    print(f'Import time of {script}: {total / 1000:.1f} ms '
+          f'({len({item.module for item in times})} modules)')
+    # `import a.b` of a module already imported by its package gives one
+    # more row of the same module, so the rows are merged by the name
+    merged: Dict[str, ImportTime] = {}
+    for item in times:
+        known = merged.get(item.module)
+        if known is not None:
+            item = known._replace(
+                self_us=known.self_us + item.self_us,
+                cumulative_us=max(known.cumulative_us, item.cumulative_us),
+                depth=min(known.depth, item.depth))
+        merged[item.module] = item
+    heaviest = sorted(merged.values(), key=lambda item: item.cumulative_us,
+                      reverse=True)[:top]
+    for item in heaviest:
+        print(f'{item.cumulative_us / 1000:>10.1f} ms '
+              f'{item.self_us / 1000:>8.1f} ms self  {item.module}')
+    return total
+
+
+def run_precompile(script: Path, paths: Optional[Sequence[Path]] = None,
+                   report: bool = True, top: int = 20) -> bool:
+    if paths is None or not paths:
+        paths = default_paths(script)
+    success = precompile(paths)
+    print(f'Compiled: {", ".join(str(path) for path in paths)}')
+    if report:
+        report_import_cost(script, top)
+    return success
@@ -0,0 +1,344 @@
+# SPDX-FileCopyrightText: (c) 2021 Artёm IG <github.com/rtmigo>
+# SPDX-License-Identifier: MIT
+
+# Replaying the captured events as load.
+#
+# The events logged by `wrap_aws_handler_default` (the pretty dump of
+# LOG_LAMBDA_REQUESTS, or the JSON lines of LOG_LAMBDA_COMPACT) are read from
+# a file and sent again, either to the handler created in this process, or
+# as HTTP requests to a running local server. The report shows the latency
+# percentiles, the throughput and the slowest routes.
+
+import json
+import math
+import re
+import sys
+import threading
+import time
+import traceback
+from base64 import b64decode
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, \
+    Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from lambdarado._response import request_method, request_path, \
+    request_query
+
+# returns the status code of the response to the event
+SendFunc = Callable[[Dict], int]
+
+_REQUEST_START = '-- request start'
+_REQUEST_END = '-- request end'
+
+# the path segments that are probably identifiers
+_ID_SEGMENT = re.compile(r'^(\d+|[0-9a-fA-F-]{16,})$')
+
+# not sent to the local server
+_SKIPPED_HEADERS = frozenset(('host', 'content-length', 'connection',
+                              'transfer-encoding'))
+
+
+def _is_http_event(obj: Any) -> bool:
+    return isinstance(obj, dict) \
+        and ('httpMethod' in obj or 'http' in obj.get('requestContext', {}))
+
+
+def _from_record(obj: Any) -> Optional[Dict]:
+    """Returns the event from a compact log record, or the event itself."""
+    if isinstance(obj, dict) and obj.get('lambdarado') == 'request':
+        obj = obj.get('event')
+    return obj if _is_http_event(obj) else None
+
+
+def _prefix_stripper(prefix: str) -> Callable[[str], str]:
+    """Returns the function that removes the prefix like `prefix` (e.g. the
+    timestamp of a CloudWatch export) from the lines of the same log. The
+    prefix is taken as the same number of tab- or space-separated fields,
+    since the timestamps may differ in length."""
+    if not prefix:
+        return lambda line: line
+    separator = '\t' if '\t' in prefix else ' '
+    fields = prefix.count(separator)
+    if fields == 0 or not prefix.endswith(separator):
+        return lambda line: line[len(prefix):]
+    return lambda line: line.split(separator, fields)[-1]
+
+
+def parse_events(lines: Iterable[str]) -> Iterator[Dict]:
+    """Yields the HTTP events found in the lines of a log: the pretty dumps
+    between the "-- request start" and "-- request end" lines, the compact
+    request records, or the events as JSON lines. The other lines are
+    skipped. A line may have a prefix before the JSON or the markers, like
+    the timestamp of a CloudWatch export, where each line of a pretty dump
+    is a separate log event."""
+    dump: Optional[List[str]] = None
+    strip = _prefix_stripper('')
+    for line in lines:
+        if dump is not None:
+            line = strip(line)
+            if line.startswith(_REQUEST_END):
+                try:
+                    event = _from_record(json.loads(''.join(dump)))
+                except ValueError:
+                    event = None
+                if event is not None:
+                    yield event
+                dump = None
+            else:
+                dump.append(line)
+            continue
+        start = line.find(_REQUEST_START)
+        if start >= 0 and '{' not in line[:start]:
+            dump = []
+            strip = _prefix_stripper(line[:start])
+            continue
+        start = line.find('{')
+        if start < 0:
+            continue
+        try:
+            event = _from_record(json.loads(line[start:]))
+        except ValueError:
+            continue
+        if event is not None:
+            yield event
+
+
+def read_events(path: str) -> List[Dict]:
+    with open(path, encoding='utf-8') as f:
+        return list(parse_events(f))
+
+
+def route(event: Dict) -> str:
+    """Returns the method and the path of the event, with the numeric and
+    hexadecimal segments replaced by '{id}'."""
+    segments = ['{id}' if _ID_SEGMENT.match(segment) else segment
+                for segment in request_path(event).split('/')]
+    return f"{request_method(event)} {'/'.join(segments)}"
+
+
+def percentile(sorted_values: List[float], share: float) -> float:
+    """Returns the percentile (nearest rank) of the sorted values."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(share * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def _latencies(values: List[float]) -> Dict[str, float]:
+    values = sorted(values)
+    return {'p50': round(percentile(values, 0.5), 3),
+            'p90': round(percentile(values, 0.9), 3),
+            'p99': round(percentile(values, 0.99), 3),
+            'max': round(values[-1], 3) if values else 0.0}
+
+
+def handler_sender(handler: Callable[[Dict, Any], Dict]) -> SendFunc:
+    """Sends the events to the Lambda handler in this process."""
+
+    def send(event: Dict) -> int:
+        # a fresh copy, decoded from JSON as the runtime does
+        response = handler(json.loads(json.dumps(event)), None)
+        return int(response.get('statusCode', 200)) \
+            if isinstance(response, dict) else 200
+
+    return send
+
+
+def _event_headers(event: Dict) -> Dict[str, str]:
+    multi = event.get('multiValueHeaders')
+    if multi:
+        return {name: ','.join(values) for name, values in multi.items()}
+    return dict(event.get('headers') or {})
+
+
+def http_sender(url: str, timeout: float = 30) -> SendFunc:
+    """Sends the events as HTTP requests to the server at `url`. Each
+    thread keeps its own connection."""
+    # imports the `email` package, so it is not imported with lambdarado
+    from http.client import HTTPConnection, HTTPException
+    parts = urlsplit(url)
+    base_path = parts.path.rstrip('/')
+    local = threading.local()
+
+    def connection() -> HTTPConnection:
+        conn = getattr(local, 'connection', None)
+        if conn is None:
+            conn = HTTPConnection(parts.hostname or '127.0.0.1',
+                                  parts.port or 80, timeout=timeout)
+            local.connection = conn
+        return conn
+
+    def send(event: Dict) -> int:
+        path = base_path + request_path(event)
+        query = request_query(event)
+        if query:
+            path += '?' + urlencode(query)
+        headers = {name: value
+                   for name, value in _event_headers(event).items()
+                   if name.lower() not in _SKIPPED_HEADERS}
+        body = event.get('body')
+        data = None
+        if body:
+            data = b64decode(body) if event.get('isBase64Encoded') \
+                else body.encode('utf-8')
+        conn = connection()
+        try:
+            conn.request(request_method(event), path, data, headers)
+            response = conn.getresponse()
+            response.read()
+        except (OSError, HTTPException):
+            conn.close()
+            local.connection = None
+            raise
+        return response.status
+
+    return send
+
+
+class ReplayResult:
+    """The latencies (in milliseconds) and the statuses of the replayed
+    requests, grouped by the routes."""
+
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = {}
+        self.statuses: Dict[int, int] = {}
+        # the requests that raised an exception or returned 5xx
+        self.errors = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def count(self) -> int:
+        return sum(len(values) for values in self.latencies.values())
+
+    def add(self, route_: str, ms: float, status: Optional[int]) -> None:
+        with self._lock:
+            self.latencies.setdefault(route_, []).append(ms)
+            if status is None or status >= 500:
+                self.errors += 1
+            if status is not None:
+                self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def summary(self, top: int = 10) -> Dict[str, Any]:
+        all_values = [ms for values in self.latencies.values()
+                      for ms in values]
+        routes: List[Dict[str, Any]] = [
+            {'route': route_, 'count': len(values), **_latencies(values)}
+            for route_, values in self.latencies.items()]
+        routes.sort(key=lambda r: r['p90'], reverse=True)
+        return {
+            'requests': len(all_values),
+            'errors': self.errors,
+            'seconds': round(self.seconds, 3),
+            'throughput': round(len(all_values) / self.seconds, 1)
+            if self.seconds > 0 else 0.0,
+            'statuses': {str(status): count for status, count
+                         in sorted(self.statuses.items())},
+            'latencyMs': _latencies(all_values),
+            'slowest': routes[:top],
+        }
+
+
+def replay(events: List[Dict], send: SendFunc,
+           concurrency: int = 1,
+           rate: Optional[float] = None,
+           count: Optional[int] = None) -> ReplayResult:
+    """Sends the `events` in their order (repeating them until `count`
+    requests are sent) from `concurrency` threads. With the `rate`, the
+    requests are started at this number per second; otherwise each thread
+    sends the next request as soon as the previous one is answered.
+
+    With the `rate`, the latency is measured from the time the request was
+    scheduled, so it includes the wait for a free thread (as a client of an
+    overloaded server would see it)."""
+    if not events:
+        raise ValueError('No events to replay')
+    count = len(events) if count is None else count
+    result = ReplayResult()
+
+    def send_one(index: int, scheduled: Optional[float] = None) -> None:
+        event = events[index % len(events)]
+        started = time.perf_counter() if scheduled is None else scheduled
+        status: Optional[int]
+        try:
+            status = send(event)
+        except Exception:
+            traceback.print_exc()
+            status = None
+        result.add(route(event), (time.perf_counter() - started) * 1000,
+                   status)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        if rate:
+            for index in range(count):
+                # keeping the schedule, not the interval
+                scheduled = started + index / rate
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(send_one, index, scheduled)
+        else:
+            list(executor.map(send_one, range(count)))
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    latency = summary['latencyMs']
+    statuses = ', '.join(f'{status}: {count}'
+                         for status, count in summary['statuses'].items())
+    lines = [
+        f"requests    {summary['requests']} in {summary['seconds']:.2f} s, "
+        f"{summary['throughput']:.1f}/s",
+        f"errors      {summary['errors']}",
+        f"statuses    {statuses}",
+        f"latency ms  p50 {latency['p50']:.1f}  p90 {latency['p90']:.1f}  "
+        f"p99 {latency['p99']:.1f}  max {latency['max']:.1f}",
+        '',
+        f"{'slowest routes':<48} {'count':>6} {'p50':>8} {'p90':>8} "
+        f"{'max':>8}",
+    ]
+    for r in summary['slowest']:
+        lines.append(f"{r['route'][:48]:<48} {r['count']:>6} "
+                     f"{r['p50']:>8.1f} {r['p90']:>8.1f} {r['max']:>8.1f}")
+    return '\n'.join(lines)
+
+
+def load_app(spec: str) -> Any:
+    """Imports the app factory `module:name` and returns the app it
+    creates, like `start(get_app)` does."""
+    import importlib
+    module_name, _, name = spec.partition(':')
+    if not name:
+        raise ValueError(f'Expected module:get_app, got {spec!r}')
+    get_app = getattr(importlib.import_module(module_name), name)
+    return get_app()
+
+
+def run_replay(path: str, app: Optional[str] = None,
+               url: Optional[str] = None, concurrency: int = 1,
+               rate: Optional[float] = None, count: Optional[int] = None,
+               top: int = 10, as_json: bool = False) -> Tuple[bool, str]:
+    """Replays the events from the file at `path` to the app created by the
+    factory `app` (module:get_app), or to the server at `url`. Returns
+    whether all the requests succeeded, and the report."""
+    events = read_events(path)
+    if not events:
+        raise ValueError(f'No HTTP events found in {path}')
+    if url:
+        send = http_sender(url)
+    elif app:
+        if '' not in sys.path:
+            sys.path.insert(0, '')
+        from lambdarado._lambdarado import make_aws_handler
+        send = handler_sender(make_aws_handler(load_app(app),
+                                               warmer_pings=False))
+    else:
+        raise ValueError('Specify the app or the URL')
+    summary = replay(events, send, concurrency=concurrency, rate=rate,
+                     count=count).summary(top)
+    report = json.dumps(summary, indent=2) if as_json \
+        else format_summary(summary)
+    return summary['errors'] == 0, report
@@ -0,0 +1,203 @@
+# SPDX-FileCopyrightText: (c) 2021 Artёm IG <github.com/rtmigo>
+# SPDX-License-Identifier: MIT
+
+# Long-lived resources (connection pools, HTTP sessions, clients) shared by
+# the warm invocations.
+#
+# The resources are created during the init phase, checked before they are
+# reused by the next invocation (the instance may have been frozen for
+# minutes, and the connections dropped meanwhile), recreated when the check
+# fails, and closed when the runtime shuts down.
+
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from lambdarado._common import AwsHandlerFunc, call_on_shutdown
+
+
+class Resource:
+    """A single resource of the `ResourceRegistry`. The app gets the
+    instance with `get()`."""
+
+    def __init__(self, registry: 'ResourceRegistry', name: str,
+                 create: Callable[[], Any],
+                 check: Optional[Callable[[Any], Any]] = None,
+                 close: Optional[Callable[[Any], Any]] = None,
+                 check_after: float = 0.0,
+                 lazy: bool = False) -> None:
+        self.name = name
+        self.lazy = lazy
+        self._registry = registry
+        self._create = create
+        self._check = check
+        self._close = close
+        self._check_after = check_after
+        self._lock = threading.RLock()
+        self._instance: Any = None
+        self._created = False
+        self._checked_in = 0
+        self._last_used = 0.0
+
+    @property
+    def created(self) -> bool:
+        return self._created
+
+    def get(self) -> Any:
+        """Returns the instance, creating it if needed. The first call in
+        each invocation runs the check (if the resource was idle for at
+        least `check_after` seconds), and recreates the instance if the
+        check fails."""
+        with self._lock:
+            if not self._created:
+                self._open()
+            elif self._checked_in != self._registry.invocation:
+                self._checked_in = self._registry.invocation
+                if time.monotonic() - self._last_used >= self._check_after \
+                        and not self._healthy():
+                    print(f'Resource {self.name!r} failed the check, '
+                          f'recreating')
+                    self._discard()
+                    self._open()
+            self._last_used = time.monotonic()
+            return self._instance
+
+    def invalidate(self) -> None:
+        """Closes the instance, so the next `get()` creates a new one. Call
+        it when the instance turns out to be broken, e.g. on a connection
+        error."""
+        with self._lock:
+            self._discard()
+
+    def close(self) -> None:
+        with self._lock:
+            self._discard()
+
+    def _open(self) -> None:
+        self._instance = self._create()
+        self._created = True
+        self._checked_in = self._registry.invocation
+
+    def _healthy(self) -> bool:
+        if self._check is None:
+            return True
+        try:
+            return self._check(self._instance) is not False
+        except Exception:
+            traceback.print_exc()
+            return False
+
+    def _discard(self) -> None:
+        if not self._created:
+            return
+        instance = self._instance
+        self._instance = None
+        self._created = False
+        if self._close is not None:
+            try:
+                self._close(instance)
+            except Exception:
+                # the instance is already broken in most cases
+                traceback.print_exc()
+
+
+class ResourceRegistry:
+    """Keeps the resources of the app between the invocations.
+
+        db = resources.register(
+            'db', lambda: psycopg2.connect(DSN),
+            check=lambda conn: conn.cursor().execute('SELECT 1'),
+            close=lambda conn: conn.close())
+
+        @app.route('/items')
+        def items():
+            with db.get().cursor() as cursor:
+                ...
+    """
+
+    def __init__(self) -> None:
+        self._resources: Dict[str, Resource] = {}
+        self._lock = threading.Lock()
+        self._shutdown_hooks = False
+        # the number of the current invocation, the resources are checked
+        # once per invocation
+        self.invocation = 0
+
+    def register(self, name: str, create: Callable[[], Any],
+                 check: Optional[Callable[[Any], Any]] = None,
+                 close: Optional[Callable[[Any], Any]] = None,
+                 check_after: float = 0.0,
+                 lazy: bool = False) -> Resource:
+        """Registers the resource and returns it.
+
+        :param create: Creates the instance.
+        :param check: Called with the instance before it is reused by a new
+        invocation. If it raises an exception or returns False, the instance
+        is closed and created again. It should be cheap, like 'SELECT 1'.
+        :param close: Called with the instance when it is discarded or when
+        the runtime shuts down.
+        :param check_after: The check is skipped if the resource was used
+        less than `check_after` seconds ago.
+        :param lazy: If True, the instance is created by the first `get()`
+        instead of the init phase.
+        """
+        with self._lock:
+            if name in self._resources:
+                raise ValueError(f'Resource {name!r} is already registered')
+            resource = Resource(self, name, create, check, close,
+                                check_after, lazy)
+            self._resources[name] = resource
+            return resource
+
+    def __getitem__(self, name: str) -> Any:
+        """Returns the instance of the resource `name`."""
+        return self._resources[name].get()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._resources
+
+    def __iter__(self) -> Iterator[Resource]:
+        return iter(list(self._resources.values()))
+
+    def __len__(self) -> int:
+        return len(self._resources)
+
+    def open(self) -> None:
+        """Creates the resources that are not lazy. The failures are printed
+        and the resources are left to be created by `get()`."""
+        for resource in self:
+            if resource.lazy or resource.created:
+                continue
+            try:
+                resource.get()
+            except Exception:
+                print(f'Failed to create resource {resource.name!r}')
+                traceback.print_exc()
+
+    def close(self) -> None:
+        """Closes the resources in the reverse order of registration."""
+        for resource in reversed(list(self)):
+            resource.close()
+
+    def wrap(self, handler: AwsHandlerFunc) -> AwsHandlerFunc:
+        """Returns the handler that starts a new invocation for the
+        checks."""
+
+        def resources_handler(event: Dict, context) -> Dict:
+            self.invocation += 1
+            return handler(event, context)
+
+        return resources_handler
+
+    def close_on_shutdown(self) -> None:
+        """Closes the resources at exit and on SIGTERM."""
+        if self._shutdown_hooks:
+            return
+        self._shutdown_hooks = True
+        call_on_shutdown(self.close)
+
+
+# the registry used by `start()`
+registry = ResourceRegistry()
+
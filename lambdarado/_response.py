@@ -0,0 +1,154 @@
+# SPDX-FileCopyrightText: (c) 2021 Artёm IG <github.com/rtmigo>
+# SPDX-License-Identifier: MIT
+
+# Helpers for the handler wrappers, that read and modify the Lambda events
+# and responses regardless of their format (REST API, HTTP API, ALB).
+
+from base64 import b64encode
+from binascii import a2b_base64
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+
+def request_header(event: Dict, name: str) -> Optional[str]:
+    """Returns the value of the request header `name` (lowercase).
+    Multiple values are joined with commas."""
+    multi = event.get('multiValueHeaders')
+    if multi:
+        for key, values in multi.items():
+            if key.lower() == name:
+                return ','.join(values)
+        return None
+    headers = event.get('headers')
+    if headers:
+        value = headers.get(name)
+        if value is not None:
+            return value
+        for key, value in headers.items():
+            if key.lower() == name:
+                return value
+    return None
+
+
+def request_method(event: Dict) -> str:
+    method = event.get('httpMethod')
+    if method is None:
+        method = event['requestContext']['http']['method']
+    return method
+
+
+def request_path(event: Dict) -> str:
+    path = event.get('path')
+    if path is None:
+        path = event['rawPath']
+    return path
+
+
+def request_query(event: Dict) -> List[Tuple[str, str]]:
+    """Returns the query parameters as the list of (name, value) pairs."""
+    raw = event.get('rawQueryString')
+    if raw is not None:
+        return parse_qsl(raw, keep_blank_values=True)
+    multi = event.get('multiValueQueryStringParameters')
+    if multi:
+        return [(name, value)
+                for name, values in multi.items() for value in values]
+    single = event.get('queryStringParameters')
+    if single:
+        return list(single.items())
+    return []
+
+
+def response_header(response: Dict, name: str) -> Optional[str]:
+    """Returns the last value of the response header `name` (lowercase)."""
+    multi = response.get('multiValueHeaders')
+    if multi:
+        for key, values in multi.items():
+            if key.lower() == name and values:
+                return values[-1]
+    headers = response.get('headers')
+    if headers:
+        for key, value in headers.items():
+            if key.lower() == name:
+                return value
+    return None
+
+
+def set_response_header(response: Dict, name: str,
+                        value: Optional[str]) -> None:
+    """Replaces all the values of the response header `name` (lowercase)
+    with the `value`. If the `value` is None, removes the header."""
+    for field in ('headers', 'multiValueHeaders'):
+        headers = response.get(field)
+        if headers:
+            for key in [k for k in headers if k.lower() == name]:
+                del headers[key]
+    if value is None:
+        return
+    if 'multiValueHeaders' in response:
+        response['multiValueHeaders'][name] = [value]
+    else:
+        response.setdefault('headers', {})[name] = value
+
+
+def add_vary(response: Dict, header: str) -> None:
+    vary = response_header(response, 'vary')
+    if vary is None:
+        set_response_header(response, 'vary', header)
+    elif header.lower() not in (v.strip().lower() for v in vary.split(',')):
+        set_response_header(response, 'vary', vary + ', ' + header)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Tells whether the `If-None-Match` header matches the `etag`, using
+    the weak comparison."""
+    if if_none_match.strip() == '*':
+        return True
+    if etag.startswith('W/'):
+        etag = etag[2:]
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def not_modified_since(if_modified_since: str, modified: float) -> bool:
+    """Tells whether the resource `modified` at the timestamp is not newer
+    than the date in the `If-Modified-Since` header."""
+    # imported only by the conditional requests
+    from email.utils import parsedate_to_datetime
+    try:
+        since = parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+    return int(modified) <= since
+
+
+def response_body(response: Dict) -> bytes:
+    body = response.get('body')
+    if not body:
+        return b''
+    if response.get('isBase64Encoded'):
+        return a2b_base64(body)
+    return body.encode('utf-8')
+
+
+def set_response_body(response: Dict, body: bytes) -> None:
+    """Sets the binary body to the response."""
+    response['body'] = b64encode(body).decode('ascii')
+    response['isBase64Encoded'] = True
+
+
+def response_size(response: Dict) -> int:
+    """Returns the size of the body as it will be sent by the Lambda
+    service, without decoding it. For text bodies, it is the number of
+    characters."""
+    body = response.get('body')
+    if not body:
+        return 0
+    if response.get('isBase64Encoded'):
+        return len(body) * 3 // 4 - (len(body) - len(body.rstrip('=')))
+    return len(body)
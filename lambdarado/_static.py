@@ -0,0 +1,281 @@
+# SPDX-FileCopyrightText: (c) 2021 Artёm IG <github.com/rtmigo>
+# SPDX-License-Identifier: MIT
+
+# Static files answered straight from the Lambda event.
+#
+# The directories are scanned once, during the init. For each file, the
+# Content-Type, the ETag, the compressed variants and the encoded body of
+# the Lambda response are prepared in advance. The compressed files built
+# with the frontend (`app.js.br`, `app.js.gz`) are used as they are, so the
+# init does not spend time compressing them. The GET and HEAD requests of
+# these files never reach the app, and the conditional requests get
+# `304 Not Modified`.
+
+import os
+import time
+from binascii import a2b_base64
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+from urllib.parse import unquote
+
+from lambdarado._common import AwsHandlerFunc
+from lambdarado._http_event import Headers, event_format, format_response, \
+    _set_body
+from lambdarado._response import request_header, request_method, \
+    request_path, etag_matches, not_modified_since
+from lambdarado._wrap_handler_compress import COMPRESSIBLE_CONTENT_TYPES, \
+    choose_encoding
+
+# leaving room for the headers in the 6 MB payload of the Lambda response
+MAX_ENCODED_SIZE = 6 * 1024 * 1024 - 64 * 1024
+
+# the encodings of the variants, the preferred first, and the extensions of
+# their precompressed files
+_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+class _Variant:
+    """The body of the file in a single encoding, as it is placed to the
+    Lambda response."""
+
+    __slots__ = ('encoding', 'etag', 'length', 'body', 'base64')
+
+    def __init__(self, data: bytes, encoding: Optional[str], etag: str,
+                 content_type: str) -> None:
+        self.encoding = encoding
+        self.etag = etag
+        self.length = len(data)
+        try:
+            encoded = _set_body({}, data, content_type, encoding)
+        except UnicodeDecodeError:
+            # a text file, but not in UTF-8
+            encoded = _set_body({}, data, content_type, 'identity')
+        self.body: str = encoded['body']
+        self.base64: bool = encoded['isBase64Encoded']
+
+    def data(self) -> bytes:
+        if self.base64:
+            return a2b_base64(self.body)
+        return self.body.encode('utf-8')
+
+
+class _File:
+    __slots__ = ('content_type', 'last_modified', 'modified', 'variants')
+
+    def __init__(self, content_type: str, modified: float,
+                 variants: List[_Variant]) -> None:
+        self.content_type = content_type
+        self.modified = int(modified)
+        self.last_modified = time.strftime('%a, %d %b %Y %H:%M:%S GMT',
+                                           time.gmtime(modified))
+        # the identity variant is the first
+        self.variants = variants
+
+    def variant(self, accept_encoding: Optional[str]) -> _Variant:
+        if len(self.variants) > 1:
+            encoding = choose_encoding(
+                accept_encoding,
+                [v.encoding for v in self.variants[1:] if v.encoding])
+            for variant in self.variants[1:]:
+                if variant.encoding == encoding:
+                    return variant
+        return self.variants[0]
+
+
+class StaticFiles:
+    """The files of the `directories` (mapping the URL prefixes to the
+    directories) prepared to be served without the app. Pass it, or just the
+    mapping, to `start(static=...)`.
+
+    The files larger than `max_size`, or too large for the Lambda response,
+    are left to the app. The compressed variants (gzip, and brotli if the
+    `brotli` module is installed) are prepared for the files of
+    `content_types` at least `min_size` bytes long, with the `gzip_level`
+    and the `brotli_quality`. If the directory already has the compressed
+    file next to the original (`app.js.gz`, `app.js.br`), it is used
+    instead. The `index` file also serves its directory.
+    """
+
+    def __init__(self, directories: Mapping[str, str],
+                 cache_control: Optional[str] = 'public, max-age=3600',
+                 min_size: int = 1024,
+                 content_types: Tuple[str, ...] = COMPRESSIBLE_CONTENT_TYPES,
+                 max_size: int = 4 * 1024 * 1024,
+                 index: Optional[str] = 'index.html',
+                 gzip_level: int = 6,
+                 brotli_quality: int = 5) -> None:
+        self.cache_control = cache_control
+        self.min_size = min_size
+        self.content_types = tuple(content_types)
+        self.max_size = max_size
+        self.index = index
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.files: Dict[str, _File] = {}
+        for prefix, directory in directories.items():
+            self._scan(prefix.rstrip('/'), directory)
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def _compressors(self) -> Dict[str, Callable[[bytes], bytes]]:
+        import gzip
+        compressors: Dict[str, Callable[[bytes], bytes]] = {}
+        try:
+            import brotli  # type: ignore
+            compressors['br'] = lambda d: brotli.compress(
+                d, quality=self.brotli_quality)
+        except ImportError:
+            pass
+        compressors['gzip'] = lambda d: gzip.compress(d, self.gzip_level)
+        return compressors
+
+    def _scan(self, prefix: str, directory: str) -> None:
+        compressors = self._compressors()
+        for root, _, names in os.walk(directory):
+            present = set(names)
+            for name in sorted(names):
+                base, extension = os.path.splitext(name)
+                if base in present \
+                        and extension in (ext for _, ext in _ENCODINGS):
+                    # the precompressed variant of another file
+                    continue
+                path = os.path.join(root, name)
+                relative = os.path.relpath(path, directory).replace(os.sep,
+                                                                   '/')
+                prebuilt = {encoding: path + ext
+                            for encoding, ext in _ENCODINGS
+                            if name + ext in present}
+                prepared = self._prepare(path, compressors, prebuilt)
+                if prepared is None:
+                    continue
+                url = f'{prefix}/{relative}'
+                self.files[url] = prepared
+                if name == self.index:
+                    folder = url[:-len(name)]
+                    self.files[folder] = prepared
+                    if folder.rstrip('/'):
+                        self.files[folder.rstrip('/')] = prepared
+
+    def _prepare(self, path: str,
+                 compressors: Dict[str, Callable[[bytes], bytes]],
+                 prebuilt: Dict[str, str]) -> Optional[_File]:
+        # imported when the files are scanned, not with the package
+        import hashlib
+        import mimetypes
+        stat = os.stat(path)
+        if stat.st_size > self.max_size:
+            return None
+        with open(path, 'rb') as f:
+            data = f.read()
+        content_type = mimetypes.guess_type(path)[0] \
+            or 'application/octet-stream'
+        if content_type.startswith('text/') \
+                or content_type == 'application/javascript':
+            content_type += '; charset=utf-8'
+        digest = hashlib.sha256(data).hexdigest()[:32]
+        variants = [_Variant(data, None, f'"{digest}"', content_type)]
+        if len(data) >= self.min_size \
+                and content_type.startswith(self.content_types):
+            for encoding, _ in _ENCODINGS:
+                if encoding in prebuilt:
+                    with open(prebuilt[encoding], 'rb') as f:
+                        compressed = f.read()
+                elif encoding in compressors:
+                    compressed = compressors[encoding](data)
+                else:
+                    continue
+                if len(compressed) < len(data):
+                    variants.append(_Variant(compressed, encoding,
+                                             f'"{digest}-{encoding}"',
+                                             content_type))
+        if len(variants[0].body) > MAX_ENCODED_SIZE:
+            return None
+        return _File(content_type, stat.st_mtime, variants)
+
+    def _headers(self, file: _File, variant: _Variant) -> Headers:
+        headers = [('Content-Type', file.content_type),
+                   ('Content-Length', str(variant.length)),
+                   ('ETag', variant.etag),
+                   ('Last-Modified', file.last_modified)]
+        if self.cache_control:
+            headers.append(('Cache-Control', self.cache_control))
+        if len(file.variants) > 1:
+            headers.append(('Vary', 'Accept-Encoding'))
+        if variant.encoding:
+            headers.append(('Content-Encoding', variant.encoding))
+        return headers
+
+    def _lookup(self, method: str, path: str, header
+                ) -> Optional[Tuple[str, Headers, Optional[_Variant]]]:
+        """Returns the status, the headers, and the variant to send (None
+        for the responses without body). Returns None if the request is not
+        for a static file."""
+        if method not in ('GET', 'HEAD'):
+            return None
+        file = self.files.get(path)
+        if file is None:
+            return None
+        variant = file.variant(header('accept-encoding'))
+        headers = self._headers(file, variant)
+
+        if_none_match = header('if-none-match')
+        if if_none_match is not None:
+            not_modified = etag_matches(if_none_match, variant.etag)
+        else:
+            if_modified_since = header('if-modified-since')
+            not_modified = if_modified_since is not None \
+                and not_modified_since(if_modified_since, file.modified)
+        if not_modified:
+            return ('304 Not Modified',
+                    [h for h in headers if h[0] != 'Content-Length'], None)
+        return '200 OK', headers, None if method == 'HEAD' else variant
+
+    def respond(self, event: Dict) -> Optional[Dict[str, Any]]:
+        """Returns the Lambda response for the event, or None if the event
+        is not a request for a static file."""
+        fmt = event_format(event)
+        if fmt is None:
+            return None
+        found = self._lookup(request_method(event),
+                             unquote(request_path(event)),
+                             lambda name: request_header(event, name))
+        if found is None:
+            return None
+        status, headers, variant = found
+        response = format_response(event, fmt, status, headers, b'')
+        if variant is not None:
+            # the body is encoded once, when the files are scanned
+            response['body'] = variant.body
+            response['isBase64Encoded'] = variant.base64
+        return response
+
+    def wrap(self, handler: AwsHandlerFunc) -> AwsHandlerFunc:
+        """Returns the handler that answers the requests for the static
+        files, and passes the other events to `handler`."""
+
+        def static_handler(event: Dict, context) -> Dict:
+            if isinstance(event, dict):
+                response = self.respond(event)
+                if response is not None:
+                    return response
+            return handler(event, context)
+
+        return static_handler
+
+    def wrap_wsgi(self, wsgi_app):
+        """Returns the WSGI app that serves the static files, and passes the
+        other requests to `wsgi_app`. It is used for the local runs."""
+
+        def static_wsgi_app(environ, start_response):
+            def header(name: str) -> Optional[str]:
+                return environ.get('HTTP_' + name.upper().replace('-', '_'))
+
+            found = self._lookup(environ['REQUEST_METHOD'],
+                                 environ.get('PATH_INFO', ''), header)
+            if found is None:
+                return wsgi_app(environ, start_response)
+            status, headers, variant = found
+            start_response(status, headers)
+            return [variant.data()] if variant is not None else []
+
+        return static_wsgi_app
@@ -0,0 +1,249 @@
+# SPDX-FileCopyrightText: (c) 2021 Artёm IG <github.com/rtmigo>
+# SPDX-License-Identifier: MIT
+
+# Response streaming for Lambda Function URLs with the RESPONSE_STREAM
+# invoke mode.
+#
+# The `awslambdaric` can only return a complete response, so in the
+# streaming mode lambdarado runs its own loop over the Runtime API. The HTTP
+# events of the Function URL are answered by sending the WSGI chunks as they
+# are produced. All the other events are passed to the usual handler and
+# answered with the complete responses.
+#
+# The streamed response is a JSON "prelude" with the status and the headers,
+# eight zero bytes, and then the body.
+
+import base64
+import json
+import os
+import sys
+import traceback
+from http.client import HTTPConnection
+from typing import Any, Callable, Dict, Iterable, Iterator, List, \
+    Optional, Tuple
+
+from lambdarado._common import AwsHandlerFunc, is_asgi_app
+from lambdarado._http_event import FORMAT_URL, Headers, event_format, \
+    event_to_environ, format_response_v2
+
+STREAMING_CONTENT_TYPE = 'application/vnd.awslambda.http-integration-response'
+PRELUDE_SEPARATOR = b'\x00' * 8
+
+_RUNTIME_PREFIX = '/2018-06-01/runtime'
+_ERROR_TYPE_TRAILER = 'Lambda-Runtime-Function-Error-Type'
+_ERROR_BODY_TRAILER = 'Lambda-Runtime-Function-Error-Body'
+
+
+def streaming_available(app) -> bool:
+    """Returns True if the responses of `app` can be streamed here: the
+    app is a WSGI app, and the Runtime API address is known."""
+    return not is_asgi_app(app) and 'AWS_LAMBDA_RUNTIME_API' in os.environ
+
+
+def _error(exc: BaseException, request_id: Optional[str] = None
+           ) -> Dict[str, Any]:
+    """The error in the format of `awslambdaric`."""
+    error: Dict[str, Any] = {
+        'errorMessage': str(exc),
+        'errorType': type(exc).__name__,
+        'stackTrace': traceback.format_tb(exc.__traceback__),
+    }
+    if request_id is not None:
+        error['requestId'] = request_id
+    return error
+
+
+def stream_wsgi(wsgi_app, environ: Dict[str, Any]
+                ) -> Tuple[Dict[str, Any], Iterator[bytes]]:
+    """Calls the app and returns the prelude (status, headers, cookies) and
+    the iterator of the body chunks.
+
+    The app may call `start_response` as late as before returning the first
+    chunk, so the first chunk is produced here. The exceptions raised before
+    that are raised by this function; the later ones by the iterator.
+    """
+    started: List[Tuple[str, Headers]] = []
+    written: List[bytes] = []
+
+    def start_response(status: str, headers: Headers,
+                       exc_info=None) -> Callable[[bytes], Any]:
+        if exc_info is not None and exc_info[0] is not None and started:
+            raise exc_info[1].with_traceback(exc_info[2])
+        started[:] = [(status, headers)]
+        return written.append
+
+    result = wsgi_app(environ, start_response)
+    iterator = iter(result)
+    try:
+        first: Optional[bytes] = next(iterator)
+    except StopIteration:
+        first = None
+    except BaseException:
+        _close(result)
+        raise
+    if not started:
+        _close(result)
+        raise RuntimeError('The WSGI app did not call start_response')
+
+    status, headers = started[0]
+    prelude = format_response_v2(status, headers, b'')
+    del prelude['body']
+    del prelude['isBase64Encoded']
+
+    def chunks() -> Iterator[bytes]:
+        try:
+            while written:
+                yield written.pop(0)
+            if first is not None:
+                yield first
+            for chunk in iterator:
+                while written:
+                    yield written.pop(0)
+                yield chunk
+            while written:
+                yield written.pop(0)
+        finally:
+            _close(result)
+
+    return prelude, chunks()
+
+
+def _close(result: Iterable) -> None:
+    close = getattr(result, 'close', None)
+    if close is not None:
+        close()
+
+
+class RuntimeApiClient:
+    """A minimal client of the Lambda Runtime API, that can also send the
+    responses in the streaming mode."""
+
+    def __init__(self, address: str) -> None:
+        host, _, port = address.partition(':')
+        self._connection = HTTPConnection(host, int(port or 80))
+
+    def _request(self, method: str, path: str, body: bytes = b'',
+                 headers: Optional[Dict[str, str]] = None
+                 ) -> Tuple[int, Dict[str, str], bytes]:
+        self._connection.request(method, _RUNTIME_PREFIX + path, body,
+                                 headers or {})
+        response = self._connection.getresponse()
+        data = response.read()
+        return response.status, dict(response.getheaders()), data
+
+    def next_invocation(self) -> Tuple[Dict[str, str], bytes]:
+        status, headers, body = self._request('GET', '/invocation/next')
+        if status != 200:
+            raise RuntimeError(f'Runtime API returned {status} '
+                               f'for the next invocation')
+        return headers, body
+
+    def post_response(self, request_id: str, body: bytes) -> None:
+        self._request('POST', f'/invocation/{request_id}/response', body,
+                      {'Content-Type': 'application/json'})
+
+    def post_error(self, request_id: str, error: Dict[str, Any]) -> None:
+        self._request('POST', f'/invocation/{request_id}/error',
+                      json.dumps(error).encode('utf-8'),
+                      {'Content-Type': 'application/json',
+                       _ERROR_TYPE_TRAILER: error['errorType']})
+
+    def post_init_error(self, error: Dict[str, Any]) -> None:
+        self._request('POST', '/init/error',
+                      json.dumps(error).encode('utf-8'),
+                      {'Content-Type': 'application/json',
+                       _ERROR_TYPE_TRAILER: error['errorType']})
+
+    def stream_response(self, request_id: str, prelude: Dict[str, Any],
+                        chunks: Iterable[bytes]) -> bool:
+        """Sends the prelude and the chunks as they are produced. If the
+        chunks raise an exception, the error is sent in the trailers.
+        Returns False in this case."""
+        connection = self._connection
+        connection.putrequest(
+            'POST', f'{_RUNTIME_PREFIX}/invocation/{request_id}/response',
+            skip_accept_encoding=True)
+        connection.putheader('Content-Type', STREAMING_CONTENT_TYPE)
+        connection.putheader('Lambda-Runtime-Function-Response-Mode',
+                             'streaming')
+        connection.putheader('Transfer-Encoding', 'chunked')
+        connection.putheader('Trailer',
+                             f'{_ERROR_TYPE_TRAILER}, {_ERROR_BODY_TRAILER}')
+        connection.endheaders()
+
+        def send_chunk(data: bytes) -> None:
+            connection.send(b'%x\r\n%s\r\n' % (len(data), data))
+
+        send_chunk(json.dumps(prelude).encode('utf-8') + PRELUDE_SEPARATOR)
+        trailers = b''
+        try:
+            for chunk in chunks:
+                if chunk:
+                    send_chunk(chunk)
+        except Exception as e:
+            traceback.print_exc()
+            error = _error(e, request_id)
+            encoded = base64.b64encode(json.dumps(error).encode('utf-8'))
+            trailers = (f'{_ERROR_TYPE_TRAILER}: {error["errorType"]}\r\n'
+                        .encode('utf-8')
+                        + _ERROR_BODY_TRAILER.encode('ascii') + b': '
+                        + encoded + b'\r\n')
+        connection.send(b'0\r\n' + trailers + b'\r\n')
+        connection.getresponse().read()
+        return not trailers
+
+
+def _context(request_id: str, headers: Dict[str, str]):
+    from awslambdaric.lambda_context import LambdaContext
+
+    def json_header(name: str) -> Any:
+        value = headers.get(name)
+        return json.loads(value) if value else None
+
+    return LambdaContext(
+        request_id,
+        json_header('Lambda-Runtime-Client-Context'),
+        json_header('Lambda-Runtime-Cognito-Identity'),
+        int(headers.get('Lambda-Runtime-Deadline-Ms') or 0),
+        headers.get('Lambda-Runtime-Invoked-Function-Arn'))
+
+
+def run_streaming_runtime(wsgi_app, aws_handler: AwsHandlerFunc,
+                          on_invocation: Optional[Callable[[], Any]] = None,
+                          address: Optional[str] = None) -> None:
+    """Processes the invocations forever. The Function URL events are
+    answered by streaming the `wsgi_app` responses, the other events by
+    calling `aws_handler`. The `on_invocation` is called before each
+    invocation."""
+    from lambdarado._extension import extension
+    client = RuntimeApiClient(address or os.environ['AWS_LAMBDA_RUNTIME_API'])
+
+    def respond(event: Any, context) -> None:
+        if isinstance(event, dict) and event_format(event) == FORMAT_URL:
+            prelude, chunks = stream_wsgi(
+                wsgi_app, event_to_environ(event, context, FORMAT_URL))
+            client.stream_response(context.aws_request_id, prelude, chunks)
+        else:
+            response = aws_handler(event, context)
+            client.post_response(context.aws_request_id,
+                                 json.dumps(response).encode('utf-8'))
+
+    # the work queued by the invocation runs after the response is sent
+    respond = extension.wrap(respond)  # type: ignore
+
+    while True:
+        headers, payload = client.next_invocation()
+        request_id = headers['Lambda-Runtime-Aws-Request-Id']
+        trace_id = headers.get('Lambda-Runtime-Trace-Id')
+        if trace_id:
+            os.environ['_X_AMZN_TRACE_ID'] = trace_id
+        else:
+            os.environ.pop('_X_AMZN_TRACE_ID', None)
+        if on_invocation is not None:
+            on_invocation()
+        try:
+            respond(json.loads(payload), _context(request_id, headers))
+        except Exception as e:
+            traceback.print_exc()
+            client.post_error(request_id, _error(e, request_id))
+        sys.stdout.flush()
@@ -0,0 +1,83 @@
+# SPDX-FileCopyrightText: (c) 2021 Artёm IG <github.com/rtmigo>
+# SPDX-License-Identifier: MIT
+
+# Warming the app up during the init phase (which runs on a boosted CPU),
+# and answering the keep-warm pings without running the app.
+
+import traceback
+from typing import Any, Callable, Dict, Iterable, Tuple, Union
+
+from lambdarado._common import AwsHandlerFunc
+
+# the payload sent by serverless-plugin-warmup
+WARMER_SOURCE = 'serverless-plugin-warmup'
+
+WARMER_RESPONSE = {'warmed': True}
+
+# a path like '/', a (method, path) tuple, or a function taking the app
+WarmUpItem = Union[str, Tuple[str, str], Callable[[Any], Any]]
+
+
+def is_warmer_ping(event: Any) -> bool:
+    """Returns True for the events like `{"source":
+    "serverless-plugin-warmup"}` or `{"warmer": true}`."""
+    if not isinstance(event, dict):
+        return False
+    return event.get('source') == WARMER_SOURCE \
+        or event.get('warmer') is True
+
+
+def wrap_warmer_pings(handler: AwsHandlerFunc) -> AwsHandlerFunc:
+    """Returns the handler that answers the keep-warm pings with
+    `{"warmed": true}`, and passes the other events to `handler`."""
+
+    def warmer_handler(event: Dict, context: Any) -> Dict:
+        if is_warmer_ping(event):
+            return dict(WARMER_RESPONSE)
+        return handler(event, context)
+
+    return warmer_handler
+
+
+def warm_up_event(method: str, path: str) -> Dict[str, Any]:
+    """Creates the minimal HTTP API event for the warm-up request."""
+    path, _, query = path.partition('?')
+    return {
+        'version': '2.0',
+        'rawPath': path,
+        'rawQueryString': query,
+        'headers': {'host': 'localhost',
+                    'user-agent': 'lambdarado-warm-up'},
+        'requestContext': {
+            'domainName': 'localhost',
+            'http': {'method': method, 'path': path,
+                     'protocol': 'HTTP/1.1', 'sourceIp': '127.0.0.1'}},
+        'isBase64Encoded': False,
+    }
+
+
+def warm_up(app, app_handler: Callable[[Dict, Any], Dict],
+            items: Iterable[WarmUpItem]) -> None:
+    """Runs the warm-up `items` one by one. The requests are passed to
+    `app_handler` (with None as the context), and the functions are called
+    with `app`.
+
+    The failures are printed, but do not stop the init: a cold app is
+    better than no app.
+    """
+    for item in items:
+        try:
+            if callable(item):
+                item(app)
+                continue
+            if isinstance(item, str):
+                method, path = 'GET', item
+            else:
+                method, path = item
+            response = app_handler(warm_up_event(method, path), None)
+            status = response.get('statusCode', 200)
+            if status >= 400:
+                print(f'Warm-up request {method} {path} returned {status}')
+        except Exception:
+            print(f'Warm-up {item!r} failed:')
+            traceback.print_exc()
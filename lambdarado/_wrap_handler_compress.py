@@ -0,0 +1,158 @@
+# SPDX-FileCopyrightText: (c) 2021 Artёm IG <github.com/rtmigo>
+# SPDX-License-Identifier: MIT
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from lambdarado._common import AwsHandlerFunc, WrapAwsHandlerFunc
+from lambdarado._response import request_header, response_header, \
+    set_response_header, add_vary, response_body, set_response_body
+
+COMPRESSIBLE_CONTENT_TYPES: Tuple[str, ...] = (
+    'text/',
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'application/xhtml+xml',
+    'application/problem+json',
+    'application/vnd.api+json',
+    'application/ld+json',
+    'image/svg+xml',
+)
+
+
+def _accepted_encodings(accept_encoding: str) -> Tuple[List[str], Set[str]]:
+    """Parses the Accept-Encoding header and returns the acceptable
+    encodings, the preferred first, and all the encodings listed in the
+    header, including the refused ones (q=0)."""
+    weighted = []
+    listed = set()
+    for index, item in enumerate(accept_encoding.split(',')):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        listed.add(coding)
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if quality > 0:
+            # preferring the higher quality, then the earlier position
+            weighted.append((-quality, index, coding))
+    return [coding for _, _, coding in sorted(weighted)], listed
+
+
+def choose_encoding(accept_encoding: Optional[str],
+                    available: Iterable[str]) -> Optional[str]:
+    """Returns the encoding from `available` that is the most preferred by
+    the client, or None."""
+    if not accept_encoding:
+        return None
+    available = list(available)
+    accepted, listed = _accepted_encodings(accept_encoding)
+    for coding in accepted:
+        if coding == '*':
+            # the wildcard only stands for the encodings not listed
+            # explicitly, so "br;q=0, *" still refuses brotli
+            unlisted = [a for a in available if a not in listed]
+            return unlisted[0] if unlisted else None
+        if coding in available:
+            return coding
+    return None
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """Returns the ETag of the `encoding` of the representation with the
+    `etag`. Each encoding is a different representation, so it needs its
+    own validator, like `"abc"` and `"abc-gzip"`."""
+    if etag.endswith('"'):
+        return f'{etag[:-1]}-{encoding}"'
+    return f'{etag}-{encoding}'
+
+
+def compression_wrapper(
+        min_size: int = 1024,
+        content_types: Iterable[str] = COMPRESSIBLE_CONTENT_TYPES,
+        gzip_level: int = 6,
+        brotli_quality: int = 4) -> WrapAwsHandlerFunc:
+    """Creates a wrapper for `start(wrap_handler=...)`, that compresses the
+    response bodies with brotli or gzip.
+
+    The body is compressed only when the client accepts the encoding, the
+    body is at least `min_size` bytes long, and its Content-Type starts with
+    one of `content_types`. Brotli is only used when the `brotli` module is
+    installed. The ETag set by the app (or by an `etag_wrapper` placed
+    after this one in the chain) gets the suffix of the encoding, like
+    `"abc-gzip"`. Place the `etag_wrapper` before this one, so it compares
+    `If-None-Match` with the ETags of the encoded bodies.
+
+        start(get_app, wrap_handler=chain_wrappers(
+                wrap_aws_handler_default,
+                compression_wrapper(min_size=2048)))
+    """
+
+    # imported when the wrapper is created, not with the package
+    import zlib
+    try:
+        import brotli  # type: ignore
+    except ImportError:
+        brotli = None
+
+    content_type_prefixes = tuple(content_types)
+    available = ['br', 'gzip'] if brotli is not None else ['gzip']
+
+    def compress(body: bytes, encoding: str) -> bytes:
+        if encoding == 'br':
+            return brotli.compress(body, quality=brotli_quality)
+        # the gzip container with zero mtime: the same body is always
+        # compressed to the same bytes, and gets the same ETag
+        compressor = zlib.compressobj(gzip_level, zlib.DEFLATED,
+                                      16 + zlib.MAX_WBITS)
+        return compressor.compress(body) + compressor.flush()
+
+    def wrap(handler: AwsHandlerFunc) -> AwsHandlerFunc:
+        def compressing_handler(event: Dict, context) -> Dict:
+            response = handler(event, context)
+            if not isinstance(response, dict) or not response.get('body'):
+                return response
+            if response.get('statusCode') in (204, 206, 304):
+                return response
+            if response_header(response, 'content-encoding'):
+                return response
+            content_type = response_header(response, 'content-type') or ''
+            if not content_type.startswith(content_type_prefixes):
+                return response
+
+            # the response depends on Accept-Encoding even when we do not
+            # compress this particular one
+            add_vary(response, 'Accept-Encoding')
+
+            encoding = choose_encoding(
+                request_header(event, 'accept-encoding'), available)
+            if encoding is None:
+                return response
+
+            body = response_body(response)
+            if len(body) < min_size:
+                return response
+            compressed = compress(body, encoding)
+            if len(compressed) >= len(body):
+                return response
+
+            set_response_body(response, compressed)
+            set_response_header(response, 'content-encoding', encoding)
+            etag = response_header(response, 'etag')
+            if etag is not None:
+                set_response_header(response, 'etag',
+                                    encoded_etag(etag, encoding))
+            if response_header(response, 'content-length') is not None:
+                set_response_header(response, 'content-length',
+                                    str(len(compressed)))
+            return response
+
+        return compressing_handler
+
+    return wrap
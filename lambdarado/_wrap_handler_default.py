@@ -2,27 +2,65 @@
 # SPDX-License-Identifier: MIT
 
 import json
-import os
 
-from aws_lambda_context import LambdaContext
-from typing import Dict
+from typing import Any, Callable, Dict, FrozenSet, Optional, Sequence, \
+    TYPE_CHECKING
 
 from lambdarado._common import AwsHandlerFunc
+from lambdarado._extension import after_response
+from lambdarado._environ import _is_true_environ, _float_environ, \
+    _int_environ, _list_environ
 
+if TYPE_CHECKING:
+    from aws_lambda_context import LambdaContext
+    from lambdarado._log_writer import BackgroundWriter
 
-def _is_true_environ(key: str, default: bool = False) -> bool:
-    value = os.environ.get(key)
-    if value is None:
-        return default
-    value = value.strip()
-    if value.isdigit():
-        return int(value) != 0
-    value = value.lower()
-    if value == 'true':
-        return True
-    if value == 'false':
-        return False
-    return default
+REDACTED = '***'
+
+
+def _skipping(sample_rate: float) -> Callable[[], bool]:
+    """Returns the function that tells whether the next request is not
+    logged. The `random` module (which imports `hashlib`) is only imported
+    when sampling."""
+    if sample_rate >= 1.0:
+        return lambda: False
+    import random
+    return lambda: random.random() >= sample_rate
+
+
+def _redact(obj: Any, names: FrozenSet[str]) -> Any:
+    """Returns a copy of `obj` with the values of the dict keys from `names`
+    (lowercase) replaced. The `obj` itself is not modified."""
+    if isinstance(obj, dict):
+        return {key: (REDACTED if key.lower() in names
+                      else _redact(value, names))
+                for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [_redact(item, names) for item in obj]
+    return obj
+
+
+def prepare_for_log(obj: Any,
+                    fields: Optional[Sequence[str]] = None,
+                    body_limit: int = -1,
+                    redact: FrozenSet[str] = frozenset()) -> Any:
+    """Reduces the event or the response before logging: keeps only the
+    top-level `fields` (if specified), truncates the `body` to `body_limit`
+    characters (if not negative) and redacts the keys listed in `redact`.
+    """
+    if not isinstance(obj, dict):
+        return obj
+    if fields:
+        obj = {key: obj[key] for key in fields if key in obj}
+    if redact:
+        obj = _redact(obj, redact)
+    if body_limit >= 0:
+        body = obj.get('body')
+        if isinstance(body, str) and len(body) > body_limit:
+            obj = dict(obj)
+            obj['body'] = (body[:body_limit]
+                           + f'...[{len(body) - body_limit} more]')
+    return obj
 
 
 def wrap_aws_handler_default(handler: AwsHandlerFunc) -> AwsHandlerFunc:
@@ -31,6 +69,18 @@ def wrap_aws_handler_default(handler: AwsHandlerFunc) -> AwsHandlerFunc:
     Creates a handler that will write JSON requests and responses to the
     stdout (i.e. CloudWatch logs). The writing is only happens when either
     LOG_LAMBDA_REQUESTS or LOG_LAMBDA_RESPONSES environment variable is set.
+
+    The logging is configured with the environment variables:
+
+    - LOG_LAMBDA_COMPACT: write each request and response as a single JSON
+      line. The lines are serialized and written in a background thread,
+      not on the response path.
+    - LOG_LAMBDA_SAMPLE_RATE: the share of invocations to log, from 0 to 1.
+    - LOG_LAMBDA_FIELDS: comma-separated top-level keys of the events and
+      responses to log (e.g. "path,headers,statusCode").
+    - LOG_LAMBDA_BODY_LIMIT: the max number of body characters to log.
+    - LOG_LAMBDA_REDACT: comma-separated keys (e.g. header names) whose
+      values are replaced with "***".
     """
 
     # todo test it (locally, without aws)
@@ -41,25 +91,101 @@ def wrap_aws_handler_default(handler: AwsHandlerFunc) -> AwsHandlerFunc:
     print(f"wrap_aws_handler_default: log_requests={log_requests}")
     print(f"wrap_aws_handler_default: log_responses={log_responses}")
 
-    if log_requests or log_responses:
-        # if something should be logged
-        def wrapper(event: Dict, context: LambdaContext) -> Dict:
-            if log_requests:
-                print("-- request start -----------------------------------")
-                print(json.dumps(event, indent=2, sort_keys=True))
-                print("-- request end -------------------------------------")
-            response = handler(event, context)
-            if log_responses:
-                print("-- response start ----------------------------------")
-                print(json.dumps(response, indent=2, sort_keys=True))
-                print("-- response end ------------------------------------")
-            return response
-
-        return wrapper
-
-    else:
+    if not (log_requests or log_responses):
         # do not wrap
         return handler
 
+    compact = _is_true_environ("LOG_LAMBDA_COMPACT", default=False)
+    sample_rate = _float_environ("LOG_LAMBDA_SAMPLE_RATE", 1.0)
+    fields = _list_environ("LOG_LAMBDA_FIELDS")
+    body_limit = _int_environ("LOG_LAMBDA_BODY_LIMIT", -1)
+    redact = frozenset(name.lower()
+                       for name in _list_environ("LOG_LAMBDA_REDACT"))
+
+    def prepare(obj: Any) -> Any:
+        return prepare_for_log(obj, fields, body_limit, redact)
+
+    if compact:
+        from lambdarado._log_writer import BackgroundWriter
+        return wrap_compact_logging(handler, log_requests, log_responses,
+                                    sample_rate, BackgroundWriter(),
+                                    prepare)
+
+    skip = _skipping(sample_rate)
+
+    # if something should be logged
+    def wrapper(event: Dict, context: 'LambdaContext') -> Dict:
+        if skip():
+            return handler(event, context)
+        if log_requests:
+            print("-- request start -----------------------------------")
+            print(json.dumps(prepare(event), indent=2, sort_keys=True))
+            print("-- request end -------------------------------------")
+        response = handler(event, context)
+        if log_responses:
+            after_response(print_response, response)
+        return response
+
+    def print_response(response: Dict) -> None:
+        print("-- response start ----------------------------------")
+        print(json.dumps(prepare(response), indent=2, sort_keys=True))
+        print("-- response end ------------------------------------")
+
+    return wrapper
+
+
+def _snapshot(obj: Any) -> Any:
+    """Returns a shallow copy of the event or the response, with its own
+    headers, so the outer wrappers changing them do not race with the
+    serialization in the writer thread."""
+    if not isinstance(obj, dict):
+        return obj
+    result = dict(obj)
+    for field in ('headers', 'multiValueHeaders'):
+        headers = obj.get(field)
+        if isinstance(headers, dict):
+            result[field] = dict(headers)
+    return result
+
+
+def wrap_compact_logging(handler: AwsHandlerFunc,
+                         log_requests: bool,
+                         log_responses: bool,
+                         sample_rate: float,
+                         writer: 'BackgroundWriter',
+                         prepare) -> AwsHandlerFunc:
+    """Logs the requests and responses as single JSON lines like
+
+        {"lambdarado":"request","requestId":"...","event":{...}}
+        {"lambdarado":"response","requestId":"...","response":{...}}
+
+    Only shallow copies are queued on the response path. Reducing,
+    serializing and writing happen in the `writer` thread.
+    """
+
+    def prepare_record(record: Dict) -> Dict:
+        key = 'event' if 'event' in record else 'response'
+        record[key] = prepare(record[key])
+        return record
+
+    writer.prepare = prepare_record
+    skip = _skipping(sample_rate)
+
+    def compact_logging_handler(event: Dict,
+                                context: 'LambdaContext') -> Dict:
+        if skip():
+            return handler(event, context)
+        request_id = getattr(context, 'aws_request_id', None)
+        if log_requests:
+            writer.write({'lambdarado': 'request', 'requestId': request_id,
+                          'event': _snapshot(event)})
+        response = handler(event, context)
+        if log_responses:
+            writer.write({'lambdarado': 'response', 'requestId': request_id,
+                          'response': _snapshot(response)})
+        return response
+
+    return compact_logging_handler
+
 # wrap_aws_handler_default.log_requests = None
 # wrap_aws_handler_default.log_responses = None
@@ -0,0 +1,111 @@
+# SPDX-FileCopyrightText: (c) 2021 Artёm IG <github.com/rtmigo>
+# SPDX-License-Identifier: MIT
+
+# The ETags and the conditional GET requests.
+#
+# A client polling an unchanged resource sends the ETag it got before in
+# `If-None-Match`. The app still builds the response, but the wrapper
+# replaces it with a `304 Not Modified` without the body, so the body is not
+# sent, and not encoded by the Lambda service.
+
+from typing import Dict, Optional
+
+from lambdarado._common import AwsHandlerFunc, WrapAwsHandlerFunc
+from lambdarado._response import request_header, request_method, \
+    response_header, set_response_header, response_size, etag_matches, \
+    not_modified_since
+
+# the representation headers that are not sent with 304
+_NOT_MODIFIED_DROPPED = ('content-length', 'content-type', 'content-encoding')
+
+
+def body_etag(response: Dict) -> str:
+    """Returns the strong ETag for the body of the response, as it is
+    encoded in the response (base64 or text). It is the CRC-32 and the
+    length: fast, and good enough to tell the versions of one resource
+    apart."""
+    # imported by the first response, not with the package
+    import zlib
+    body = response.get('body') or ''
+    data = body.encode('utf-8')
+    checksum = zlib.crc32(data)
+    if response.get('isBase64Encoded'):
+        checksum = zlib.crc32(b'base64', checksum)
+    return f'"{len(data):x}-{checksum:08x}"'
+
+
+def not_modified(response: Dict) -> Dict:
+    """Turns the response into `304 Not Modified` without the body."""
+    response['statusCode'] = 304
+    response['body'] = ''
+    response['isBase64Encoded'] = False
+    for name in _NOT_MODIFIED_DROPPED:
+        set_response_header(response, name, None)
+    return response
+
+
+def _parse_date(value: str) -> Optional[float]:
+    from email.utils import parsedate_to_datetime
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def etag_wrapper(max_size: int = 1024 * 1024) -> WrapAwsHandlerFunc:
+    """Creates a wrapper for `start(wrap_handler=...)`, that adds the ETag
+    to the successful responses of the GET requests, and answers the
+    conditional requests with `304 Not Modified`.
+
+    The ETag is only computed when the app has not set one, and the body is
+    not longer than `max_size`. The `If-None-Match` is compared to the ETag
+    of the response; without it, the `If-Modified-Since` is compared to the
+    `Last-Modified` set by the app.
+
+    The ETag is computed from the body as it is sent. Placed before the
+    `compression_wrapper` in the chain, the wrapper gets the compressed
+    body, and each encoding gets its own ETag:
+
+        start(get_app, wrap_handler=chain_wrappers(
+                wrap_aws_handler_default,
+                etag_wrapper(),
+                compression_wrapper()))
+    """
+
+    def wrap(handler: AwsHandlerFunc) -> AwsHandlerFunc:
+        def etag_handler(event: Dict, context) -> Dict:
+            response = handler(event, context)
+            if not isinstance(response, dict) \
+                    or response.get('statusCode') != 200:
+                return response
+            try:
+                method = request_method(event)
+            except (KeyError, TypeError):
+                # not an HTTP event
+                return response
+            if method not in ('GET', 'HEAD'):
+                return response
+
+            etag = response_header(response, 'etag')
+            if etag is None and response_size(response) <= max_size:
+                etag = body_etag(response)
+                set_response_header(response, 'etag', etag)
+
+            if_none_match = request_header(event, 'if-none-match')
+            if if_none_match is not None:
+                if etag is not None and etag_matches(if_none_match, etag):
+                    return not_modified(response)
+                return response
+
+            if_modified_since = request_header(event, 'if-modified-since')
+            last_modified = response_header(response, 'last-modified')
+            if if_modified_since is not None and last_modified is not None:
+                modified = _parse_date(last_modified)
+                if modified is not None \
+                        and not_modified_since(if_modified_since, modified):
+                    return not_modified(response)
+            return response
+
+        return etag_handler
+
+    return wrap
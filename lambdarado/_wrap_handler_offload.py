@@ -0,0 +1,177 @@
+# SPDX-FileCopyrightText: (c) 2021 Artёm IG <github.com/rtmigo>
+# SPDX-License-Identifier: MIT
+
+# The synchronous Lambda invocation fails when the response payload exceeds
+# 6 MB. The offload wrapper uploads such bodies to an object storage and
+# returns a redirect (or a JSON pointer) to the uploaded object instead.
+
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Optional
+
+from lambdarado._common import AwsHandlerFunc, WrapAwsHandlerFunc
+from lambdarado._response import response_header, set_response_header, \
+    response_body
+
+# the limit of the Lambda response payload
+MAX_PAYLOAD_SIZE = 6 * 1024 * 1024
+
+# the default limit of the body, leaving room for the headers and the JSON
+# envelope of the response
+DEFAULT_MAX_BODY_SIZE = MAX_PAYLOAD_SIZE - 64 * 1024
+
+OFFLOAD_REDIRECT = 'redirect'
+OFFLOAD_POINTER = 'pointer'
+
+
+class OffloadStorage(ABC):
+    """The storage of the offloaded bodies. Subclasses implement `put` and
+    `url`."""
+
+    @abstractmethod
+    def put(self, key: str, body: bytes, content_type: Optional[str],
+            content_encoding: Optional[str]) -> None:
+        ...
+
+    @abstractmethod
+    def url(self, key: str, expires_in: int) -> str:
+        """Returns the URL that gives the object without credentials for
+        `expires_in` seconds."""
+
+
+class MemoryStorage(OffloadStorage):
+    """Keeps the objects in memory. It is meant for tests and local runs,
+    where the URLs only have to be checked, not downloaded."""
+
+    def __init__(self, base_url: str = 'http://localhost/offloaded') -> None:
+        self.base_url = base_url.rstrip('/')
+        self.objects: Dict[str, Dict[str, Any]] = {}
+
+    def put(self, key: str, body: bytes, content_type: Optional[str],
+            content_encoding: Optional[str]) -> None:
+        self.objects[key] = {'body': body, 'content_type': content_type,
+                             'content_encoding': content_encoding}
+
+    def url(self, key: str, expires_in: int) -> str:
+        return f'{self.base_url}/{key}?expires_in={expires_in}'
+
+
+class S3Storage(OffloadStorage):
+    """Uploads the objects to an S3 bucket and returns the presigned URLs.
+
+    Requires `boto3` (pip3 install boto3), unless the `client` is given.
+    The `endpoint_url` allows S3-compatible storages, such as MinIO.
+    """
+
+    def __init__(self, bucket: str, prefix: str = '',
+                 client: Any = None,
+                 endpoint_url: Optional[str] = None) -> None:
+        self.bucket = bucket
+        self.prefix = prefix
+        if client is None:
+            try:
+                import boto3  # type: ignore
+            except ImportError as e:
+                raise ImportError("S3Storage requires boto3: "
+                                  "pip3 install boto3") from e
+            client = boto3.client('s3', endpoint_url=endpoint_url)
+        self.client = client
+
+    def put(self, key: str, body: bytes, content_type: Optional[str],
+            content_encoding: Optional[str]) -> None:
+        extra: Dict[str, str] = {}
+        if content_type:
+            extra['ContentType'] = content_type
+        if content_encoding:
+            extra['ContentEncoding'] = content_encoding
+        self.client.put_object(Bucket=self.bucket, Key=self.prefix + key,
+                               Body=body, **extra)
+
+    def url(self, key: str, expires_in: int) -> str:
+        return self.client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket, 'Key': self.prefix + key},
+            ExpiresIn=expires_in)
+
+
+def _new_key(event: Dict, response: Dict) -> str:
+    # imports `platform`, so it is not imported with lambdarado
+    import uuid
+    return uuid.uuid4().hex
+
+
+def _replace_body(response: Dict, status: int, body: str,
+                  content_type: Optional[str]) -> None:
+    if status != response.get('statusCode') \
+            and 'statusDescription' in response:
+        # ALB
+        response['statusDescription'] = '303 See Other'
+    response['statusCode'] = status
+    response['body'] = body
+    response['isBase64Encoded'] = False
+    for name in ('content-length', 'content-encoding', 'etag',
+                 'content-disposition'):
+        set_response_header(response, name, None)
+    set_response_header(response, 'content-type', content_type)
+
+
+def offload_wrapper(storage: OffloadStorage,
+                    max_body_size: int = DEFAULT_MAX_BODY_SIZE,
+                    mode: str = OFFLOAD_REDIRECT,
+                    expires_in: int = 3600,
+                    make_key: Callable[[Dict, Dict], str] = _new_key
+                    ) -> WrapAwsHandlerFunc:
+    """Creates a wrapper for `start(wrap_handler=...)`, that uploads the
+    bodies longer than `max_body_size` bytes (as encoded in the Lambda
+    response) to the `storage`.
+
+    In the 'redirect' mode, the response is replaced with `303 See Other`
+    to the presigned URL of the object. In the 'pointer' mode, the body is
+    replaced with JSON like `{"offloaded": true, "url": "...", "size": 1234,
+    "contentType": "text/csv", "expiresIn": 3600}` and the status is kept.
+    The cookies and other headers of the response are kept in both modes.
+
+        start(get_app, wrap_handler=chain_wrappers(
+                offload_wrapper(S3Storage('my-bucket', prefix='big/')),
+                compression_wrapper()))
+
+    Place it outside the `compression_wrapper`, so the bodies are offloaded
+    only if they are too large after the compression.
+    """
+    if mode not in (OFFLOAD_REDIRECT, OFFLOAD_POINTER):
+        raise ValueError(f'Unknown offload mode: {mode!r}')
+
+    def wrap(handler: AwsHandlerFunc) -> AwsHandlerFunc:
+        def offloading_handler(event: Dict, context) -> Dict:
+            response = handler(event, context)
+            if not isinstance(response, dict):
+                return response
+            encoded = response.get('body')
+            # the text body is sent as UTF-8, and a character may take up
+            # to four bytes; base64 is ASCII
+            if not encoded or len(encoded) <= max_body_size // 4 \
+                    or len(encoded.encode('utf-8')) <= max_body_size:
+                return response
+
+            body = response_body(response)
+            content_type = response_header(response, 'content-type')
+            content_encoding = response_header(response, 'content-encoding')
+            key = make_key(event, response)
+            storage.put(key, body, content_type, content_encoding)
+            url = storage.url(key, expires_in)
+
+            if mode == OFFLOAD_REDIRECT:
+                _replace_body(response, 303, '', None)
+                set_response_header(response, 'location', url)
+            else:
+                pointer = {'offloaded': True, 'url': url, 'size': len(body),
+                           'contentType': content_type,
+                           'expiresIn': expires_in}
+                _replace_body(response, response.get('statusCode', 200),
+                              json.dumps(pointer), 'application/json')
+            set_response_header(response, 'cache-control', 'no-store')
+            return response
+
+        return offloading_handler
+
+    return wrap
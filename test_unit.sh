@@ -2,6 +2,31 @@
 set -e
 
 python3 -m tests.test_funcs
+python3 -m tests.test_coldstart
+python3 -m tests.test_bootstrap
+python3 -m tests.test_http_event
+python3 -m tests.test_asgi
+python3 -m tests.test_compress
+python3 -m tests.test_cache
+python3 -m tests.test_logging
+python3 -m tests.test_event_sources
+python3 -m tests.test_local_server
+python3 -m tests.test_emulator
+python3 -m tests.test_benchmarks
+python3 -m tests.test_warmup
+python3 -m tests.test_precompile
+python3 -m tests.test_streaming
+python3 -m tests.test_offload
+python3 -m tests.test_metrics
+python3 -m tests.test_deadline
+python3 -m tests.test_resources
+python3 -m tests.test_extension
+python3 -m tests.test_multi_app
+python3 -m tests.test_memory
+python3 -m tests.test_static
+python3 -m tests.test_etag
+python3 -m tests.test_replay
+python3 -m tests.test_batch
 python3 -m tests.test_local
 python3 -m tests.test_docker
 python3 -m tests.test_aws
@@ -0,0 +1,21 @@
+from flask import Flask
+from lambdarado import start
+
+
+def get_app():
+    app = Flask(__name__)
+
+    @app.route('/a')
+    def get_a():
+        return 'AAA'
+
+    @app.route('/b')
+    def get_b():
+        return 'BBB'
+
+    return app
+
+
+print("RUNNING main.py")
+
+start(get_app, single_import=True)
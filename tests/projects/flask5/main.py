@@ -0,0 +1,34 @@
+import time
+
+from flask import Flask, Response
+from lambdarado import start
+
+
+def get_app():
+    app = Flask(__name__)
+
+    @app.route('/a')
+    def get_a():
+        return 'AAA'
+
+    @app.route('/stream')
+    def get_stream():
+        def generate():
+            yield 'first\n'
+            time.sleep(0.3)
+            yield 'second\n'
+
+        return Response(generate(), mimetype='text/plain')
+
+    @app.route('/fail')
+    def get_fail():
+        def generate():
+            yield 'partial\n'
+            raise ValueError('failed in the middle')
+
+        return Response(generate(), mimetype='text/plain')
+
+    return app
+
+
+start(get_app, single_import=True, response_streaming=True)
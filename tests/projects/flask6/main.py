@@ -0,0 +1,18 @@
+import time
+
+from flask import Flask
+from lambdarado import start, after_response
+
+
+def get_app():
+    app = Flask(__name__)
+
+    @app.route('/a')
+    def get_a():
+        after_response(time.sleep, 0.3)
+        return 'AAA'
+
+    return app
+
+
+start(get_app, single_import=True, post_response_extension=True)
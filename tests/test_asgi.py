@@ -0,0 +1,70 @@
+import asyncio
+import unittest
+
+from lambdarado._asgi import is_asgi_app, make_asgi_handler
+from tests.test_http_event import event_v1, event_v2
+
+
+class FanOutApp:
+    """A minimal ASGI app, that makes concurrent "calls" and remembers
+    the loop it runs on."""
+
+    def __init__(self):
+        self.loops = []
+        self.started = False
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            message = await receive()
+            assert message['type'] == 'lifespan.startup'
+            self.started = True
+            await send({'type': 'lifespan.startup.complete'})
+            await receive()
+            return
+
+        self.loops.append(asyncio.get_event_loop())
+        request = await receive()
+
+        async def call(n):
+            await asyncio.sleep(0)
+            return str(n).encode()
+
+        results = await asyncio.gather(*(call(n) for n in range(3)))
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': [(b'content-type', b'text/plain')]})
+        await send({'type': 'http.response.body',
+                    'body': scope['path'].encode() + b':',
+                    'more_body': True})
+        await send({'type': 'http.response.body',
+                    'body': request['body'] + b''.join(results)})
+
+
+def wsgi_app(environ, start_response):
+    pass
+
+
+class TestAsgi(unittest.TestCase):
+    def test_is_asgi(self):
+        self.assertTrue(is_asgi_app(FanOutApp()))
+        self.assertFalse(is_asgi_app(wsgi_app))
+
+    def test_handler_reuses_loop(self):
+        app = FanOutApp()
+        handler = make_asgi_handler(app)
+        self.assertTrue(app.started)
+
+        first = handler(event_v1(), None)
+        self.assertEqual(first['statusCode'], 200)
+        self.assertEqual(first['body'], '/echo:hello012')
+
+        second = handler(event_v2(), None)
+        self.assertEqual(second['body'], '/echo:hello012')
+        self.assertEqual(second['headers'], {'content-type': 'text/plain'})
+
+        self.assertIs(app.loops[0], app.loops[1])
+        handler.loop.run_until_complete(handler.lifespan.shutdown())
+        handler.loop.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
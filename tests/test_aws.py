@@ -40,6 +40,9 @@ if __name__ == "__main__":
     if should_run(4):
         test_project('flask3', ['-m', 'subpkg.mainmain'])
 
+    if should_run(5):
+        test_project('flask4', ['main.py'])
+
     if should_run('cleanup'):
         ecr_delete_images_all(
             '094879913805.dkr.ecr.us-east-1.amazonaws.com/lambdarado_test:latest')
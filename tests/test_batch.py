@@ -0,0 +1,157 @@
+import asyncio
+import base64
+import json
+import time
+import unittest
+
+from lambdarado import batch_wrapper, chain_wrappers, deadline_wrapper, \
+    remaining_time
+from lambdarado._lambdarado import make_aws_handler
+from lambdarado._response import response_body
+from tests.test_http_event import event_v1, event_v2
+
+
+def app(environ, start_response):
+    path = environ['PATH_INFO']
+    if path == '/fail':
+        raise RuntimeError('failed')
+    if path == '/sleep':
+        time.sleep(0.2)
+    if path == '/png':
+        start_response('200 OK', [('Content-Type', 'image/png'),
+                                  ('Set-Cookie', 'a=1')])
+        return [b'\x89PNG']
+    if path == '/deadline':
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return [str(remaining_time() is not None).encode()]
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [f"{environ['REQUEST_METHOD']} {path} "
+            f"{environ['QUERY_STRING']} "
+            f"{environ.get('HTTP_AUTHORIZATION')} "
+            f"{environ.get('HTTP_X_ITEM')} "
+            f"{environ.get('CONTENT_TYPE')} ".encode()
+            + environ['wsgi.input'].read()]
+
+
+async def asgi_app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await receive()
+        await send({'type': 'lifespan.startup.complete'})
+        await receive()
+        return
+    await receive()
+    await asyncio.sleep(0.2)
+    await send({'type': 'http.response.start', 'status': 200,
+                'headers': [(b'content-type', b'text/plain')]})
+    await send({'type': 'http.response.body',
+                'body': scope['path'].encode()})
+
+
+def batch_event(requests, **kwargs):
+    return event_v1(path='/batch', httpMethod='POST',
+                    headers={'Authorization': 'token',
+                             'Content-Type': 'application/json'},
+                    multiValueHeaders=None,
+                    body=json.dumps(requests), **kwargs)
+
+
+def responses(response):
+    return json.loads(response_body(response))['responses']
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.handler = make_aws_handler(app, wrap_handler=batch_wrapper())
+
+    def test_batch(self):
+        response = self.handler(batch_event([
+            {'path': '/a?x=1'},
+            {'method': 'post', 'path': '/b', 'headers': {'X-Item': '2'},
+             'body': {'key': 'value'}},
+            {'path': '/png'},
+        ]), None)
+        self.assertEqual(response['statusCode'], 200)
+        first, second, third = responses(response)
+        self.assertEqual(first['status'], 200)
+        self.assertEqual(first['body'], 'GET /a x=1 token None None ')
+        self.assertEqual(second['body'],
+                         'POST /b  token 2 application/json '
+                         '{"key": "value"}')
+        self.assertTrue(third['isBase64Encoded'])
+        self.assertEqual(base64.b64decode(third['body']), b'\x89PNG')
+        self.assertEqual(third['cookies'], ['a=1'])
+
+    def test_errors(self):
+        first, second = responses(self.handler(batch_event([
+            {'path': '/fail'}, {'method': 'GET'}]), None))
+        self.assertEqual(first['status'], 500)
+        self.assertEqual(second['status'], 400)
+
+    def test_bad_batch(self):
+        response = self.handler(batch_event({'requests': 'x'}), None)
+        self.assertEqual(response['statusCode'], 400)
+        handler = make_aws_handler(app, wrap_handler=batch_wrapper(
+            max_items=2))
+        response = handler(batch_event([{'path': '/'}] * 3), None)
+        self.assertEqual(response['statusCode'], 400)
+
+    def test_max_size(self):
+        handler = make_aws_handler(app, wrap_handler=batch_wrapper(
+            max_size=7000))
+        response = handler(batch_event([
+            {'method': 'POST', 'path': '/a', 'body': 'x' * 3000},
+            # 2000 quotes take 8000 bytes, escaped twice
+            {'method': 'POST', 'path': '/b', 'body': '"' * 2000},
+            {'path': '/c'}]), None)
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual([item['status'] for item in responses(response)],
+                         [200, 413, 200])
+        self.assertLess(len(json.dumps(response['body'])), 7000)
+
+    def test_concurrent(self):
+        started = time.monotonic()
+        items = responses(self.handler(batch_event(
+            {'requests': [{'path': '/sleep'}] * 4}), None))
+        self.assertEqual([item['status'] for item in items], [200] * 4)
+        self.assertLess(time.monotonic() - started, 0.6)
+
+    def test_asgi(self):
+        handler = make_aws_handler(asgi_app, wrap_handler=batch_wrapper())
+        started = time.monotonic()
+        items = responses(handler(batch_event(
+            [{'path': f'/{n}'} for n in range(3)]), None))
+        self.assertEqual([(item['status'], item['body']) for item in items],
+                         [(200, '/0'), (200, '/1'), (200, '/2')])
+        # served concurrently on the loop of the handler
+        self.assertLess(time.monotonic() - started, 0.5)
+        # and the loop is still usable
+        items = responses(handler(batch_event([{'path': '/x'}] * 2), None))
+        self.assertEqual([item['status'] for item in items], [200, 200])
+
+    def test_other_requests(self):
+        response = self.handler(event_v2(
+            rawPath='/batch', requestContext={'http': {'method': 'GET'}}),
+            None)
+        self.assertTrue(response_body(response).startswith(b'GET /batch'))
+        response = self.handler(event_v1(path='/x'), None)
+        self.assertTrue(response_body(response).startswith(b'POST /x'))
+
+    def test_context_variables(self):
+        class Context:
+            @staticmethod
+            def get_remaining_time_in_millis():
+                return 10000
+
+        handler = make_aws_handler(app, wrap_handler=chain_wrappers(
+            batch_wrapper(), deadline_wrapper(interrupt=False)))
+        handler_outer = make_aws_handler(app, wrap_handler=chain_wrappers(
+            deadline_wrapper(interrupt=False), batch_wrapper()))
+        for h in (handler, handler_outer):
+            items = responses(h(batch_event([{'path': '/deadline'}] * 2),
+                                Context()))
+            self.assertEqual([item['body'] for item in items],
+                             ['True', 'True'])
+
+
+if __name__ == '__main__':
+    unittest.main()
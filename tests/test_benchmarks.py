@@ -0,0 +1,46 @@
+import contextlib
+import io
+import unittest
+
+from benchmarks.__main__ import compare
+from benchmarks.events import FORMATS, SIZES, make_event
+from benchmarks.suites import bench_handler
+from lambdarado._http_event import event_format, event_to_environ
+
+
+class TestEvents(unittest.TestCase):
+    def test_formats(self):
+        for fmt in FORMATS:
+            for size in SIZES:
+                event = make_event(fmt, size)
+                self.assertEqual(event_format(event), fmt)
+                environ = event_to_environ(event)
+                self.assertEqual(environ['PATH_INFO'], '/bench/path')
+                expected = {'small': 0, 'medium': 4096, 'large': 262144}
+                self.assertEqual(len(environ['wsgi.input'].read()),
+                                 expected[size])
+
+
+class TestSuites(unittest.TestCase):
+    def test_handler(self):
+        results = {}
+        bench_handler(results, repeat=1, min_time=0.001)
+        self.assertIn('handler.overhead.v2.large', results)
+        self.assertEqual(results['handler.direct.small']['unit'], 'us')
+
+
+class TestCompare(unittest.TestCase):
+    def test_regressions(self):
+        def report(median):
+            return {'lambdarado': '0', 'results': {
+                'a': {'unit': 'us', 'median': median},
+                'handler.overhead.v1.small': {'unit': 'us',
+                                              'median': median}}}
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(compare(report(10), report(10.5), 0.1), [])
+            self.assertEqual(compare(report(10), report(12), 0.1), ['a'])
+
+
+if __name__ == "__main__":
+    unittest.main()
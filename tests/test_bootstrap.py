@@ -0,0 +1,23 @@
+import unittest
+
+import lambdarado
+from lambdarado import _lambdarado
+
+
+class TestSingleImportHandler(unittest.TestCase):
+    def tearDown(self):
+        _lambdarado._installed_handler = None
+
+    def test_not_installed(self):
+        with self.assertRaises(RuntimeError):
+            lambdarado.handler({}, None)
+
+    def test_forwards_to_installed(self):
+        _lambdarado._installed_handler = lambda event, context: {
+            'statusCode': 200, 'body': event['x']}
+        self.assertEqual(lambdarado.handler({'x': 'X'}, None),
+                         {'statusCode': 200, 'body': 'X'})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+import unittest
+from email.utils import formatdate
+
+from lambdarado import ResponseCache
+from lambdarado._cache import response_ttl
+
+
+def get_event(path='/items', query='a=1&b=2', headers=None, method='GET'):
+    return {'version': '2.0', 'rawPath': path, 'rawQueryString': query,
+            'headers': headers or {},
+            'requestContext': {'http': {'method': method}}}
+
+
+class CountingHandler:
+    def __init__(self, headers=None, status=200):
+        self.calls = 0
+        self.headers = headers or {'cache-control': 'max-age=60'}
+        self.status = status
+
+    def __call__(self, event, context):
+        self.calls += 1
+        return {'statusCode': self.status, 'headers': dict(self.headers),
+                'body': f'response {self.calls}', 'isBase64Encoded': False}
+
+
+class TestTtl(unittest.TestCase):
+    def test_cache_control(self):
+        self.assertEqual(
+            response_ttl({'headers': {'Cache-Control': 'max-age=10'}}, 0), 10)
+        self.assertEqual(response_ttl(
+            {'headers': {'Cache-Control': 'max-age=10, s-maxage=20'}}, 0), 20)
+        self.assertIsNone(response_ttl(
+            {'headers': {'Cache-Control': 'private, max-age=10'}}, 0))
+        self.assertIsNone(response_ttl(
+            {'headers': {'Cache-Control': 'no-store'}}, 99))
+
+    def test_expires(self):
+        ttl = response_ttl({'headers': {'Expires': formatdate(
+            timeval=__import__('time').time() + 100, usegmt=True)}}, 0)
+        self.assertTrue(90 < ttl <= 100)
+        self.assertIsNone(response_ttl({'headers': {'Expires': '0'}}, 0))
+
+    def test_default(self):
+        self.assertIsNone(response_ttl({'headers': {}}, 0))
+        self.assertEqual(response_ttl({'headers': {}}, 5), 5)
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_hit(self):
+        cache = ResponseCache()
+        app = CountingHandler()
+        handler = cache.wrap(app)
+        first = handler(get_event(), None)
+        # outer wrappers may change the response
+        first['headers']['x-modified'] = '1'
+        second = handler(get_event(query='b=2&a=1'), None)
+        self.assertEqual(app.calls, 1)
+        self.assertEqual(second['body'], 'response 1')
+        self.assertNotIn('x-modified', second['headers'])
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_post_is_not_cached(self):
+        cache = ResponseCache()
+        app = CountingHandler()
+        handler = cache.wrap(app)
+        handler(get_event(method='POST'), None)
+        handler(get_event(method='POST'), None)
+        self.assertEqual(app.calls, 2)
+        self.assertEqual((cache.hits, cache.misses), (0, 0))
+
+    def test_vary(self):
+        cache = ResponseCache()
+        app = CountingHandler({'cache-control': 'max-age=60',
+                               'vary': 'Accept-Language'})
+        handler = cache.wrap(app)
+        handler(get_event(headers={'accept-language': 'en'}), None)
+        handler(get_event(headers={'accept-language': 'de'}), None)
+        en = handler(get_event(headers={'accept-language': 'en'}), None)
+        self.assertEqual(app.calls, 2)
+        self.assertEqual(en['body'], 'response 1')
+
+    def test_vary_after_eviction(self):
+        cache = ResponseCache(max_entries=2)
+        app = CountingHandler({'cache-control': 'max-age=60',
+                               'vary': 'Accept-Language'})
+        handler = cache.wrap(app)
+        for language in ('en', 'de', 'fr'):
+            # 'en' is evicted by 'fr'
+            handler(get_event(headers={'accept-language': language}), None)
+        self.assertEqual(cache.evictions, 1)
+        de = handler(get_event(headers={'accept-language': 'de'}), None)
+        self.assertEqual(de['body'], 'response 2')
+        self.assertEqual(cache.hits, 1)
+
+    def test_vary_after_replace(self):
+        cache = ResponseCache(default_ttl=60)
+        app = CountingHandler({'vary': 'Accept-Language'})
+        handler = cache.wrap(app)
+        handler(get_event(headers={'accept-language': 'en'}), None)
+        handler(get_event(headers={'accept-language': 'de'}), None)
+        cache.put(get_event(headers={'accept-language': 'en'}),
+                  app(None, None))
+        handler(get_event(headers={'accept-language': 'de'}), None)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(app.calls, 3)
+
+    def test_not_cacheable(self):
+        cache = ResponseCache(default_ttl=60)
+        for headers in ({'cache-control': 'no-store'},
+                        {'set-cookie': 'a=b'}):
+            app = CountingHandler(headers)
+            handler = cache.wrap(app)
+            handler(get_event(), None)
+            handler(get_event(), None)
+            self.assertEqual(app.calls, 2)
+
+    def test_evicts_by_count(self):
+        cache = ResponseCache(max_entries=2)
+        handler = cache.wrap(CountingHandler())
+        for path in ('/1', '/2', '/3'):
+            handler(get_event(path=path), None)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.evictions, 1)
+        self.assertIsNone(cache.get(get_event(path='/1')))
+        self.assertIsNotNone(cache.get(get_event(path='/3')))
+
+    def test_evicts_by_size(self):
+        cache = ResponseCache(max_bytes=500)
+        handler = cache.wrap(CountingHandler())
+        for path in ('/1', '/2', '/3'):
+            handler(get_event(path=path), None)
+        self.assertLessEqual(cache.size_bytes, 500)
+
+    def test_not_http(self):
+        cache = ResponseCache()
+        handler = cache.wrap(lambda event, context: 'done')
+        self.assertEqual(handler({'Records': []}, None), 'done')
+
+
+if __name__ == "__main__":
+    unittest.main()
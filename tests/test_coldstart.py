@@ -0,0 +1,47 @@
+import builtins
+import sys
+import unittest
+
+from lambdarado._coldstart import ColdStartReport, ImportTimer
+
+
+class TestColdStartReport(unittest.TestCase):
+    def test_phases_are_summed(self):
+        report = ColdStartReport()
+        report.add("get_app", 0.001)
+        report.add("get_app", 0.002)
+        self.assertEqual(report.data["phases_ms"]["get_app"], 3.0)
+
+    def test_phase_context(self):
+        report = ColdStartReport()
+        with report.phase("x"):
+            pass
+        self.assertIn("x", report.data["phases_ms"])
+
+    def test_first_invocation(self):
+        report = ColdStartReport()
+        report.mark("ric_main")
+        report.first_invocation()
+        self.assertTrue(report.emitted)
+        phases = report.data["phases_ms"]
+        self.assertIn("ric_bootstrap", phases)
+        self.assertIn("until_first_invocation", phases)
+
+
+class TestImportTimer(unittest.TestCase):
+    def test_measures_and_uninstalls(self):
+        original = builtins.__import__
+        timer = ImportTimer()
+        timer.install()
+        sys.modules.pop('colorsys', None)
+        try:
+            import colorsys  # noqa: F401
+        finally:
+            timer.uninstall()
+        self.assertIs(builtins.__import__, original)
+        self.assertIn('colorsys', timer.times)
+        self.assertEqual(list(timer.heaviest(1)), ['colorsys'])
+
+
+if __name__ == "__main__":
+    unittest.main()
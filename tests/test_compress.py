@@ -0,0 +1,135 @@
+import base64
+import gzip
+import unittest
+
+from lambdarado import chain_wrappers, compression_wrapper, etag_wrapper
+from lambdarado._response import response_header
+from lambdarado._wrap_handler_compress import choose_encoding
+
+BIG_JSON = '{"items": [' + ', '.join(['"x"'] * 1000) + ']}'
+
+
+def make_handler(body=BIG_JSON, content_type='application/json',
+                 **response_fields):
+    def handler(event, context):
+        response = {'statusCode': 200,
+                    'headers': {'Content-Type': content_type},
+                    'body': body,
+                    'isBase64Encoded': False}
+        response.update(response_fields)
+        return response
+
+    return handler
+
+
+def event(accept_encoding):
+    return {'httpMethod': 'GET', 'path': '/',
+            'headers': {'Accept-Encoding': accept_encoding}}
+
+
+class TestChooseEncoding(unittest.TestCase):
+    def test_quality(self):
+        self.assertEqual(choose_encoding('gzip;q=0.5, br', ['br', 'gzip']),
+                         'br')
+        self.assertEqual(choose_encoding('br;q=0, gzip', ['br', 'gzip']),
+                         'gzip')
+        self.assertEqual(choose_encoding('deflate', ['gzip']), None)
+        self.assertEqual(choose_encoding('*', ['gzip']), 'gzip')
+        self.assertEqual(choose_encoding(None, ['gzip']), None)
+
+    def test_wildcard_refused(self):
+        self.assertEqual(choose_encoding('br;q=0, *', ['br', 'gzip']),
+                         'gzip')
+        self.assertEqual(choose_encoding('gzip;q=0, *', ['gzip']), None)
+        self.assertEqual(choose_encoding('*, br;q=0.5', ['br', 'gzip']),
+                         'gzip')
+
+
+class TestCompressionWrapper(unittest.TestCase):
+    def test_gzip(self):
+        handler = compression_wrapper()(make_handler())
+        response = handler(event('gzip'), None)
+        self.assertTrue(response['isBase64Encoded'])
+        self.assertEqual(response['headers']['content-encoding'], 'gzip')
+        self.assertEqual(response['headers']['vary'], 'Accept-Encoding')
+        self.assertEqual(
+            gzip.decompress(base64.b64decode(response['body'])).decode(),
+            BIG_JSON)
+
+    def test_not_accepted(self):
+        handler = compression_wrapper()(make_handler())
+        response = handler(event('identity'), None)
+        self.assertEqual(response['body'], BIG_JSON)
+        self.assertEqual(response['headers']['vary'], 'Accept-Encoding')
+
+    def test_small(self):
+        handler = compression_wrapper(min_size=10000)(make_handler())
+        self.assertEqual(handler(event('gzip'), None)['body'], BIG_JSON)
+
+    def test_not_compressible_type(self):
+        handler = compression_wrapper()(make_handler(
+            content_type='image/png'))
+        self.assertEqual(handler(event('gzip'), None)['body'], BIG_JSON)
+
+    def test_already_encoded(self):
+        handler = compression_wrapper()(make_handler(
+            headers={'Content-Type': 'text/plain', 'Content-Encoding': 'br'}))
+        self.assertEqual(handler(event('gzip'), None)['body'], BIG_JSON)
+
+    def test_multi_value_headers(self):
+        handler = compression_wrapper()(make_handler(
+            headers=None,
+            multiValueHeaders={'Content-Type': ['text/plain'],
+                               'Vary': ['Cookie']}))
+        response = handler(event('gzip'), None)
+        self.assertEqual(response['multiValueHeaders']['content-encoding'],
+                         ['gzip'])
+        self.assertEqual(response['multiValueHeaders']['vary'],
+                         ['Cookie, Accept-Encoding'])
+
+    def test_etag_per_encoding(self):
+        def handler(etag):
+            return compression_wrapper()(lambda event, context: {
+                'statusCode': 200, 'body': BIG_JSON,
+                'headers': {'Content-Type': 'text/plain', 'ETag': etag}})
+
+        strong = handler('"v1"')
+        self.assertEqual(response_header(strong(event('gzip'), None), 'etag'),
+                         '"v1-gzip"')
+        self.assertEqual(
+            response_header(strong(event('identity'), None), 'etag'),
+            '"v1"')
+        weak = handler('W/"v1"')
+        self.assertEqual(response_header(weak(event('gzip'), None), 'etag'),
+                         'W/"v1-gzip"')
+
+    def test_inner_etag_wrapper(self):
+        handler = chain_wrappers(compression_wrapper(), etag_wrapper())(
+            make_handler())
+        plain = response_header(handler(event('identity'), None), 'etag')
+        compressed = response_header(handler(event('gzip'), None), 'etag')
+        self.assertEqual(compressed, plain[:-1] + '-gzip"')
+
+
+class TestChain(unittest.TestCase):
+    def test_order(self):
+        calls = []
+
+        def named(name):
+            def wrap(handler):
+                def wrapped(event, context):
+                    calls.append(name)
+                    return handler(event, context)
+
+                return wrapped
+
+            return wrap
+
+        handler = chain_wrappers(named('outer'), named('inner'))(
+            lambda event, context: calls.append('handler'))
+        handler({}, None)
+        self.assertEqual(calls, ['outer', 'inner', 'handler'])
+
+
+if __name__ == "__main__":
+    unittest.main()
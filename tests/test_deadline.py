@@ -0,0 +1,144 @@
+import asyncio
+import contextlib
+import io
+import json
+import time
+import unittest
+
+from flask import Flask, request
+
+from lambdarado import deadline_wrapper, remaining_time
+from lambdarado._lambdarado import make_aws_handler
+from lambdarado._response import response_header
+from tests.test_http_event import event_v1, event_v2
+
+
+class FakeContext:
+    def __init__(self, remaining_ms):
+        self.deadline = time.monotonic() + remaining_ms / 1000
+
+    def get_remaining_time_in_millis(self):
+        return int((self.deadline - time.monotonic()) * 1000)
+
+
+def create_app():
+    app = Flask(__name__)
+
+    @app.route('/echo', methods=['POST'])
+    def echo():
+        return json.dumps({
+            'remaining': remaining_time(),
+            'deadline': request.environ['lambdarado.deadline']})
+
+    @app.route('/wait', methods=['POST'])
+    def wait():
+        time.sleep(0.5)
+        return 'done'
+
+    @app.route('/slow', methods=['POST'])
+    def slow():
+        try:
+            time.sleep(5)
+        except Exception:
+            # the app's own error handling does not catch the interruption
+            return 'caught'
+        return 'done'
+
+    return app
+
+
+async def asgi_app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await receive()
+        await send({'type': 'lifespan.startup.complete'})
+        await receive()
+        return
+    await receive()
+    await asyncio.sleep(0.5)
+    await send({'type': 'http.response.start', 'status': 200,
+                'headers': [(b'content-type', b'text/plain')]})
+    await send({'type': 'http.response.body', 'body': b'done'})
+
+
+class TestDeadline(unittest.TestCase):
+    def setUp(self):
+        self.handler = make_aws_handler(
+            create_app(), deadline_wrapper(margin_ms=200, interrupt=True))
+
+    def test_deadline_exposed(self):
+        before = time.monotonic()
+        response = self.handler(event_v2(rawPath='/echo'),
+                                FakeContext(1200))
+        body = json.loads(response['body'])
+        self.assertTrue(0.8 < body['remaining'] <= 1.0)
+        self.assertTrue(before + 0.8 < body['deadline'] <= before + 1.0)
+        self.assertIsNone(remaining_time())
+
+    def test_timeout(self):
+        started = time.monotonic()
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = self.handler(event_v1(path='/slow'),
+                                    FakeContext(500))
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(response['statusCode'], 504)
+        self.assertEqual(response_header(response, 'content-type'),
+                         'application/json')
+
+        # the next invocation is not affected by the previous alarm
+        response = self.handler(event_v2(rawPath='/echo'),
+                                FakeContext(1200))
+        self.assertEqual(response['statusCode'], 200)
+
+    def test_timeout_without_interrupt(self):
+        handler = make_aws_handler(create_app(),
+                                   deadline_wrapper(margin_ms=200))
+        started = time.monotonic()
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = handler(event_v1(path='/wait'), FakeContext(500))
+        # not waiting for the app, that sleeps 0.5 s
+        self.assertLess(time.monotonic() - started, 0.45)
+        self.assertEqual(response['statusCode'], 504)
+        # the next request finishes in time
+        response = handler(event_v2(rawPath='/echo'), FakeContext(1200))
+        self.assertEqual(response['statusCode'], 200)
+        self.assertTrue(0.8 < json.loads(response['body'])['remaining'])
+
+    def test_asgi_timeout(self):
+        handler = make_aws_handler(asgi_app,
+                                   deadline_wrapper(margin_ms=200))
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = handler(event_v2(rawPath='/'), FakeContext(500))
+        self.assertEqual(response['statusCode'], 504)
+        # the loop serves the next invocation
+        response = handler(event_v2(rawPath='/'), FakeContext(5000))
+        self.assertEqual(response['body'], 'done')
+
+    def test_error_passed(self):
+        def failing(event, context):
+            raise KeyError('app')
+
+        handler = deadline_wrapper()(failing)
+        with self.assertRaises(KeyError):
+            handler(event_v2(), FakeContext(5000))
+
+    def test_event_loop_not_interrupted(self):
+        handler = make_aws_handler(
+            asgi_app, deadline_wrapper(margin_ms=200, interrupt=True))
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = handler(event_v2(rawPath='/'), FakeContext(500))
+        self.assertEqual(response['statusCode'], 200)
+        # the loop serves the next invocation
+        response = handler(event_v2(rawPath='/'), FakeContext(5000))
+        self.assertEqual(response['body'], 'done')
+
+    def test_no_time_left(self):
+        response = self.handler(event_v2(rawPath='/slow'), FakeContext(100))
+        self.assertEqual(response['statusCode'], 503)
+
+    def test_without_context(self):
+        response = self.handler(event_v2(rawPath='/echo'), None)
+        self.assertIsNone(json.loads(response['body'])['remaining'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -41,3 +41,5 @@ if __name__ == "__main__":
         test_project('flask2', ['-m', 'mainmain'])
     if should_run(4):
         test_project('flask3', ['-m', 'subpkg.mainmain'])
+    if should_run(5):
+        test_project('flask4', ['main.py'])
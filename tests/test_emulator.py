@@ -0,0 +1,183 @@
+import http.client
+import os
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from lambdarado._emulator import RuntimeApiEmulator, FrontServer, \
+    http_request_to_event
+
+PROJECT_DIR = Path(__file__).parent / 'projects' / 'flask1'
+STREAMING_PROJECT_DIR = Path(__file__).parent / 'projects' / 'flask5'
+EXTENSION_PROJECT_DIR = Path(__file__).parent / 'projects' / 'flask6'
+REPO_DIR = Path(__file__).parent.parent
+URL_DOMAIN = 'abc.lambda-url.us-east-1.on.aws'
+
+
+def launch(emulator, project_dir):
+    emulator.launch(
+        [sys.executable, 'main.py'], cwd=str(project_dir),
+        env={'PYTHONPATH': str(REPO_DIR) + os.pathsep
+                           + os.environ.get('PYTHONPATH', '')})
+
+
+class TestEvent(unittest.TestCase):
+    def test_http_request_to_event(self):
+        event = http_request_to_event(
+            'POST', '/path?x=1', {'Cookie': 'a=1; b=2', 'X-Y': 'z'}, b'data')
+        self.assertEqual(event['version'], '2.0')
+        self.assertEqual(event['rawPath'], '/path')
+        self.assertEqual(event['rawQueryString'], 'x=1')
+        self.assertEqual(event['cookies'], ['a=1', 'b=2'])
+        self.assertEqual(event['headers'], {'x-y': 'z'})
+        self.assertEqual(event['requestContext']['http']['method'], 'POST')
+        self.assertEqual(event['body'], 'ZGF0YQ==')
+        self.assertTrue(event['isBase64Encoded'])
+
+
+class TestEmulator(unittest.TestCase):
+    def setUp(self):
+        self.emulator = RuntimeApiEmulator().start()
+        launch(self.emulator, PROJECT_DIR)
+        self.assertTrue(self.emulator.wait_ready(60))
+
+    def tearDown(self):
+        self.emulator.stop()
+
+    def test_invoke(self):
+        first = self.emulator.invoke(
+            http_request_to_event('GET', '/a', {}, b''))
+        second = self.emulator.invoke(
+            http_request_to_event('GET', '/b', {}, b''))
+
+        self.assertEqual(first.result()['statusCode'], 200)
+        self.assertEqual(first.result()['body'], 'AAA')
+        self.assertEqual(second.result()['body'], 'BBB')
+        self.assertTrue(first.cold)
+        self.assertFalse(second.cold)
+        self.assertGreater(first.duration_ms, 0)
+        self.assertGreater(self.emulator.init_duration_ms, 0)
+
+        stats = self.emulator.stats()
+        self.assertEqual([r['cold'] for r in stats['invocations']],
+                         [True, False])
+
+    def test_front_server(self):
+        front = FrontServer(self.emulator, port=0)
+        thread = threading.Thread(target=front.serve_forever)
+        thread.start()
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', front.port,
+                                                    timeout=30)
+            connection.request('GET', '/a')
+            response = connection.getresponse()
+            self.assertEqual(response.status, 200)
+            self.assertEqual(response.read(), b'AAA')
+
+            connection.request('GET', '/missing')
+            response = connection.getresponse()
+            self.assertEqual(response.status, 404)
+            response.read()
+            connection.close()
+        finally:
+            front.shutdown()
+            thread.join()
+
+
+class TestStreaming(unittest.TestCase):
+    def setUp(self):
+        self.emulator = RuntimeApiEmulator().start()
+        launch(self.emulator, STREAMING_PROJECT_DIR)
+        self.assertTrue(self.emulator.wait_ready(60))
+
+    def tearDown(self):
+        self.emulator.stop()
+
+    def url_event(self, path):
+        return http_request_to_event('GET', path, {}, b'',
+                                     domain_name=URL_DOMAIN)
+
+    def test_chunks_arrive_incrementally(self):
+        invocation = self.emulator.invoke(self.url_event('/stream'))
+        result = invocation.result()
+        self.assertEqual(result['statusCode'], 200)
+        self.assertTrue(result['headers']['content-type'].startswith(
+            'text/plain'))
+        self.assertEqual(result['body'], b'first\nsecond\n')
+        self.assertEqual([data for _, data in invocation.chunks],
+                         [b'first\n', b'second\n'])
+        (first_time, _), (second_time, _) = invocation.chunks
+        self.assertGreater(second_time - first_time, 0.2)
+        self.assertLess(invocation.first_byte_ms,
+                        invocation.duration_ms - 200)
+        self.assertTrue(invocation.record()['streamed'])
+
+    def test_other_events_are_buffered(self):
+        invocation = self.emulator.invoke(
+            http_request_to_event('GET', '/a', {}, b''))
+        self.assertIsNone(invocation.prelude)
+        self.assertEqual(invocation.result()['body'], 'AAA')
+        self.assertEqual(self.emulator.invoke({'warmer': True}).result(),
+                         {'warmed': True})
+
+    def test_error_in_the_middle(self):
+        invocation = self.emulator.invoke(self.url_event('/fail'))
+        self.assertEqual(invocation.prelude['statusCode'], 200)
+        self.assertEqual(invocation.chunks[0][1], b'partial\n')
+        self.assertEqual(invocation.error['errorType'], 'ValueError')
+
+    def test_front_server(self):
+        front = FrontServer(self.emulator, port=0, domain_name=URL_DOMAIN)
+        thread = threading.Thread(target=front.serve_forever)
+        thread.start()
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', front.port,
+                                                    timeout=30)
+            connection.request('GET', '/stream')
+            response = connection.getresponse()
+            self.assertEqual(response.status, 200)
+            self.assertEqual(response.getheader('Transfer-Encoding'),
+                             'chunked')
+            self.assertEqual(response.readline(), b'first\n')
+            first_time = time.monotonic()
+            self.assertEqual(response.readline(), b'second\n')
+            self.assertGreater(time.monotonic() - first_time, 0.2)
+            self.assertEqual(response.read(), b'')
+            connection.close()
+        finally:
+            front.shutdown()
+            thread.join()
+
+
+class TestExtension(unittest.TestCase):
+    def setUp(self):
+        self.emulator = RuntimeApiEmulator().start()
+        launch(self.emulator, EXTENSION_PROJECT_DIR)
+        self.assertTrue(self.emulator.wait_ready(60))
+
+    def tearDown(self):
+        self.emulator.stop()
+
+    def test_work_after_response(self):
+        first = self.emulator.submit(
+            http_request_to_event('GET', '/a', {}, b''))
+        second = self.emulator.submit(
+            http_request_to_event('GET', '/a', {}, b''))
+        self.emulator.wait(first)
+        self.emulator.wait(second)
+        self.assertEqual(first.result()['body'], 'AAA')
+        self.assertEqual(len(self.emulator.extensions), 1)
+
+        # the sleep is not counted in the duration of the invocation
+        self.assertLess(first.duration_ms, 300)
+        self.assertGreaterEqual(first.post_response_ms, 250)
+        self.assertEqual(first.record()['postResponseMs'],
+                         first.post_response_ms)
+        # the next invocation waits for the extension
+        self.assertGreaterEqual(second.started, first.released_at)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import gzip
+import unittest
+
+from lambdarado import chain_wrappers, compression_wrapper, etag_wrapper
+from lambdarado._response import etag_matches, response_body, \
+    response_header
+from lambdarado._wrap_handler_etag import body_etag
+
+BIG_JSON = '{"items": [' + ', '.join(['"x"'] * 1000) + ']}'
+
+
+def make_handler(body='{"status": "ok"}', status=200, **headers):
+    def handler(event, context):
+        return {'statusCode': status,
+                'headers': {'Content-Type': 'application/json', **headers},
+                'body': body,
+                'isBase64Encoded': False}
+
+    return handler
+
+
+def event(method='GET', **headers):
+    return {'httpMethod': method, 'path': '/', 'headers': headers}
+
+
+class TestEtagMatches(unittest.TestCase):
+    def test_matches(self):
+        self.assertTrue(etag_matches('"a"', '"a"'))
+        self.assertTrue(etag_matches('"b", W/"a"', '"a"'))
+        self.assertTrue(etag_matches('"a"', 'W/"a"'))
+        self.assertTrue(etag_matches('*', '"a"'))
+        self.assertFalse(etag_matches('"b"', '"a"'))
+
+
+class TestEtagWrapper(unittest.TestCase):
+    def test_adds_etag(self):
+        response = etag_wrapper()(make_handler())(event(), None)
+        self.assertEqual(response['statusCode'], 200)
+        etag = response_header(response, 'etag')
+        self.assertTrue(etag.startswith('"'))
+        other = etag_wrapper()(make_handler('{}'))(event(), None)
+        self.assertNotEqual(response_header(other, 'etag'), etag)
+
+    def test_not_modified(self):
+        handler = etag_wrapper()(make_handler())
+        etag = response_header(handler(event(), None), 'etag')
+        response = handler(event(**{'If-None-Match': etag}), None)
+        self.assertEqual(response['statusCode'], 304)
+        self.assertEqual(response['body'], '')
+        self.assertEqual(response_header(response, 'etag'), etag)
+        self.assertIsNone(response_header(response, 'content-type'))
+
+    def test_changed(self):
+        handler = etag_wrapper()(make_handler())
+        response = handler(event(**{'If-None-Match': '"1-2"'}), None)
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(response['body'], '{"status": "ok"}')
+
+    def test_app_etag(self):
+        handler = etag_wrapper()(make_handler(ETag='"v1"'))
+        self.assertEqual(response_header(handler(event(), None), 'etag'),
+                         '"v1"')
+        response = handler(event(**{'If-None-Match': 'W/"v1"'}), None)
+        self.assertEqual(response['statusCode'], 304)
+
+    def test_if_modified_since(self):
+        handler = etag_wrapper()(make_handler(
+            **{'Last-Modified': 'Wed, 21 Oct 2015 07:28:00 GMT'}))
+        response = handler(event(**{
+            'If-Modified-Since': 'Wed, 21 Oct 2015 07:28:00 GMT'}), None)
+        self.assertEqual(response['statusCode'], 304)
+        response = handler(event(**{
+            'If-Modified-Since': 'Wed, 21 Oct 2015 07:27:59 GMT'}), None)
+        self.assertEqual(response['statusCode'], 200)
+
+    def test_skipped(self):
+        # other methods, other statuses, large bodies
+        response = etag_wrapper()(make_handler())(event('POST'), None)
+        self.assertIsNone(response_header(response, 'etag'))
+        response = etag_wrapper()(make_handler(status=404))(event(), None)
+        self.assertIsNone(response_header(response, 'etag'))
+        response = etag_wrapper(max_size=5)(make_handler())(event(), None)
+        self.assertIsNone(response_header(response, 'etag'))
+        self.assertEqual(etag_wrapper()(make_handler())({'x': 1}, None)
+                         ['statusCode'], 200)
+
+    def test_compressed(self):
+        handler = chain_wrappers(etag_wrapper(),
+                                 compression_wrapper())(make_handler(BIG_JSON))
+        gzipped = handler(event(**{'Accept-Encoding': 'gzip'}), None)
+        plain = handler(event(), None)
+        self.assertEqual(gzip.decompress(response_body(gzipped)).decode(),
+                         BIG_JSON)
+        self.assertNotEqual(response_header(gzipped, 'etag'),
+                            response_header(plain, 'etag'))
+        # the compressed body is the same each time
+        again = handler(event(**{
+            'Accept-Encoding': 'gzip',
+            'If-None-Match': response_header(gzipped, 'etag')}), None)
+        self.assertEqual(again['statusCode'], 304)
+
+    def test_base64_differs_from_text(self):
+        self.assertNotEqual(
+            body_etag({'body': 'YQ==', 'isBase64Encoded': True}),
+            body_etag({'body': 'YQ==', 'isBase64Encoded': False}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import threading
+import unittest
+
+from flask import Flask, request
+
+from lambdarado._event_sources import EventDispatcher, event_source
+from lambdarado._lambdarado import make_aws_handler
+
+
+def create_app(log):
+    app = Flask(__name__)
+
+    @app.route('/jobs', methods=['POST'])
+    def jobs():
+        record = request.get_json()
+        body = record.get('body') or record.get('detail', {}).get('body')
+        with log['lock']:
+            log['bodies'].append(body)
+            log['sources'].append(request.headers['X-Lambdarado-Event-Source'])
+        if body == 'fail':
+            return 'failed', 500
+        if body == 'raise':
+            raise ValueError('raised')
+        return 'ok'
+
+    @app.route('/a')
+    def get_a():
+        return 'AAA'
+
+    return app
+
+
+def sqs_event(*bodies, group=None):
+    records = []
+    for index, body in enumerate(bodies):
+        record = {'eventSource': 'aws:sqs', 'messageId': f'm{index}',
+                  'body': body, 'attributes': {}}
+        if group is not None:
+            record['attributes']['MessageGroupId'] = group
+        records.append(record)
+    return {'Records': records}
+
+
+class TestEventSources(unittest.TestCase):
+    def setUp(self):
+        self.log = {'bodies': [], 'sources': [], 'lock': threading.Lock()}
+        self.app = create_app(self.log)
+        self.app.logger.disabled = True
+
+    def test_event_source(self):
+        self.assertEqual(event_source(sqs_event('x')), 'aws:sqs')
+        self.assertEqual(event_source({'source': 'my.app',
+                                       'detail-type': 'T', 'detail': {}}),
+                         'my.app')
+        self.assertIsNone(event_source({'httpMethod': 'GET'}))
+
+    def test_sqs_partial_failures(self):
+        handler = make_aws_handler(self.app,
+                                   event_routes={'aws:sqs': '/jobs'})
+        result = handler(sqs_event('a', 'fail', 'b', 'raise'), None)
+        self.assertEqual(
+            sorted(f['itemIdentifier'] for f in result['batchItemFailures']),
+            ['m1', 'm3'])
+        self.assertEqual(sorted(self.log['bodies']),
+                         ['a', 'b', 'fail', 'raise'])
+        self.assertEqual(set(self.log['sources']), {'aws:sqs'})
+
+    def test_fifo_group_stops_after_failure(self):
+        dispatcher = EventDispatcher(self.app, {'aws:sqs': '/jobs'})
+        result = dispatcher.wrap(None)(
+            sqs_event('a', 'fail', 'b', group='g'), None)
+        self.assertEqual(self.log['bodies'], ['a', 'fail'])
+        self.assertEqual(
+            [f['itemIdentifier'] for f in result['batchItemFailures']],
+            ['m1', 'm2'])
+
+    def test_eventbridge(self):
+        handler = make_aws_handler(
+            self.app, event_routes={'aws:eventbridge': '/jobs'})
+        event = {'source': 'my.app', 'detail-type': 'T',
+                 'detail': {'body': 'x'}}
+        self.assertEqual(handler(event, None), {})
+        with self.assertRaises(RuntimeError):
+            handler({'source': 'my.app', 'detail-type': 'T',
+                     'detail': {'body': 'fail'}}, None)
+
+    def test_http_still_served(self):
+        handler = make_aws_handler(self.app,
+                                   event_routes={'aws:sqs': '/jobs'})
+        response = handler({'httpMethod': 'GET', 'path': '/a',
+                            'headers': {}}, None)
+        self.assertEqual(response['body'], 'AAA')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import threading
+import time
+import unittest
+
+from lambdarado._emulator import RuntimeApiEmulator
+from lambdarado._extension import PostResponseExtension
+
+
+class TestWithoutExtension(unittest.TestCase):
+    def test_outside_invocation(self):
+        extension = PostResponseExtension()
+        calls = []
+        extension.submit(calls.append, 1)
+        self.assertEqual(calls, [1])
+
+    def test_tasks_run_after_handler(self):
+        extension = PostResponseExtension()
+        calls = []
+
+        def handler(event, context):
+            extension.submit(calls.append, 'task')
+            extension.submit(lambda: 1 / 0)
+            calls.append('handler')
+            return {'statusCode': 200}
+
+        wrapped = extension.wrap(extension.wrap(handler))
+        self.assertEqual(wrapped({}, None), {'statusCode': 200})
+        self.assertEqual(calls, ['handler', 'task'])
+
+    def test_tasks_run_when_handler_raises(self):
+        extension = PostResponseExtension()
+        calls = []
+
+        def handler(event, context):
+            extension.submit(calls.append, 'task')
+            raise ValueError
+
+        with self.assertRaises(ValueError):
+            extension.wrap(handler)({}, None)
+        self.assertEqual(calls, ['task'])
+
+    def test_not_registered_without_runtime_api(self):
+        self.assertFalse(PostResponseExtension().start(address=''))
+
+
+class TestWithEmulator(unittest.TestCase):
+    def setUp(self):
+        self.emulator = RuntimeApiEmulator().start()
+
+    def tearDown(self):
+        self.emulator.stop()
+
+    def test_tasks_run_by_extension_thread(self):
+        extension = PostResponseExtension()
+        self.assertTrue(extension.start(self.emulator.address))
+        self.assertEqual(
+            [e.name for e in self.emulator.extensions.values()],
+            ['lambdarado'])
+
+        threads = []
+        flushed = []
+        extension.add_flush(lambda: flushed.append(True))
+
+        def task():
+            time.sleep(0.2)
+            threads.append(threading.current_thread().name)
+
+        def handler(event, context):
+            extension.submit(task)
+            return {}
+
+        invocation = self.emulator.submit({})
+        # acting as the runtime
+        self.assertIs(self.emulator._next(), invocation)
+        extension.wrap(handler)({}, None)
+        self.emulator._finish(invocation.request_id, b'{}')
+
+        self.assertEqual(threads, [])
+        self.assertTrue(invocation.released.wait(5))
+        self.assertEqual(threads, ['lambdarado-extension'])
+        self.assertEqual(flushed, [True])
+        self.assertGreaterEqual(invocation.post_response_ms, 150)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+import base64
+import unittest
+
+from lambdarado._http_event import event_format, make_wsgi_handler, \
+    event_to_environ, FORMAT_V1, FORMAT_V2, FORMAT_ALB, FORMAT_ALB_MULTI, \
+    FORMAT_URL
+
+
+def echo_app(environ, start_response):
+    body = environ['wsgi.input'].read()
+    if environ['PATH_INFO'] == '/png':
+        start_response('200 OK', [('Content-Type', 'image/png'),
+                                  ('Set-Cookie', 'a=1'),
+                                  ('Set-Cookie', 'b=2')])
+        return [b'\x89PNG', body]
+    start_response('201 Created', [('Content-Type', 'text/plain'),
+                                   ('X-Method', environ['REQUEST_METHOD']),
+                                   ('X-Query', environ['QUERY_STRING'])])
+    return [b'path=', environ['PATH_INFO'].encode(), b' body=', body]
+
+
+def event_v1(**kwargs):
+    event = {
+        'httpMethod': 'POST',
+        'path': '/echo',
+        'headers': {'Content-Type': 'text/plain', 'Host': 'example.com'},
+        'multiValueHeaders': {'Content-Type': ['text/plain'],
+                              'Host': ['example.com']},
+        'queryStringParameters': {'q': 'a b'},
+        'multiValueQueryStringParameters': {'q': ['a b']},
+        'requestContext': {'stage': 'prod'},
+        'body': 'hello',
+        'isBase64Encoded': False,
+    }
+    event.update(kwargs)
+    return event
+
+
+def event_v2(**kwargs):
+    event = {
+        'version': '2.0',
+        'rawPath': '/echo',
+        'rawQueryString': 'q=a+b',
+        'cookies': ['c1=x', 'c2=y'],
+        'headers': {'content-type': 'text/plain', 'host': 'example.com'},
+        'requestContext': {
+            'domainName': 'abc.execute-api.us-east-1.amazonaws.com',
+            'http': {'method': 'POST', 'path': '/echo',
+                     'protocol': 'HTTP/1.1', 'sourceIp': '1.2.3.4'}},
+        'body': base64.b64encode(b'hello').decode(),
+        'isBase64Encoded': True,
+    }
+    event.update(kwargs)
+    return event
+
+
+def event_alb(multi: bool, **kwargs):
+    event = {
+        'httpMethod': 'POST',
+        'path': '/echo',
+        'requestContext': {'elb': {'targetGroupArn': 'arn'}},
+        'body': 'hello',
+        'isBase64Encoded': False,
+    }
+    if multi:
+        event['multiValueHeaders'] = {'content-type': ['text/plain']}
+        event['multiValueQueryStringParameters'] = {'q': ['a%20b']}
+    else:
+        event['headers'] = {'content-type': 'text/plain'}
+        event['queryStringParameters'] = {'q': 'a%20b'}
+    event.update(kwargs)
+    return event
+
+
+class TestEventFormat(unittest.TestCase):
+    def test_formats(self):
+        self.assertEqual(event_format(event_v1()), FORMAT_V1)
+        self.assertEqual(event_format(event_v2()), FORMAT_V2)
+        self.assertEqual(event_format(event_alb(False)), FORMAT_ALB)
+        self.assertEqual(event_format(event_alb(True)), FORMAT_ALB_MULTI)
+        url_event = event_v2()
+        url_event['requestContext']['domainName'] = \
+            'abc.lambda-url.us-east-1.on.aws'
+        self.assertEqual(event_format(url_event), FORMAT_URL)
+        self.assertIsNone(event_format({'Records': []}))
+
+
+class TestEnviron(unittest.TestCase):
+    def test_v1(self):
+        environ = event_to_environ(event_v1(path='/a%20b'))
+        self.assertEqual(environ['PATH_INFO'], '/a b')
+        self.assertEqual(environ['QUERY_STRING'], 'q=a+b')
+        self.assertEqual(environ['SERVER_NAME'], 'example.com')
+        self.assertEqual(environ['CONTENT_TYPE'], 'text/plain')
+        self.assertEqual(environ['CONTENT_LENGTH'], '5')
+
+    def test_v2(self):
+        environ = event_to_environ(event_v2())
+        self.assertEqual(environ['REMOTE_ADDR'], '1.2.3.4')
+        self.assertEqual(environ['HTTP_COOKIE'], 'c1=x; c2=y')
+        self.assertEqual(environ['wsgi.input'].read(), b'hello')
+
+    def test_alb_query_is_not_encoded_twice(self):
+        environ = event_to_environ(event_alb(True))
+        self.assertEqual(environ['QUERY_STRING'], 'q=a%20b')
+
+    def test_forwarded_for(self):
+        environ = event_to_environ(event_v1(
+            headers={'X-Forwarded-For': '5.6.7.8, 10.0.0.1'},
+            multiValueHeaders=None))
+        self.assertEqual(environ['REMOTE_ADDR'], '5.6.7.8')
+
+
+class TestHandler(unittest.TestCase):
+    def setUp(self):
+        self.handler = make_wsgi_handler(echo_app)
+
+    def test_v1_text(self):
+        response = self.handler(event_v1(), None)
+        self.assertEqual(response['statusCode'], 201)
+        self.assertEqual(response['body'], 'path=/echo body=hello')
+        self.assertFalse(response['isBase64Encoded'])
+        self.assertEqual(response['multiValueHeaders']['X-Query'], ['q=a+b'])
+
+    def test_v1_single_value(self):
+        event = event_v1()
+        del event['multiValueHeaders']
+        response = self.handler(event, None)
+        self.assertEqual(response['headers']['X-Method'], 'POST')
+
+    def test_v2_binary_and_cookies(self):
+        response = self.handler(event_v2(rawPath='/png'), None)
+        self.assertTrue(response['isBase64Encoded'])
+        self.assertEqual(base64.b64decode(response['body']),
+                         b'\x89PNGhello')
+        self.assertEqual(response['cookies'], ['a=1', 'b=2'])
+        self.assertNotIn('set-cookie', response['headers'])
+
+    def test_alb(self):
+        response = self.handler(event_alb(False), None)
+        self.assertEqual(response['statusDescription'], '201 Created')
+        self.assertEqual(response['headers']['X-Method'], 'POST')
+
+    def test_alb_multi(self):
+        response = self.handler(event_alb(True, path='/png'), None)
+        self.assertEqual(response['multiValueHeaders']['Set-Cookie'],
+                         ['a=1', 'b=2'])
+
+    def test_not_http(self):
+        with self.assertRaises(ValueError):
+            self.handler({'Records': []}, None)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -67,3 +67,5 @@ if __name__ == "__main__":
         test_local('flask2', ['-m', 'mainmain'])
     if should_run(4):
         test_local('flask3', ['-m', 'subpkg.mainmain'])
+    if should_run(5):
+        test_local('flask4', ['main.py'])
@@ -0,0 +1,169 @@
+import contextlib
+import http.client
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from lambdarado._local_server import LocalServerConfig, \
+    local_server_mode, gunicorn_options
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def echo_app(environ, start_response):
+    body = environ['wsgi.input'].read()
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [environ['REQUEST_METHOD'].encode(), b' ',
+            environ['PATH_INFO'].encode(), b' ', body]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def production_server(workers=1, threads=2, keep_alive=2.0):
+    """Runs `echo_app` in the production local server (gunicorn) in a
+    separate process, and yields the port."""
+    port = _free_port()
+    code = ('from lambdarado._local_server import LocalServerConfig, '
+            'run_production_server\n'
+            'from tests.test_local_server import echo_app\n'
+            'run_production_server(echo_app, "127.0.0.1", LocalServerConfig('
+            f'workers={workers}, threads={threads}, '
+            f'keep_alive={keep_alive}, backlog=16, port={port}))\n')
+    process = subprocess.Popen([sys.executable, '-c', code], cwd=str(ROOT),
+                               stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 15
+        while True:
+            # not just the port: a worker has booted and answers
+            connection = http.client.HTTPConnection('127.0.0.1', port,
+                                                    timeout=5)
+            try:
+                connection.request('GET', '/')
+                connection.getresponse().read()
+                break
+            except OSError:
+                if process.poll() is not None \
+                        or time.monotonic() > deadline:
+                    raise RuntimeError('The server did not start')
+                time.sleep(0.1)
+            finally:
+                connection.close()
+        yield port
+    finally:
+        # the quick shutdown, not waiting for the keep-alive connections
+        process.send_signal(signal.SIGINT)
+        process.wait(15)
+
+
+def require_gunicorn(test: unittest.TestCase) -> None:
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        test.skipTest('gunicorn is not installed')
+
+
+class TestProductionServer(unittest.TestCase):
+    keep_alive = 2.0
+
+    def setUp(self):
+        require_gunicorn(self)
+        self.server = production_server(keep_alive=self.keep_alive)
+        self.port = self.server.__enter__()
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+
+    def connect(self):
+        return http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+
+    def test_keep_alive(self):
+        connection = self.connect()
+        try:
+            connection.request('POST', '/x', body=b'data')
+            response = connection.getresponse()
+            self.assertEqual(response.read(), b'POST /x data')
+            first_socket = connection.sock
+
+            connection.request('GET', '/a%20b')
+            self.assertEqual(connection.getresponse().read(), b'GET /a b ')
+            # the same connection was reused
+            self.assertIs(connection.sock, first_socket)
+        finally:
+            connection.close()
+
+    def test_idle_connections_do_not_hold_threads(self):
+        # more keep-alive clients than the threads
+        connections = [self.connect() for _ in range(4)]
+        try:
+            started = time.monotonic()
+            for connection in connections:
+                connection.request('GET', '/x')
+                self.assertEqual(connection.getresponse().read(),
+                                 b'GET /x ')
+            # and each of them again, on the same connection
+            for connection in connections:
+                connection.request('GET', '/y')
+                self.assertEqual(connection.getresponse().read(),
+                                 b'GET /y ')
+            self.assertLess(time.monotonic() - started, 1.0)
+        finally:
+            for connection in connections:
+                connection.close()
+
+
+class TestIdleTimeout(unittest.TestCase):
+    def test_closes_idle(self):
+        require_gunicorn(self)
+        # a fractional keep-alive is rounded up to a second
+        with production_server(keep_alive=0.5) as port, \
+                socket.create_connection(('127.0.0.1', port),
+                                         timeout=5) as sock:
+            sock.sendall(b'GET /a HTTP/1.1\r\nHost: x\r\n\r\n')
+            received = b''
+            # the last chunk of the response
+            while not received.endswith(b'0\r\n\r\n'):
+                data = sock.recv(65536)
+                self.assertTrue(data)
+                received += data
+            time.sleep(2)
+            # closed by the server
+            self.assertEqual(sock.recv(65536), b'')
+
+
+class TestConfig(unittest.TestCase):
+    def test_keep_alive_float(self):
+        with mock.patch.dict(os.environ, {'LAMBDARADO_KEEP_ALIVE': '2.5'}):
+            self.assertEqual(LocalServerConfig().keep_alive, 2.5)
+
+    def test_gunicorn_options(self):
+        options = gunicorn_options('0.0.0.0', LocalServerConfig(
+            workers=4, threads=16, keep_alive=2.5, backlog=64, port=8080))
+        self.assertEqual(options['bind'], '0.0.0.0:8080')
+        self.assertEqual(options['workers'], 4)
+        self.assertEqual(options['threads'], 16)
+        self.assertEqual(options['worker_class'], 'gthread')
+        self.assertEqual(options['keepalive'], 3)
+        self.assertEqual(options['backlog'], 64)
+
+
+class TestMode(unittest.TestCase):
+    def test_mode(self):
+        self.assertEqual(local_server_mode('Production'), 'production')
+        with self.assertRaises(ValueError):
+            local_server_mode('fast')
+
+
+if __name__ == "__main__":
+    unittest.main()
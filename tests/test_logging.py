@@ -0,0 +1,111 @@
+import contextlib
+import io
+import json
+import unittest
+
+from lambdarado._log_writer import BackgroundWriter
+from lambdarado._wrap_handler_default import prepare_for_log, \
+    wrap_compact_logging, REDACTED
+
+
+class Context:
+    aws_request_id = 'req-1'
+
+
+def handler(event, context):
+    return {'statusCode': 200, 'body': 'x' * 100,
+            'headers': {'Set-Cookie': 'secret'}}
+
+
+class TestPrepareForLog(unittest.TestCase):
+    def test_fields(self):
+        self.assertEqual(prepare_for_log({'a': 1, 'b': 2}, fields=['b']),
+                         {'b': 2})
+
+    def test_truncate(self):
+        result = prepare_for_log({'body': 'abcdef'}, body_limit=2)
+        self.assertEqual(result['body'], 'ab...[4 more]')
+
+    def test_redact_does_not_modify_original(self):
+        event = {'headers': {'Authorization': 'token', 'Host': 'h'},
+                 'multiValueHeaders': {'authorization': ['token']}}
+        result = prepare_for_log(event, redact=frozenset(['authorization']))
+        self.assertEqual(result['headers'],
+                         {'Authorization': REDACTED, 'Host': 'h'})
+        self.assertEqual(result['multiValueHeaders']['authorization'],
+                         REDACTED)
+        self.assertEqual(event['headers']['Authorization'], 'token')
+
+
+class TestCompactLogging(unittest.TestCase):
+    def test_lines(self):
+        stream = io.StringIO()
+        writer = BackgroundWriter(stream)
+
+        def prepare(obj):
+            return prepare_for_log(obj, body_limit=3,
+                                   redact=frozenset(['set-cookie']))
+
+        wrapped = wrap_compact_logging(handler, True, True, 1.0, writer,
+                                       prepare)
+        response = wrapped({'path': '/'}, Context())
+        self.assertEqual(response['body'], 'x' * 100)
+        self.assertTrue(writer.flush())
+
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        request, logged_response = map(json.loads, lines)
+        self.assertEqual(request, {'lambdarado': 'request',
+                                   'requestId': 'req-1',
+                                   'event': {'path': '/'}})
+        self.assertEqual(logged_response['response']['body'], 'xxx...[97 more]')
+        self.assertEqual(logged_response['response']['headers'],
+                         {'Set-Cookie': REDACTED})
+
+    def test_sampling_zero(self):
+        stream = io.StringIO()
+        writer = BackgroundWriter(stream)
+        wrapped = wrap_compact_logging(handler, True, True, 0.0, writer,
+                                       lambda obj: obj)
+        wrapped({}, Context())
+        self.assertTrue(writer.flush())
+        self.assertEqual(stream.getvalue(), '')
+
+    def test_queued_copies(self):
+        stream = io.StringIO()
+        writer = BackgroundWriter(stream)
+        wrapped = wrap_compact_logging(handler, False, True, 1.0, writer,
+                                       lambda obj: obj)
+        response = wrapped({}, Context())
+        # changed by an outer wrapper after the queueing
+        response['headers']['Vary'] = 'Accept-Encoding'
+        response['body'] = ''
+        self.assertTrue(writer.flush())
+        logged = json.loads(stream.getvalue())['response']
+        self.assertEqual(logged['headers'], {'Set-Cookie': 'secret'})
+        self.assertEqual(logged['body'], 'x' * 100)
+
+
+class TestBackgroundWriter(unittest.TestCase):
+    def test_survives_bad_object(self):
+        stream = io.StringIO()
+
+        def prepare(obj):
+            if obj == 'bad':
+                raise ValueError('cannot prepare')
+            return obj
+
+        writer = BackgroundWriter(stream, prepare)
+        circular = []
+        circular.append(circular)
+        with contextlib.redirect_stderr(io.StringIO()):
+            writer.write('bad')
+            writer.write(circular)
+            self.assertTrue(writer.flush(timeout=1))
+        writer.write({'a': 1})
+        self.assertTrue(writer.flush(timeout=1))
+        self.assertEqual(stream.getvalue(), '{"a":1}\n')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import contextlib
+import gc
+import io
+import json
+import tracemalloc
+import unittest
+
+from lambdarado._lambdarado import make_aws_handler
+from lambdarado._memory import GcTimer, freeze_after_init, memory_wrapper, \
+    rss_kb
+from tests.test_http_event import event_v2
+
+
+def app(environ, start_response):
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [b'ok']
+
+
+class TestGcFreeze(unittest.TestCase):
+    def setUp(self):
+        self.thresholds = gc.get_threshold()
+
+    def tearDown(self):
+        gc.unfreeze()
+        gc.set_threshold(*self.thresholds)
+
+    def test_freeze_after_init(self):
+        freeze_after_init((5000, 10, 10))
+        self.assertGreater(gc.get_freeze_count(), 0)
+        self.assertEqual(gc.get_threshold(), (5000, 10, 10))
+
+    def test_handler_option(self):
+        handler = make_aws_handler(app, gc_freeze=True)
+        self.assertGreater(gc.get_freeze_count(), 0)
+        self.assertEqual(handler(event_v2(), None)['statusCode'], 200)
+
+
+class TestGcTimer(unittest.TestCase):
+    def test_counts_collections(self):
+        timer = GcTimer()
+        timer.install()
+        try:
+            gc.collect()
+            collections, pause = timer.reset()
+            self.assertGreaterEqual(collections, 1)
+            self.assertGreater(pause, 0)
+            self.assertEqual(timer.reset(), (0, 0.0))
+        finally:
+            gc.callbacks.remove(timer)
+
+
+class TestMemoryWrapper(unittest.TestCase):
+    def tearDown(self):
+        tracemalloc.stop()
+        gc.callbacks[:] = [c for c in gc.callbacks
+                           if not isinstance(c, GcTimer)]
+
+    def run_leaking(self, invocations, **kwargs):
+        leaked = []
+
+        def leaking_handler(event, context):
+            leaked.append([bytearray(1024) for _ in range(512)])
+            return {'statusCode': 200}
+
+        handler = memory_wrapper(**kwargs)(leaking_handler)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            for _ in range(invocations):
+                handler({}, None)
+        return [json.loads(line) for line in output.getvalue().splitlines()]
+
+    def test_reports_growth(self):
+        lines = self.run_leaking(5, threshold_mb=1, top=3)
+        self.assertGreaterEqual(len(lines), 1)
+        line = lines[0]
+        self.assertEqual(line['lambdarado'], 'memory')
+        self.assertGreaterEqual(line['tracedGrowthKb'], 1024)
+        self.assertTrue(line['top'][0]['line'].startswith(__file__))
+        self.assertLessEqual(len(line['top']), 3)
+
+    def test_below_threshold(self):
+        self.assertEqual(self.run_leaking(3, threshold_mb=100), [])
+
+    def test_without_tracing(self):
+        self.run_leaking(1, threshold_mb=100, trace=False)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_rss(self):
+        self.assertGreater(rss_kb(), 1024)
+
+
+if __name__ == '__main__':
+    unittest.main()
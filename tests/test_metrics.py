@@ -0,0 +1,99 @@
+import io
+import json
+import unittest
+
+from flask import Flask
+
+from lambdarado import EmfMetrics
+from lambdarado._lambdarado import make_aws_handler
+from lambdarado._log_writer import BackgroundWriter
+from tests.test_http_event import event_v1, event_v2
+
+
+def create_flask_app():
+    app = Flask(__name__)
+
+    @app.route('/items/<int:item_id>', methods=['GET', 'POST'])
+    def get_item(item_id):
+        return f'item {item_id}'
+
+    return app
+
+
+class TestEmfMetrics(unittest.TestCase):
+    def setUp(self):
+        self.stream = io.StringIO()
+        self.metrics = EmfMetrics(
+            namespace='Test',
+            dimensions=[['Route'], ['Route', 'Method']],
+            default_dimensions={'Service': 'api'},
+            writer=BackgroundWriter(stream=self.stream))
+
+    def lines(self):
+        self.assertTrue(self.metrics.writer.flush())
+        return [json.loads(line) for line in
+                self.stream.getvalue().splitlines()]
+
+    def test_flask(self):
+        handler = make_aws_handler(create_flask_app(), metrics=self.metrics)
+        response = handler(event_v2(rawPath='/items/5'), None)
+        self.assertEqual(response['body'], 'item 5')
+        handler(event_v1(path='/missing'), None)
+        handler({'warmer': True}, None)
+
+        first, second = self.lines()
+        self.assertEqual(first['Route'], '/items/<int:item_id>')
+        self.assertEqual(first['Method'], 'POST')
+        self.assertEqual(first['StatusCode'], '200')
+        self.assertEqual(first['Service'], 'api')
+        self.assertEqual(first['ColdStart'], 1)
+        self.assertEqual(first['RequestBytes'], 5)
+        self.assertEqual(first['ResponseBytes'], 6)
+        self.assertGreater(first['AppTime'], 0)
+        self.assertGreaterEqual(first['Latency'], first['AppTime'])
+
+        emf = first['_aws']['CloudWatchMetrics'][0]
+        self.assertEqual(emf['Namespace'], 'Test')
+        self.assertEqual(emf['Dimensions'],
+                         [['Service', 'Route'],
+                          ['Service', 'Route', 'Method']])
+        self.assertIn({'Name': 'Latency', 'Unit': 'Milliseconds'},
+                      emf['Metrics'])
+
+        self.assertEqual(second['Route'], 'unmatched')
+        self.assertEqual(second['StatusCode'], '404')
+        self.assertEqual(second['ColdStart'], 0)
+
+    def test_app_exception(self):
+        def failing_app(environ, start_response):
+            raise RuntimeError('failed')
+
+        handler = make_aws_handler(failing_app, metrics=self.metrics)
+        with self.assertRaises(RuntimeError):
+            handler(event_v2(), None)
+        line, = self.lines()
+        self.assertEqual(line['StatusCode'], '500')
+
+    def test_starlette(self):
+        try:
+            from starlette.applications import Starlette
+            from starlette.responses import PlainTextResponse
+            from starlette.routing import Route
+        except ImportError:
+            self.skipTest('starlette is not installed')
+
+        async def item(request):
+            return PlainTextResponse('item')
+
+        app = Starlette(routes=[Route('/items/{item_id}', item,
+                                      methods=['POST'])])
+        handler = make_aws_handler(app, metrics=self.metrics)
+        self.assertEqual(handler(event_v2(rawPath='/items/5'),
+                                 None)['body'], 'item')
+        line, = self.lines()
+        self.assertEqual(line['Route'], '/items/{item_id}')
+        self.assertGreater(line['AppTime'], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import json
+import unittest
+
+from lambdarado._lambdarado import make_aws_handler
+from lambdarado._multi_app import MultiApp
+from lambdarado._response import response_body
+from tests.test_event_sources import sqs_event
+from tests.test_http_event import event_v2
+
+
+def paths_app(name):
+    """The WSGI app that responds with its name and the environ paths."""
+
+    def app(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'application/json')])
+        return [json.dumps({'app': name,
+                            'script': environ['SCRIPT_NAME'],
+                            'path': environ['PATH_INFO'],
+                            'method': environ['REQUEST_METHOD']}).encode()]
+
+    return app
+
+
+class Factories:
+    def __init__(self):
+        self.created = []
+
+    def __call__(self, name):
+        def get_app():
+            self.created.append(name)
+            return paths_app(name)
+
+        return get_app
+
+
+def get(handler, path):
+    response = handler(event_v2(rawPath=path), None)
+    if response['statusCode'] != 200:
+        return response['statusCode']
+    return json.loads(response_body(response))
+
+
+class TestMultiApp(unittest.TestCase):
+    def setUp(self):
+        self.factories = Factories()
+        self.multi = MultiApp({'/': self.factories('main'),
+                               '/admin/': self.factories('admin'),
+                               '/admin/api': self.factories('api'),
+                               'aws:sqs': self.factories('worker')})
+
+    def test_routes(self):
+        self.assertEqual(self.multi.route_path('/admin'), '/admin')
+        self.assertEqual(self.multi.route_path('/admin/users'), '/admin')
+        self.assertEqual(self.multi.route_path('/admin/api/x'), '/admin/api')
+        self.assertEqual(self.multi.route_path('/administrator'), '')
+        self.assertEqual(self.multi.route_event(sqs_event('x')), 'aws:sqs')
+        self.assertEqual(self.multi.route_event({'custom': True}), '')
+
+    def test_apps_are_created_lazily(self):
+        handler = make_aws_handler(self.multi)
+        self.assertEqual(self.factories.created, [])
+        self.assertEqual(get(handler, '/admin/users'),
+                         {'app': 'admin', 'script': '/admin',
+                          'path': '/users', 'method': 'POST'})
+        self.assertEqual(get(handler, '/admin'),
+                         {'app': 'admin', 'script': '/admin',
+                          'path': '', 'method': 'POST'})
+        self.assertEqual(self.factories.created, ['admin'])
+        self.assertEqual(get(handler, '/admin/api/x')['app'], 'api')
+        self.assertEqual(get(handler, '/x')['script'], '')
+        self.assertEqual(self.factories.created, ['admin', 'api', 'main'])
+        self.assertEqual(set(self.multi.created), {'/admin', '/admin/api', ''})
+
+    def test_not_found_without_root(self):
+        handler = make_aws_handler(MultiApp({'/a': self.factories('a')}))
+        self.assertEqual(get(handler, '/b'), 404)
+        with self.assertRaises(ValueError):
+            handler({'custom': True}, None)
+
+    def test_event_source(self):
+        handler = make_aws_handler(self.multi,
+                                   event_routes={'aws:sqs': '/jobs'})
+        result = handler(sqs_event('a', 'b'), None)
+        self.assertEqual(result, {'batchItemFailures': []})
+        self.assertEqual(self.factories.created, ['worker'])
+
+    def test_on_create(self):
+        configured = []
+        multi = MultiApp({'/': self.factories('main')},
+                         on_create=configured.append)
+        multi.app('')
+        multi.app('')
+        self.assertEqual(len(configured), 1)
+
+    def test_duplicate_prefix(self):
+        with self.assertRaises(ValueError):
+            MultiApp({'/a': self.factories('a'), '/a/': self.factories('b')})
+
+    def test_local_wsgi_app(self):
+        wsgi_app = self.multi.wsgi_app()
+        started = []
+        body = wsgi_app({'PATH_INFO': '/admin/api/x', 'SCRIPT_NAME': '',
+                         'REQUEST_METHOD': 'GET'},
+                        lambda status, headers: started.append(status))
+        self.assertEqual(started, ['200 OK'])
+        self.assertEqual(json.loads(b''.join(body)),
+                         {'app': 'api', 'script': '/admin/api',
+                          'path': '/x', 'method': 'GET'})
+
+
+class TestAsgiApp(unittest.TestCase):
+    def test_root_path(self):
+        scopes = []
+
+        async def asgi_app(scope, receive, send):
+            if scope['type'] == 'lifespan':
+                await receive()
+                await send({'type': 'lifespan.startup.complete'})
+                await receive()
+                return
+            scopes.append(scope)
+            await send({'type': 'http.response.start', 'status': 200,
+                        'headers': []})
+            await send({'type': 'http.response.body', 'body': b'ok'})
+
+        handler = make_aws_handler(MultiApp({'/api': lambda: asgi_app}))
+        response = handler(event_v2(rawPath='/api/items'), None)
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(scopes[0]['root_path'], '/api')
+        self.assertEqual(scopes[0]['path'], '/api/items')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import json
+import unittest
+
+from lambdarado import offload_wrapper, MemoryStorage, S3Storage, \
+    OffloadStorage
+from lambdarado._response import response_header
+
+
+def make_handler(response):
+    def handler(event, context):
+        return json.loads(json.dumps(response))
+
+    return handler
+
+
+def v2_response(body):
+    return {'statusCode': 200,
+            'headers': {'content-type': 'text/csv',
+                        'content-length': str(len(body))},
+            'cookies': ['session=1'],
+            'body': body,
+            'isBase64Encoded': False}
+
+
+class FakeS3Client:
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body, **extra):
+        self.objects[(Bucket, Key)] = (Body, extra)
+
+    def generate_presigned_url(self, method, Params, ExpiresIn):
+        return (f"https://{Params['Bucket']}.s3.local/{Params['Key']}"
+                f"?X-Amz-Expires={ExpiresIn}")
+
+
+class TestOffload(unittest.TestCase):
+    def test_small_response_unchanged(self):
+        storage = MemoryStorage()
+        handler = offload_wrapper(storage, max_body_size=10)(
+            make_handler(v2_response('a,b,c')))
+        self.assertEqual(handler({}, None), v2_response('a,b,c'))
+        self.assertEqual(storage.objects, {})
+
+    def test_redirect(self):
+        storage = MemoryStorage()
+        handler = offload_wrapper(storage, max_body_size=10,
+                                  make_key=lambda e, r: 'report.csv')(
+            make_handler(v2_response('x' * 100)))
+        response = handler({}, None)
+        self.assertEqual(response['statusCode'], 303)
+        self.assertEqual(response['body'], '')
+        self.assertEqual(response['headers']['location'],
+                         'http://localhost/offloaded/report.csv'
+                         '?expires_in=3600')
+        self.assertIsNone(response_header(response, 'content-type'))
+        self.assertIsNone(response_header(response, 'content-length'))
+        self.assertEqual(response['cookies'], ['session=1'])
+        self.assertEqual(storage.objects['report.csv'],
+                         {'body': b'x' * 100, 'content_type': 'text/csv',
+                          'content_encoding': None})
+
+    def test_pointer_multi_value(self):
+        storage = MemoryStorage()
+        response = {'statusCode': 200,
+                    'statusDescription': '200 OK',
+                    'multiValueHeaders': {'Content-Type': ['image/png']},
+                    'body': 'AAAAAAAAAAAAAAAA',
+                    'isBase64Encoded': True}
+        handler = offload_wrapper(storage, max_body_size=10,
+                                  mode='pointer', expires_in=60)(
+            make_handler(response))
+        result = handler({}, None)
+        self.assertEqual(result['statusCode'], 200)
+        self.assertEqual(result['statusDescription'], '200 OK')
+        self.assertEqual(result['multiValueHeaders']['content-type'],
+                         ['application/json'])
+        pointer = json.loads(result['body'])
+        self.assertEqual(pointer['size'], 12)
+        self.assertEqual(pointer['contentType'], 'image/png')
+        self.assertEqual(pointer['expiresIn'], 60)
+        key = next(iter(storage.objects))
+        self.assertEqual(storage.objects[key]['body'], b'\0' * 12)
+
+    def test_s3_storage(self):
+        client = FakeS3Client()
+        storage = S3Storage('bucket', prefix='big/', client=client)
+        handler = offload_wrapper(storage, max_body_size=10,
+                                  make_key=lambda e, r: 'k')(
+            make_handler(v2_response('y' * 20)))
+        response = handler({}, None)
+        self.assertEqual(response['headers']['location'],
+                         'https://bucket.s3.local/big/k?X-Amz-Expires=3600')
+        self.assertEqual(client.objects[('bucket', 'big/k')],
+                         (b'y' * 20, {'ContentType': 'text/csv'}))
+
+    def test_size_in_bytes(self):
+        # 8 characters, but 16 bytes in UTF-8
+        storage = MemoryStorage()
+        handler = offload_wrapper(storage, max_body_size=10,
+                                  make_key=lambda e, r: 'k')(
+            make_handler(v2_response('я' * 8)))
+        self.assertEqual(handler({}, None)['statusCode'], 303)
+        self.assertEqual(storage.objects['k']['body'],
+                         'я'.encode('utf-8') * 8)
+
+    def test_incomplete_storage(self):
+        class UploadOnly(OffloadStorage):
+            def put(self, key, body, content_type, content_encoding):
+                pass
+
+        with self.assertRaises(TypeError):
+            UploadOnly()  # type: ignore
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            offload_wrapper(MemoryStorage(), mode='inline')
+
+
+if __name__ == "__main__":
+    unittest.main()
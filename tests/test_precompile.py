@@ -0,0 +1,91 @@
+import contextlib
+import io
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from lambdarado._precompile import imported_modules, precompile, \
+    measure_imports, _parse_import_times, report_import_cost
+
+SCRIPT = """
+import colorsys
+from helper import value
+from . import nothing
+
+
+def get_app():
+    import json.decoder
+    return value
+"""
+
+
+class TestPrecompile(unittest.TestCase):
+    def setUp(self):
+        self.temp = TemporaryDirectory()
+        self.dir = Path(self.temp.name)
+        self.script = self.dir / 'main.py'
+        self.script.write_text(SCRIPT)
+        (self.dir / 'helper.py').write_text('value = 1\n')
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_imported_modules(self):
+        self.assertEqual(imported_modules(self.script),
+                         ['colorsys', 'helper', 'json.decoder'])
+
+    def test_precompile(self):
+        self.assertTrue(precompile([self.dir]))
+        compiled = [path.name for path in
+                    (self.dir / '__pycache__').iterdir()]
+        self.assertTrue(any(name.startswith('helper.') for name in compiled))
+
+    def test_measure_imports(self):
+        times = measure_imports(['colorsys', 'helper', 'missing_module'],
+                                self.dir)
+        top_level = [item.module for item in times if item.depth == 0]
+        self.assertEqual(top_level[:2], ['colorsys', 'helper'])
+        self.assertNotIn('site', top_level)
+
+    def test_report(self):
+        # all the rows: the cheap modules are not in the top by the time
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            total = report_import_cost(self.script, top=1000)
+        self.assertGreater(total, 0)
+        rows = [line.split()[-1] for line in
+                output.getvalue().splitlines()[1:]]
+        self.assertIn('colorsys', rows)
+        self.assertIn('json.decoder', rows)
+        # imported by both `json` and `import json.decoder`, shown once
+        self.assertEqual(len(rows), len(set(rows)))
+
+    def test_parse(self):
+        times = _parse_import_times(
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:        10 |         10 |   child\n'
+            'import time:         5 |         15 | parent\n')
+        self.assertEqual([(t.module, t.depth) for t in times],
+                         [('child', 1), ('parent', 0)])
+        self.assertEqual(times[1].cumulative_us, 15)
+
+
+class TestLazyImports(unittest.TestCase):
+    def test_package_import(self):
+        # the modules of the AWS runtime and of the local servers are
+        # imported only by the path that uses them
+        code = ('import sys, lambdarado; print(",".join(sorted(m for m in '
+                '("awslambdaric", "aws_lambda_context", "asyncio", '
+                '"http.server", "email.utils", "gzip", "uuid", "hashlib", '
+                '"mimetypes", "concurrent.futures", "zlib", "http", '
+                '"random") '
+                'if m in sys.modules)))')
+        output = subprocess.run([sys.executable, '-c', code],
+                                stdout=subprocess.PIPE, text=True,
+                                check=True).stdout
+        self.assertEqual(output.strip(), '')
+
+
+if __name__ == "__main__":
+    unittest.main()
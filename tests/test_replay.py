@@ -0,0 +1,160 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from lambdarado.__main__ import main
+from lambdarado._replay import parse_events, route, percentile, replay, \
+    handler_sender, http_sender
+from lambdarado._lambdarado import make_aws_handler
+from tests.test_batch import asgi_app
+from tests.test_http_event import event_v1, event_v2
+from tests.test_local_server import echo_app, production_server, \
+    require_gunicorn
+
+
+def get_app():
+    return echo_app
+
+
+def failing(event):
+    raise ConnectionError('down')
+
+
+class TestParseEvents(unittest.TestCase):
+    def test_pretty_dump(self):
+        # as printed by wrap_aws_handler_default
+        event = event_v1()
+        lines = ['wrap_aws_handler_default: log_requests=True\n',
+                 '-- request start -----------------------------------\n',
+                 *(line + '\n' for line in
+                   json.dumps(event, indent=2, sort_keys=True).split('\n')),
+                 '-- request end -------------------------------------\n',
+                 '-- response start ----------------------------------\n',
+                 '{"statusCode": 200}\n',
+                 '-- response end ------------------------------------\n']
+        self.assertEqual(list(parse_events(lines)), [event])
+
+    def test_prefixed_dump(self):
+        # a CloudWatch export: each line of the dump is a separate log
+        # event, with its own timestamp
+        event = event_v1(body='a b\tc')
+        dump = json.dumps(event, indent=2, sort_keys=True).split('\n')
+        for prefix in ('2021-05-01T10:00:00.{}Z\t',
+                       '2021-05-01T10:00:00.{}+00:00 log/stream/1 '):
+            lines = [prefix.format(5) + '-- request start ---------\n',
+                     *(prefix.format(index * 37) + line + '\n'
+                       for index, line in enumerate(dump)),
+                     prefix.format(123) + '-- request end -----------\n',
+                     prefix.format(124) + '-- response start --------\n',
+                     prefix.format(125) + '{"statusCode": 200}\n']
+            self.assertEqual(list(parse_events(lines)), [event])
+
+    def test_json_lines(self):
+        first, second = event_v1(), event_v2()
+        lines = [json.dumps({'lambdarado': 'request', 'requestId': '1',
+                             'event': first}),
+                 json.dumps({'lambdarado': 'response', 'requestId': '1',
+                             'response': {'statusCode': 200}}),
+                 '2021-05-01T10:00:00Z\t' + json.dumps(second),
+                 'START RequestId: 2',
+                 '{"not": "an event"}',
+                 '{broken']
+        self.assertEqual(list(parse_events(lines)), [first, second])
+
+
+class TestStatistics(unittest.TestCase):
+    def test_route(self):
+        self.assertEqual(route(event_v1(path='/users/42/posts')),
+                         'POST /users/{id}/posts')
+        self.assertEqual(
+            route(event_v1(path='/x/3f2a9c1e-8b7d-4e6f-a5b4-c3d2e1f0a9b8')),
+            'POST /x/{id}')
+
+    def test_percentile(self):
+        values = [float(v) for v in range(1, 101)]
+        self.assertEqual(percentile(values, 0.5), 50.0)
+        self.assertEqual(percentile(values, 0.99), 99.0)
+        self.assertEqual(percentile(values, 1.0), 100.0)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+
+class TestReplay(unittest.TestCase):
+    def test_handler(self):
+        send = handler_sender(make_aws_handler(echo_app))
+        events = [event_v1(path='/a'), event_v2(rawPath='/b/1')]
+        result = replay(events, send, concurrency=2, count=10)
+        summary = result.summary()
+        self.assertEqual(summary['requests'], 10)
+        self.assertEqual(summary['errors'], 0)
+        self.assertEqual(summary['statuses'], {'200': 10})
+        self.assertEqual({r['route'] for r in summary['slowest']},
+                         {'POST /a', 'POST /b/{id}'})
+        self.assertGreater(summary['throughput'], 0)
+
+    def test_rate(self):
+        result = replay([event_v1()], handler_sender(
+            make_aws_handler(echo_app)), rate=50, count=6)
+        # five intervals of 20 ms
+        self.assertGreaterEqual(result.seconds, 0.1)
+
+    def test_rate_includes_waiting(self):
+        def slow(event):
+            time.sleep(0.05)
+            return 200
+
+        # started every 10 ms, but served one by one in 50 ms, so the
+        # last request waits for the previous ones
+        result = replay([event_v1()], slow, rate=100, count=5)
+        self.assertGreater(result.summary()['latencyMs']['max'], 150)
+
+    def test_asgi_concurrency(self):
+        send = handler_sender(make_aws_handler(asgi_app))
+        summary = replay([event_v2()], send, concurrency=4,
+                         count=8).summary()
+        self.assertEqual(summary['statuses'], {'200': 8})
+        # the app sleeps 0.2 s; one by one it would take 1.6 s
+        self.assertLess(summary['seconds'], 1.2)
+
+    def test_errors(self):
+        with contextlib.redirect_stderr(io.StringIO()):
+            result = replay([event_v1()], failing, count=3)
+        self.assertEqual(result.summary()['errors'], 3)
+
+    def test_http(self):
+        require_gunicorn(self)
+        with production_server() as port:
+            send = http_sender(f'http://127.0.0.1:{port}')
+            self.assertEqual(send(event_v1()), 200)
+            summary = replay([event_v1(), event_v2()], send,
+                             concurrency=2, count=6).summary()
+            self.assertEqual(summary['statuses'], {'200': 6})
+
+
+class TestCommand(unittest.TestCase):
+    def test_replay_app(self):
+        with tempfile.TemporaryDirectory() as temp:
+            path = os.path.join(temp, 'events.jsonl')
+            with open(path, 'w') as f:
+                f.write(json.dumps(event_v1()) + '\n')
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                main(['replay', path, '--app', 'tests.test_replay:get_app',
+                      '--count', '3', '--json'])
+        summary = json.loads(output.getvalue())
+        self.assertEqual(summary['requests'], 3)
+        self.assertEqual(summary['slowest'][0]['route'], 'POST /echo')
+
+    def test_no_events(self):
+        with tempfile.TemporaryDirectory() as temp:
+            path = os.path.join(temp, 'empty.log')
+            open(path, 'w').close()
+            with self.assertRaises(SystemExit):
+                main(['replay', path, '--app', 'tests.test_replay:get_app'])
+
+
+if __name__ == '__main__':
+    unittest.main()
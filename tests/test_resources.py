@@ -0,0 +1,150 @@
+import unittest
+
+from lambdarado._lambdarado import make_aws_handler
+from lambdarado._resources import ResourceRegistry
+from tests.test_http_event import event_v2
+
+
+class Connection:
+    def __init__(self, number: int):
+        self.number = number
+        self.alive = True
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class Factory:
+    def __init__(self):
+        self.created = []
+
+    def __call__(self):
+        connection = Connection(len(self.created))
+        self.created.append(connection)
+        return connection
+
+
+def make_app(registry: ResourceRegistry, used):
+    def app(environ, start_response):
+        used.append(registry['db'])
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return [b'ok']
+
+    return app
+
+
+class TestResource(unittest.TestCase):
+    def setUp(self):
+        self.registry = ResourceRegistry()
+        self.factory = Factory()
+        self.checks = []
+
+        def check(connection):
+            self.checks.append(connection.number)
+            return connection.alive
+
+        self.db = self.registry.register('db', self.factory, check=check,
+                                         close=Connection.close)
+
+    def test_created_once(self):
+        self.assertIs(self.db.get(), self.db.get())
+        self.assertEqual(len(self.factory.created), 1)
+        # no new invocation, no checks
+        self.assertEqual(self.checks, [])
+
+    def test_checked_once_per_invocation(self):
+        first = self.db.get()
+        self.registry.invocation += 1
+        self.assertIs(self.db.get(), first)
+        self.assertIs(self.db.get(), first)
+        self.assertEqual(self.checks, [0])
+
+    def test_recreated_when_check_fails(self):
+        first = self.db.get()
+        first.alive = False
+        self.registry.invocation += 1
+        second = self.db.get()
+        self.assertIsNot(second, first)
+        self.assertTrue(first.closed)
+        self.assertEqual(second.number, 1)
+
+    def test_recreated_when_check_raises(self):
+        def check(connection):
+            raise ConnectionError
+
+        resource = self.registry.register('other', self.factory,
+                                          check=check)
+        first = resource.get()
+        self.registry.invocation += 1
+        self.assertIsNot(resource.get(), first)
+
+    def test_check_after(self):
+        resource = self.registry.register(
+            'idle', self.factory, check=lambda c: False, check_after=60)
+        first = resource.get()
+        self.registry.invocation += 1
+        # used less than a minute ago, so not checked
+        self.assertIs(resource.get(), first)
+
+    def test_invalidate(self):
+        first = self.db.get()
+        self.db.invalidate()
+        self.assertTrue(first.closed)
+        self.assertIsNot(self.db.get(), first)
+
+    def test_duplicate_name(self):
+        with self.assertRaises(ValueError):
+            self.registry.register('db', self.factory)
+
+    def test_open_and_close(self):
+        lazy = self.registry.register('lazy', self.factory, lazy=True,
+                                      close=Connection.close)
+        self.registry.open()
+        self.assertTrue(self.db.created)
+        self.assertFalse(lazy.created)
+        lazy.get()
+        self.registry.close()
+        self.assertTrue(all(c.closed for c in self.factory.created))
+        self.assertFalse(self.db.created)
+
+    def test_open_ignores_failures(self):
+        def fail():
+            raise ConnectionError
+
+        registry = ResourceRegistry()
+        resource = registry.register('broken', fail)
+        registry.open()
+        self.assertFalse(resource.created)
+
+
+class TestHandler(unittest.TestCase):
+    def test_created_at_init_and_checked_by_invocations(self):
+        registry = ResourceRegistry()
+        factory = Factory()
+        checks = []
+        registry.register('db', factory,
+                          check=lambda c: checks.append(c.number))
+        used = []
+        handler = make_aws_handler(make_app(registry, used),
+                                   resources=registry)
+        # created before the first invocation
+        self.assertEqual(len(factory.created), 1)
+
+        for _ in range(3):
+            self.assertEqual(handler(event_v2(), None)['statusCode'], 200)
+        self.assertEqual(len(factory.created), 1)
+        self.assertEqual(checks, [0, 0, 0])
+        self.assertEqual(used, factory.created * 3)
+
+    def test_empty_registry(self):
+        registry = ResourceRegistry()
+        handler = make_aws_handler(make_app(registry, []),
+                                   resources=registry)
+        self.assertEqual(registry.invocation, 0)
+        with self.assertRaises(KeyError):
+            handler(event_v2(), None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+import base64
+import gzip
+import os
+import tempfile
+import unittest
+
+from lambdarado._lambdarado import make_aws_handler
+from lambdarado._response import response_body, response_header
+from lambdarado._static import StaticFiles
+from tests.test_http_event import event_v1, event_v2
+
+SCRIPT = b'console.log("hello");\n' * 200
+LOGO = bytes(range(256)) * 4
+
+
+def app(environ, start_response):
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [b'from the app: ' + environ['PATH_INFO'].encode()]
+
+
+def get(path, method='GET', headers=None):
+    return event_v2(rawPath=path, headers=headers or {},
+                    requestContext={'http': {'method': method,
+                                             'path': path}},
+                    body=None, isBase64Encoded=False)
+
+
+class TestStaticFiles(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        root = self.temp.name
+        os.makedirs(os.path.join(root, 'js'))
+        with open(os.path.join(root, 'js', 'app.js'), 'wb') as f:
+            f.write(SCRIPT)
+        with open(os.path.join(root, 'logo.png'), 'wb') as f:
+            f.write(LOGO)
+        with open(os.path.join(root, 'index.html'), 'wb') as f:
+            f.write(b'<html></html>')
+        self.static = StaticFiles({'/assets/': root})
+        self.handler = make_aws_handler(app, static=self.static)
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_text_file(self):
+        response = self.handler(get('/assets/js/app.js'), None)
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(response_body(response), SCRIPT)
+        # 'text/javascript' or 'application/javascript', by Python version
+        self.assertTrue(response_header(response, 'content-type')
+                        .endswith('javascript; charset=utf-8'))
+        self.assertEqual(response_header(response, 'vary'),
+                         'Accept-Encoding')
+        self.assertIsNone(response_header(response, 'content-encoding'))
+        self.assertFalse(response['isBase64Encoded'])
+
+    def test_compressed_variant(self):
+        response = self.handler(get('/assets/js/app.js', headers={
+            'accept-encoding': 'gzip, deflate'}), None)
+        self.assertEqual(response_header(response, 'content-encoding'),
+                         'gzip')
+        self.assertEqual(gzip.decompress(response_body(response)), SCRIPT)
+        plain = self.handler(get('/assets/js/app.js'), None)
+        self.assertNotEqual(response_header(response, 'etag'),
+                            response_header(plain, 'etag'))
+
+    def test_refused_variant(self):
+        # the wildcard does not bring back the refused encoding
+        response = self.handler(get('/assets/js/app.js', headers={
+            'accept-encoding': 'gzip;q=0, br;q=0, *'}), None)
+        self.assertIsNone(response_header(response, 'content-encoding'))
+        self.assertEqual(response_body(response), SCRIPT)
+
+    def test_binary_file(self):
+        response = self.handler(get('/assets/logo.png'), None)
+        self.assertEqual(response_header(response, 'content-type'),
+                         'image/png')
+        self.assertTrue(response['isBase64Encoded'])
+        self.assertEqual(base64.b64decode(response['body']), LOGO)
+        # not compressible
+        self.assertIsNone(response_header(response, 'vary'))
+
+    def test_index(self):
+        for path in ('/assets', '/assets/', '/assets/index.html'):
+            response = self.handler(get(path), None)
+            self.assertEqual(response_body(response), b'<html></html>')
+
+    def test_not_modified(self):
+        etag = response_header(self.handler(get('/assets/logo.png'), None),
+                               'etag')
+        response = self.handler(get('/assets/logo.png', headers={
+            'if-none-match': f'"other", W/{etag}'}), None)
+        self.assertEqual(response['statusCode'], 304)
+        self.assertEqual(response['body'], '')
+        self.assertEqual(response_header(response, 'etag'), etag)
+
+        last_modified = response_header(
+            self.handler(get('/assets/logo.png'), None), 'last-modified')
+        response = self.handler(get('/assets/logo.png', headers={
+            'if-modified-since': last_modified}), None)
+        self.assertEqual(response['statusCode'], 304)
+
+    def test_head(self):
+        response = self.handler(get('/assets/logo.png', 'HEAD'), None)
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(response['body'], '')
+        self.assertEqual(response_header(response, 'content-length'),
+                         str(len(LOGO)))
+
+    def test_passed_to_app(self):
+        for path, method in (('/assets/missing.js', 'GET'),
+                             ('/other', 'GET'),
+                             ('/assets/logo.png', 'POST')):
+            response = self.handler(get(path, method), None)
+            self.assertTrue(response_body(response).startswith(
+                b'from the app'))
+
+    def test_rest_api_event(self):
+        response = self.handler(event_v1(httpMethod='GET',
+                                         path='/assets/logo.png',
+                                         body=None), None)
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(response['multiValueHeaders']['Content-Type'],
+                         ['image/png'])
+
+    def test_max_size(self):
+        static = StaticFiles({'/': self.temp.name}, max_size=1000)
+        self.assertIn('/index.html', static.files)
+        self.assertNotIn('/logo.png', static.files)
+
+    def test_prebuilt_variants(self):
+        root = self.temp.name
+        # built with the frontend: used as is, not compressed again
+        prebuilt = gzip.compress(SCRIPT, 1)
+        with open(os.path.join(root, 'js', 'app.js.gz'), 'wb') as f:
+            f.write(prebuilt)
+        with open(os.path.join(root, 'js', 'app.js.br'), 'wb') as f:
+            f.write(b'brotli')
+        static = StaticFiles({'/assets/': root}, gzip_level=9)
+        self.assertNotIn('/assets/js/app.js.gz', static.files)
+        self.assertNotIn('/assets/js/app.js.br', static.files)
+        handler = make_aws_handler(app, static=static)
+
+        response = handler(get('/assets/js/app.js', headers={
+            'accept-encoding': 'gzip'}), None)
+        self.assertEqual(response_body(response), prebuilt)
+        response = handler(get('/assets/js/app.js', headers={
+            'accept-encoding': 'br, gzip'}), None)
+        self.assertEqual(response_header(response, 'content-encoding'), 'br')
+        self.assertEqual(response_body(response), b'brotli')
+
+    def test_wsgi(self):
+        wsgi_app = self.static.wrap_wsgi(app)
+        started = []
+        body = wsgi_app({'REQUEST_METHOD': 'GET',
+                         'PATH_INFO': '/assets/logo.png'},
+                        lambda status, headers: started.append(status))
+        self.assertEqual(started, ['200 OK'])
+        self.assertEqual(b''.join(body), LOGO)
+
+
+if __name__ == '__main__':
+    unittest.main()
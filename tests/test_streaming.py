@@ -0,0 +1,67 @@
+import unittest
+
+from lambdarado._streaming import stream_wsgi
+from tests.test_http_event import event_v2
+from lambdarado._http_event import event_to_environ
+
+
+class ClosingResult:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+    def close(self):
+        self.closed = True
+
+
+class TestStreamWsgi(unittest.TestCase):
+    def test_prelude_and_chunks(self):
+        result = ClosingResult([b'a', b'', b'b'])
+
+        def app(environ, start_response):
+            write = start_response('201 Created',
+                                   [('Content-Type', 'text/plain'),
+                                    ('Set-Cookie', 'x=1')])
+            write(b'written')
+            return result
+
+        prelude, chunks = stream_wsgi(app, event_to_environ(event_v2()))
+        self.assertEqual(prelude, {'statusCode': 201,
+                                   'headers': {'content-type': 'text/plain'},
+                                   'cookies': ['x=1']})
+        self.assertEqual([c for c in chunks if c], [b'written', b'a', b'b'])
+        self.assertTrue(result.closed)
+
+    def test_late_start_response(self):
+        def app(environ, start_response):
+            start_response('200 OK', [])
+            yield b'late'
+
+        prelude, chunks = stream_wsgi(app, event_to_environ(event_v2()))
+        self.assertEqual(prelude['statusCode'], 200)
+        self.assertEqual(list(chunks), [b'late'])
+
+    def test_error_before_first_chunk(self):
+        def app(environ, start_response):
+            raise KeyError('x')
+
+        with self.assertRaises(KeyError):
+            stream_wsgi(app, event_to_environ(event_v2()))
+
+    def test_error_in_the_middle(self):
+        def app(environ, start_response):
+            start_response('200 OK', [])
+            yield b'first'
+            raise ValueError('x')
+
+        _, chunks = stream_wsgi(app, event_to_environ(event_v2()))
+        self.assertEqual(next(chunks), b'first')
+        with self.assertRaises(ValueError):
+            next(chunks)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import contextlib
+import io
+import unittest
+
+from lambdarado._lambdarado import make_aws_handler
+from lambdarado._warmup import is_warmer_ping, warm_up
+from tests.test_http_event import event_v2
+
+
+def make_app(calls):
+    def app(environ, start_response):
+        calls.append((environ['REQUEST_METHOD'], environ['PATH_INFO']))
+        status = '404 Not Found' if environ['PATH_INFO'] == '/missing' \
+            else '200 OK'
+        start_response(status, [('Content-Type', 'text/plain')])
+        return [b'ok']
+
+    return app
+
+
+class TestPings(unittest.TestCase):
+    def test_is_warmer_ping(self):
+        self.assertTrue(is_warmer_ping({'source':
+                                        'serverless-plugin-warmup'}))
+        self.assertTrue(is_warmer_ping({'warmer': True, 'concurrency': 1}))
+        self.assertFalse(is_warmer_ping({'warmer': 'no'}))
+        self.assertFalse(is_warmer_ping(event_v2()))
+        self.assertFalse(is_warmer_ping([]))
+
+    def test_ping_bypasses_app_and_wrappers(self):
+        calls = []
+        wrapped = []
+
+        def wrap(handler):
+            def wrapper(event, context):
+                wrapped.append(event)
+                return handler(event, context)
+
+            return wrapper
+
+        handler = make_aws_handler(make_app(calls), wrap)
+        self.assertEqual(handler({'warmer': True}, None), {'warmed': True})
+        self.assertEqual(calls, [])
+        self.assertEqual(wrapped, [])
+
+        self.assertEqual(handler(event_v2(), None)['statusCode'], 200)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(wrapped), 1)
+
+    def test_pings_disabled(self):
+        handler = make_aws_handler(make_app([]), warmer_pings=False)
+        with self.assertRaises(ValueError):
+            handler({'warmer': True}, None)
+
+
+class TestWarmUp(unittest.TestCase):
+    def test_items(self):
+        calls = []
+        apps = []
+        make_aws_handler(make_app(calls),
+                         warm_up_items=['/', ('HEAD', '/items?x=1'),
+                                        apps.append])
+        self.assertEqual(calls, [('GET', '/'), ('HEAD', '/items')])
+        self.assertEqual(len(apps), 1)
+
+    def test_failures_are_printed(self):
+        calls = []
+
+        def fail(app):
+            raise RuntimeError('no database')
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), \
+                contextlib.redirect_stderr(io.StringIO()):
+            warm_up(None, make_aws_handler(make_app(calls)),
+                    [fail, '/missing', '/after'])
+        self.assertIn('/missing returned 404', output.getvalue())
+        self.assertIn('failed', output.getvalue())
+        self.assertEqual(calls, [('GET', '/missing'), ('GET', '/after')])
+
+
+if __name__ == "__main__":
+    unittest.main()